@@ -1,310 +1,503 @@
-from flask import Blueprint, current_app, render_template, request, jsonify, redirect, url_for, session, send_from_directory
-from werkzeug.security import generate_password_hash, check_password_hash
-import mysql.connector
-
-admin_bp = Blueprint("admin",__name__, template_folder='templates', static_folder='static')
-# current_app.secret_key = 'your-secret-key-123'  # Change this to a strong secret key in production
-
-# Database configuration
-db_config = {
-    "host": "localhost",
-    "user": "root",
-    "password": "",
-    "database": "insightify"
-}
- 
-def get_unread_count():
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT COUNT(*) AS count FROM messages WHERE reply IS NULL OR reply = ''")
-        result = cursor.fetchone()
-        return result['count'] if result else 0
-    except:
-        return 0
-    finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-@admin_bp.route('/static/<path:filename>')
-def static_files(filename):
-    return send_from_directory(current_app.static_folder, filename)
-
-@admin_bp.route('/')
-def index():
-    return render_template('index.html')
-
-@admin_bp.route('/admin_login', methods=['GET', 'POST'])
-def admin_login():
-    if request.method == 'GET':
-        return render_template('admin_login.html')
-    
-    data = request.get_json()
-    if not data:
-        return jsonify({'success': False, 'message': 'No data received'}), 400
-        
-    email = data.get('email', '').lower().strip()
-    password = data.get('password', '')
-
-    print(f"Attempting login for email: {email}")  # Debug
-    print(f"Password received: {password}")  # Debug
-
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, fullname, email, password FROM admins WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        
-        print(f"User from DB: {user}")  # Debug
-        
-        if user:
-            print(f"Stored hashed password: {user['password']}")  # Debug
-            print(f"Password match result: {check_password_hash(user['password'], password)}")  # Debug
-        
-        if user and check_password_hash(user['password'], password):
-            session["admin_id"]=user["id"]
-            return jsonify({
-                'success': True,
-                'message': 'Login successful!',
-                'user': {
-                    'id': user['id'],
-                    'fullname': user['fullname'],
-                    'email': user['email']
-                }
-            }), 200
-        return jsonify({'success': False, 'message': 'Invalid credentials!'}), 401
-    except Exception as e:
-        print(f"Error during login: {e}")  # Debug
-        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
-
-
-@admin_bp.route('/admin_dashboard')
-def admin_dashboard():
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT COUNT(*) AS count FROM messages WHERE reply IS NULL OR reply = ''")
-        result = cursor.fetchone()
-        unread_count = result['count'] if result else 0
-        return render_template("admin_dashboard.html", unread_count=unread_count)
-    except Exception as e:
-        print("Error fetching dashboard data:", e)
-        return render_template("admin_dashboard.html", unread_count=0)
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
-
-@admin_bp.route('/get-stats')
-def get_stats():
-    try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-
-        cursor.execute("SELECT COUNT(*) FROM users")
-        total_users = cursor.fetchone()[0]
-
-        print("Total users from DB:", total_users)  # Debug print
-
-        stats = {
-            'total_users': total_users
-        }
-
-        return jsonify({'success': True, 'stats': stats})
-
-    except Exception as e:
-        print("Error in /get-stats:", e)
-        return jsonify({'success': False, 'message': str(e)})
-
-    finally:
-        if cursor: cursor.close()
-        if connection: connection.close()
-
-@admin_bp.route('/users')
-def view_users():
-    try:
-        # Connect to the database
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
-
-        # Query to get all users from the 'users' table
-        cursor.execute("SELECT id, fullname, email, date_registered FROM users")
-        users = cursor.fetchall()
-        unread_count = get_unread_count()
-        # Render the 'users.html' template with the list of users
-        return render_template('users.html', users=users, unread_count=unread_count)
-
-    except Exception as e:
-        print(f"Error fetching users: {e}")
-        return jsonify({'success': False, 'message': 'Error fetching users.'})
-
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
-@admin_bp.route('/delete-user/<int:user_id>', methods=['DELETE'])
-def delete_user(user_id):
-    try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-
-        # Query to delete the user by id
-        cursor.execute("DELETE FROM users WHERE id = %s", (user_id,))
-        connection.commit()
-
-        return jsonify({'success': True, 'message': 'User deleted successfully!'})
-
-    except Exception as e:
-        print(f"Error deleting user: {e}")
-        return jsonify({'success': False, 'message': 'Error deleting user.'})
-
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
-@admin_bp.route('/admin-logout', methods=['GET'])
-def admin_logout():
-    session.pop('admin_id', None)  # Remove the admin ID from the session
-    return jsonify({'success': True, 'redirect': '/admin/admin_login'})  # Redirect to login page
-
-@admin_bp.route('/doctors')
-def view_doctors():
-    try:
-        # Connect to the database
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor(dictionary=True)
-
-        # Query to get all doctors from the 'doctors' table
-        cursor.execute("SELECT id, name, specialization, contact_info FROM doctors")
-        doctors = cursor.fetchall()
-        unread_count = get_unread_count()
-        return render_template('doctors.html', doctors=doctors, unread_count=unread_count)
-        
-
-    except Exception as e:
-        print(f"Error fetching doctors: {e}")
-        return jsonify({'success': False, 'message': 'Error fetching doctors.'})
-
-    finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-
-
-@admin_bp.route('/add-doctor', methods=['POST'])
-def add_doctor():
-    try:
-        data = request.get_json()
-        name = data.get('name')
-        specialization = data.get('specialization')
-        contact_info = data.get('contact_info')
-
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-
-        cursor.execute(
-            "INSERT INTO doctors (name, specialization, contact_info) VALUES (%s, %s, %s)",
-            (name, specialization, contact_info)
-        )
-        connection.commit()
-
-        return jsonify({'success': True, 'message': 'Doctor added successfully!'})
-    except Exception as e:
-        print("Error adding doctor:", e)
-        return jsonify({'success': False, 'message': 'Failed to add doctor'})
-    finally:
-        if cursor: cursor.close()
-        if connection: connection.close()
-
-@admin_bp.route('/delete-doctor/<int:doctor_id>', methods=['DELETE'])
-def delete_doctor(doctor_id):
-    try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-
-        cursor.execute("DELETE FROM doctors WHERE id = %s", (doctor_id,))
-        connection.commit()
-
-        return jsonify({'success': True, 'message': 'Doctor deleted successfully!'})
-    except Exception as e:
-        print("Error deleting doctor:", e)
-        return jsonify({'success': False, 'message': 'Failed to delete doctor'})
-    finally:
-        if cursor: cursor.close()
-        if connection: connection.close()
-
-@admin_bp.route('/messages', methods=['GET', 'POST'], endpoint='admin_contact')
-def messages():
-    try:
-        # Connect to the database
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        
-        # Query to fetch all messages
-        cursor.execute("SELECT * FROM messages")  # Adjust table name if necessary
-        messages = cursor.fetchall()
-        unread_count = get_unread_count()
-        return render_template('messages.html', messages=messages, unread_count=unread_count)
-        
-    
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        return "Error fetching messages from the database", 500
-    finally:
-        if conn:
-            conn.close()        
-
-    
-
-from datetime import datetime
-
-@admin_bp.route('/reply-message/<int:message_id>', methods=['POST'])
-def reply_message(message_id):
-    data = request.get_json()
-    reply = data.get('reply', '')
-
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-
-        query = "UPDATE messages SET reply = %s, replied_at = %s WHERE id = %s"
-        cursor.execute(query, (reply, datetime.now(), message_id))
-        conn.commit()
-
-        return jsonify({'success': True, 'message': 'Reply saved successfully.'})
-
-    except Exception as e:
-        print("Reply Error:", e)
-        return jsonify({'success': False, 'message': 'Failed to save reply.'})
-
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
-
-@admin_bp.route('/delete-message/<int:message_id>', methods=['DELETE'])
-def delete_message(message_id):
-    try:
-        connection = mysql.connector.connect(**db_config)
-        cursor = connection.cursor()
-
-        cursor.execute("DELETE FROM messages WHERE id = %s", (message_id,))
-        connection.commit()
-
-        return jsonify({'success': True, 'message': 'Message deleted successfully!'})
-    except Exception as e:
-        print("Error deleting message:", e)
-        return jsonify({'success': False, 'message': 'Failed to delete message'})
-    finally:
-        if cursor: cursor.close()
-        if connection: connection.close()
-
-
+from flask import Blueprint, current_app, render_template, request, jsonify, redirect, url_for, session, Response, stream_with_context
+import json
+import logging
+import mysql.connector
+from db import get_connection, pool
+import analytics
+import history
+import bulk
+from assets import send_static
+import exports
+from counters import counters, UNREAD_MESSAGES, USERS, RESULTS, is_unread
+from pagination import users_listing, messages_listing, doctors_listing, PaginationError, jsonable
+from result_writer import result_writer
+from contact_intake import contact_intake
+from questionnaire import questionnaire_cache, invalidate_questionnaire
+from doctors import doctor_directory, invalidate_doctors
+from prediction import registry
+import startup
+from sessions import regenerate
+from auth import hasher, admin_logins, rate_limited, hashing_busy, HashingBusy
+
+admin_bp = Blueprint("admin",__name__, template_folder='templates', static_folder='static')
+log = logging.getLogger(__name__)
+# current_app.secret_key = 'your-secret-key-123'  # Change this to a strong secret key in production
+
+# Reachable without an admin session
+PUBLIC_ENDPOINTS = {'admin.static', 'admin.static_files', 'admin.index', 'admin.admin_login', 'admin.admin_logout'}
+
+
+@admin_bp.before_request
+def require_admin():
+    if request.endpoint in PUBLIC_ENDPOINTS or session.get('admin_id') is not None:
+        return None
+    # Pages send the browser to the login form; API calls get a 401 they can act on
+    if request.method == 'GET' and request.accept_mimetypes.best == 'text/html':
+        return redirect(url_for('admin.admin_login'))
+    return jsonify({'success': False, 'message': 'Please log in as an admin.'}), 401
+
+ 
+def get_unread_count(cursor=None):
+    # Served from the admin_counters summary (cached per worker), not a COUNT(*) over messages.
+    # `cursor` is accepted for existing callers but no longer needed.
+    try:
+        return counters.get(UNREAD_MESSAGES)
+    except:
+        return 0
+
+@admin_bp.route('/static/<path:filename>')
+def static_files(filename):
+    return send_static(filename)
+
+@admin_bp.route('/')
+def index():
+    return render_template('index.html')
+
+@admin_bp.route('/admin_login', methods=['GET', 'POST'])
+def admin_login():
+    if request.method == 'GET':
+        return render_template('admin_login.html')
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'message': 'No data received'}), 400
+        
+    email = data.get('email', '').lower().strip()
+    password = data.get('password', '')
+
+    retry_after = admin_logins.check(request.remote_addr, email)
+    if retry_after:
+        return rate_limited(retry_after)
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, fullname, email, password FROM admins WHERE email = %s", (email,))
+        user = cursor.fetchone()
+        # Hand the connection back before the slow hash check
+        cursor.close()
+        conn.close()
+
+        if user and hasher.verify(user['password'], password):
+            admin_logins.succeeded(email)
+            hasher.upgrade('admins', user['id'], user['password'], password)
+            regenerate(session)
+            session["admin_id"]=user["id"]
+            return jsonify({
+                'success': True,
+                'message': 'Login successful!',
+                'user': {
+                    'id': user['id'],
+                    'fullname': user['fullname'],
+                    'email': user['email']
+                }
+            }), 200
+        admin_logins.failed(email)
+        return jsonify({'success': False, 'message': 'Invalid credentials!'}), 401
+    except HashingBusy:
+        return hashing_busy()
+    except Exception as e:
+        log.exception("Error during admin login")
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@admin_bp.route('/admin_dashboard')
+def admin_dashboard():
+    return render_template("admin_dashboard.html", unread_count=get_unread_count())
+
+@admin_bp.route('/get-stats')
+def get_stats():
+    try:
+        stats = {
+            'total_users': counters.get(USERS),
+            'total_results': counters.get(RESULTS),
+            'unread_messages': counters.get(UNREAD_MESSAGES),
+            'risk_levels': counters.risk_levels()
+        }
+
+        return jsonify({'success': True, 'stats': stats})
+
+    except Exception as e:
+        log.exception("Error in /get-stats")
+        return jsonify({'success': False, 'message': str(e)})
+
+@admin_bp.route('/counters/reconcile', methods=['POST'])
+def reconcile_counters():
+    try:
+        values = counters.reconcile()
+        return jsonify({'success': True, 'counters': values})
+    except Exception as e:
+        log.exception("Error reconciling counters")
+        return jsonify({'success': False, 'message': 'Failed to reconcile counters'})
+
+@admin_bp.route('/results')
+def results_dashboard():
+    return render_template('resultsmgmt.html', unread_count=get_unread_count(),
+                           granularities=analytics.GRANULARITIES,
+                           age_bands=[band for _, _, band in analytics.AGE_BANDS] + [analytics.UNKNOWN])
+
+@admin_bp.route('/analytics/results')
+def results_analytics():
+    conn = cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        data = analytics.distribution(cursor, request.args)
+        return jsonify({'success': True, **data})
+    except analytics.AnalyticsError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error in /analytics/results")
+        return jsonify({'success': False, 'message': 'Error fetching analytics.'}), 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+@admin_bp.route('/analytics/rebuild', methods=['POST'])
+def rebuild_analytics():
+    conn = None
+    try:
+        conn = get_connection()
+        analytics.rebuild(conn)
+        return jsonify({'success': True, 'message': 'Results rollup rebuilt.'})
+    except Exception as e:
+        log.exception("Error rebuilding results rollup")
+        return jsonify({'success': False, 'message': 'Failed to rebuild results rollup'})
+    finally:
+        if conn: conn.close()
+
+@admin_bp.route('/history/rebuild', methods=['POST'])
+def rebuild_history():
+    conn = None
+    try:
+        conn = get_connection()
+        history.rebuild(conn)
+        return jsonify({'success': True, 'message': 'User result summaries rebuilt.'})
+    except Exception as e:
+        log.exception("Error rebuilding user result summaries")
+        return jsonify({'success': False, 'message': 'Failed to rebuild user result summaries'})
+    finally:
+        if conn: conn.close()
+
+# Streamed exports for clinical review: /admin/export/results?format=csv|ndjson&gzip=1
+@admin_bp.route('/export/<name>')
+def export_table(name):
+    try:
+        chunks, mimetype, filename, conn = exports.export(name, request.args, get_connection)
+    except exports.ExportError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error exporting %s", name)
+        return jsonify({'success': False, 'message': f'Failed to export {name}'}), 500
+
+    response = Response(stream_with_context(chunks), mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    # Returns the connection even if the client disconnects before the stream starts
+    response.call_on_close(conn.close)
+    return response
+
+@admin_bp.route('/result-writer')
+def result_writer_status():
+    return jsonify({'success': True, 'writer': result_writer.status()})
+
+@admin_bp.route('/contact-intake')
+def contact_intake_status():
+    return jsonify({'success': True, 'intake': contact_intake.status()})
+
+@admin_bp.route('/users')
+def view_users():
+    try:
+        # Connect to the database
+        connection = get_connection()
+        cursor = connection.cursor(dictionary=True)
+
+        # Only the first page is rendered; the template loads the rest from /admin/api/users
+        users, next_cursor = users_listing.fetch_page(cursor, request.args)
+        unread_count = get_unread_count(cursor)
+        # Render the 'users.html' template with the first page of users
+        return render_template('users.html', users=users, next_cursor=next_cursor, unread_count=unread_count)
+
+    except PaginationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error fetching users")
+        return jsonify({'success': False, 'message': 'Error fetching users.'})
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+@admin_bp.route('/delete-user/<int:user_id>', methods=['DELETE'])
+def delete_user(user_id):
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+
+        # Takes the user's results (and their counters, rollup and history rows) with it
+        bulk.delete_users(cursor, [user_id])
+        connection.commit()
+
+        return jsonify({'success': True, 'message': 'User deleted successfully!'})
+
+    except Exception as e:
+        log.exception("Error deleting user")
+        return jsonify({'success': False, 'message': 'Error deleting user.'})
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+@admin_bp.route('/db-pool')
+def db_pool_stats():
+    return jsonify({'success': True, 'pool': pool.stats()})
+
+@admin_bp.route('/questionnaire-cache', methods=['GET', 'POST'])
+def questionnaire_cache_status():
+    # POST after editing the questions/options tables so /test picks up the change
+    if request.method == 'POST':
+        invalidate_questionnaire()
+    return jsonify({'success': True, 'cache': questionnaire_cache.stats()})
+
+@admin_bp.route('/doctors-cache', methods=['GET', 'POST'])
+def doctors_cache_status():
+    # POST after editing the doctors table outside the admin pages
+    if request.method == 'POST':
+        invalidate_doctors()
+    return jsonify({'success': True, 'cache': doctor_directory.stats()})
+
+@admin_bp.route('/model', methods=['GET', 'POST'])
+def model_status():
+    # POST reloads the artifacts now instead of waiting for the file watcher
+    if request.method == 'POST':
+        names = [request.args['name']] if request.args.get('name') else registry.names()
+        if any(name not in registry.names() for name in names):
+            return jsonify({'success': False, 'message': f"Unknown model; expected one of {registry.names()}"}), 400
+        reloaded = [name for name in names if registry.reload(name)]
+        return jsonify({'success': True, 'reloaded': reloaded, 'registry': registry.status()})
+    return jsonify({'success': True, 'registry': registry.status()})
+
+@admin_bp.route('/auth')
+def auth_status():
+    return jsonify({'success': True, 'hasher': {'method': hasher.method, **hasher.stats},
+                    'tracked': {'admin_ips': len(admin_logins.ip), 'admin_accounts': len(admin_logins.account)}})
+
+@admin_bp.route('/startup')
+def startup_status():
+    return jsonify({'success': True, 'startup': startup.report(), 'models': registry.status()['models']})
+
+@admin_bp.route('/admin-logout', methods=['GET'])
+def admin_logout():
+    session.pop('admin_id', None)  # Remove the admin ID from the session
+    return jsonify({'success': True, 'redirect': '/admin/admin_login'})  # Redirect to login page
+
+@admin_bp.route('/doctors')
+def view_doctors():
+    connection = cursor = None
+    try:
+        # Only the first page is rendered; the template loads the rest from /admin/api/doctors.
+        # The default order comes from the in-memory directory; other sorts and searches query MySQL.
+        if doctor_directory.serves(request.args):
+            doctors, next_cursor = doctor_directory.page(request.args)
+        else:
+            connection = get_connection()
+            cursor = connection.cursor(dictionary=True)
+            doctors, next_cursor = doctors_listing.fetch_page(cursor, request.args)
+        unread_count = get_unread_count()
+        return render_template('doctors.html', doctors=doctors, next_cursor=next_cursor, unread_count=unread_count)
+        
+
+    except PaginationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error fetching doctors")
+        return jsonify({'success': False, 'message': 'Error fetching doctors.'})
+
+    finally:
+        if cursor:
+            cursor.close()
+        if connection:
+            connection.close()
+
+
+@admin_bp.route('/add-doctor', methods=['POST'])
+def add_doctor():
+    try:
+        data = request.get_json()
+        name = data.get('name')
+        specialization = data.get('specialization')
+        contact_info = data.get('contact_info')
+
+        connection = get_connection()
+        cursor = connection.cursor()
+
+        cursor.execute(
+            "INSERT INTO doctors (name, specialization, contact_info) VALUES (%s, %s, %s)",
+            (name, specialization, contact_info)
+        )
+        connection.commit()
+        invalidate_doctors()
+
+        return jsonify({'success': True, 'message': 'Doctor added successfully!'})
+    except Exception as e:
+        log.exception("Error adding doctor")
+        return jsonify({'success': False, 'message': 'Failed to add doctor'})
+    finally:
+        if cursor: cursor.close()
+        if connection: connection.close()
+
+@admin_bp.route('/delete-doctor/<int:doctor_id>', methods=['DELETE'])
+def delete_doctor(doctor_id):
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+
+        bulk.delete_doctors(cursor, [doctor_id])
+        connection.commit()
+        invalidate_doctors()
+
+        return jsonify({'success': True, 'message': 'Doctor deleted successfully!'})
+    except Exception as e:
+        log.exception("Error deleting doctor")
+        return jsonify({'success': False, 'message': 'Failed to delete doctor'})
+    finally:
+        if cursor: cursor.close()
+        if connection: connection.close()
+
+@admin_bp.route('/messages', methods=['GET', 'POST'], endpoint='admin_contact')
+def messages():
+    try:
+        # Connect to the database
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        
+        # Only the first page is rendered; the template loads the rest from /admin/api/messages
+        messages, next_cursor = messages_listing.fetch_page(cursor, request.args)
+        unread_count = get_unread_count(cursor)
+        return render_template('messages.html', messages=messages, next_cursor=next_cursor, unread_count=unread_count)
+        
+    
+    except PaginationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except mysql.connector.Error as err:
+        log.error("Database error: %s", err)
+        return "Error fetching messages from the database", 500
+    finally:
+        if conn:
+            conn.close()        
+
+# Cursor-paginated JSON listings used by the admin tables to load further pages
+LISTINGS = {
+    'users': users_listing,
+    'messages': messages_listing,
+    'doctors': doctors_listing
+}
+
+@admin_bp.route('/api/<listing>')
+def list_page(listing):
+    if listing not in LISTINGS:
+        return jsonify({'success': False, 'message': 'Unknown listing'}), 404
+
+    conn = cursor = None
+    try:
+        if listing == 'doctors' and doctor_directory.serves(request.args):
+            items, next_cursor = doctor_directory.page(request.args)
+            return jsonify({'success': True, 'items': items, 'next_cursor': next_cursor})
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        items, next_cursor = LISTINGS[listing].fetch_page(cursor, request.args)
+        return jsonify({'success': True, 'items': jsonable(items), 'next_cursor': next_cursor})
+    except PaginationError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error listing %s", listing)
+        return jsonify({'success': False, 'message': f'Error fetching {listing}.'}), 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+    
+
+from datetime import datetime
+
+@admin_bp.route('/reply-message/<int:message_id>', methods=['POST'])
+def reply_message(message_id):
+    data = request.get_json()
+    reply = data.get('reply', '')
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        bulk.reply_messages(cursor, [message_id], reply)
+        conn.commit()
+
+        return jsonify({'success': True, 'message': 'Reply saved successfully.'})
+
+    except Exception as e:
+        log.exception("Error replying to message")
+        return jsonify({'success': False, 'message': 'Failed to save reply.'})
+
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+@admin_bp.route('/delete-message/<int:message_id>', methods=['DELETE'])
+def delete_message(message_id):
+    try:
+        connection = get_connection()
+        cursor = connection.cursor()
+
+        bulk.delete_messages(cursor, [message_id])
+        connection.commit()
+
+        return jsonify({'success': True, 'message': 'Message deleted successfully!'})
+    except Exception as e:
+        log.exception("Error deleting message")
+        return jsonify({'success': False, 'message': 'Failed to delete message'})
+    finally:
+        if cursor: cursor.close()
+        if connection: connection.close()
+
+# Bulk jobs: POST /admin/bulk/messages/delete {"ids": [...]} or {"filter": {"q": "spam", "unreplied": "1"}}
+# ?stream=1 streams one NDJSON progress line per committed chunk
+@admin_bp.route('/bulk/<table>/<action>', methods=['POST'])
+def bulk_action(table, action):
+    try:
+        job = bulk.BulkJob(table, action, request.get_json(silent=True))
+    except bulk.BulkError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    conn = get_connection()
+    if request.args.get('stream') in ('1', 'true', 'yes'):
+        def generate():
+            progress = None
+            try:
+                for progress in job.run(conn):
+                    yield json.dumps(progress) + '\n'
+                yield json.dumps({'success': True, **progress}) + '\n'
+            except Exception:
+                log.exception("Bulk %s of %s failed", action, table)
+                yield json.dumps({'success': False, 'message': f'Bulk {action} failed', **(progress or {})}) + '\n'
+
+        response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        response.call_on_close(conn.close)
+        return response
+
+    try:
+        progress = None
+        for progress in job.run(conn):
+            pass
+        return jsonify({'success': True, **progress})
+    except Exception as e:
+        log.exception("Bulk %s of %s failed", action, table)
+        return jsonify({'success': False, 'message': f'Bulk {action} failed'}), 500
+    finally:
+        conn.close()
@@ -0,0 +1,175 @@
+from datetime import date, datetime, timedelta
+
+from db import rebuilding
+
+GRANULARITIES = ('day', 'week', 'month')
+# How far back a query reaches when no start date is given
+DEFAULT_SPAN = {'day': timedelta(days=30), 'week': timedelta(weeks=26), 'month': timedelta(days=365)}
+
+AGE_BANDS = (
+    (0, 17, 'under-18'),
+    (18, 24, '18-24'),
+    (25, 34, '25-34'),
+    (35, 44, '35-44'),
+    (45, 54, '45-54'),
+    (55, 64, '55-64'),
+    (65, 200, '65+')
+)
+UNKNOWN = 'unknown'
+
+
+class AnalyticsError(ValueError):
+    """Bad granularity, date or filter in an analytics request."""
+
+
+def age_band(age):
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return UNKNOWN
+    for low, high, band in AGE_BANDS:
+        if low <= age <= high:
+            return band
+    return UNKNOWN
+
+
+def normalize(value, length=64):
+    value = (value or '').strip().lower()[:length]
+    return value or UNKNOWN
+
+
+def bucket_starts(day):
+    """First day of the day/week (Monday)/month buckets containing `day`."""
+    return {
+        'day': day,
+        'week': day - timedelta(days=day.weekday()),
+        'month': day.replace(day=1)
+    }
+
+
+def record_result(cursor, when, gender, location, age, result, risk_level):
+    """Count one new results row into every rollup bucket, in the caller's transaction."""
+    gender, location, band = normalize(gender), normalize(location), age_band(age)
+    rows = [
+        (granularity, start, gender, location, band, result, risk_level)
+        for granularity, start in bucket_starts(when.date()).items()
+    ]
+    cursor.executemany(
+        "INSERT INTO results_rollup (granularity, bucket_start, gender, location, age_band, result, risk_level, count) "
+        "VALUES (%s, %s, %s, %s, %s, %s, %s, 1) "
+        "ON DUPLICATE KEY UPDATE count = count + 1",
+        rows
+    )
+
+
+def forget_results(cursor, rows):
+    """Take deleted results rows (created_at, gender, location, age, result, risk_level) back out of the rollup.
+
+    Counts stop at zero rather than failing the delete when the rollup has
+    drifted below the table; the next rebuild puts them right.
+    """
+    counts = {}
+    for when, gender, location, age, result, risk_level in rows:
+        gender, location, band = normalize(gender), normalize(location), age_band(age)
+        for granularity, start in bucket_starts(when.date()).items():
+            key = (granularity, start, gender, location, band, result, risk_level)
+            counts[key] = counts.get(key, 0) + 1
+    if counts:
+        cursor.executemany(
+            "UPDATE results_rollup SET count = GREATEST(count, %s) - %s WHERE granularity = %s "
+            "AND bucket_start = %s AND gender = %s AND location = %s AND age_band = %s AND result = %s "
+            "AND risk_level = %s",
+            [(count, count, *key) for key, count in sorted(counts.items())]
+        )
+
+
+def _age_band_sql(column):
+    cases = ' '.join(f"WHEN {column} BETWEEN {low} AND {high} THEN '{band}'" for low, high, band in AGE_BANDS)
+    # age is stored as submitted, so anything non-numeric lands in 'unknown'
+    return f"CASE WHEN {column} REGEXP '^[0-9]+$' THEN CASE {cases} ELSE '{UNKNOWN}' END ELSE '{UNKNOWN}' END"
+
+
+# Executed with parameters, so literal % signs are doubled
+_BUCKET_SQL = {
+    'day': "DATE(created_at)",
+    'week': "DATE(created_at) - INTERVAL WEEKDAY(created_at) DAY",
+    'month': "DATE_FORMAT(created_at, '%%Y-%%m-01')"
+}
+
+
+def rebuild(conn):
+    """Recompute results_rollup from the raw results table (backfill or repair).
+
+    Built in a shadow table and swapped in; new results and rollup reads
+    wait on table locks until it is done.
+    """
+    cursor = conn.cursor()
+    try:
+        with rebuilding(conn, 'results_rollup', sources=('results',)) as shadow:
+            for granularity, bucket in _BUCKET_SQL.items():
+                cursor.execute(f"""
+                    INSERT INTO {shadow} (granularity, bucket_start, gender, location, age_band, result, risk_level, count)
+                    SELECT %s, {bucket},
+                           COALESCE(NULLIF(LOWER(TRIM(gender)), ''), '{UNKNOWN}'),
+                           COALESCE(NULLIF(LEFT(LOWER(TRIM(location)), 64), ''), '{UNKNOWN}'),
+                           {_age_band_sql('TRIM(age)')},
+                           result, risk_level, COUNT(*)
+                    FROM results
+                    GROUP BY 2, 3, 4, 5, 6, 7
+                """, (granularity,))
+    finally:
+        cursor.close()
+
+
+def _parse_day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise AnalyticsError(f"{name} must be a YYYY-MM-DD date")
+
+
+def distribution(cursor, args):
+    """Result and risk-level counts per bucket, read from results_rollup only."""
+    granularity = args.get('granularity') or 'day'
+    if granularity not in GRANULARITIES:
+        raise AnalyticsError(f"granularity must be one of: {', '.join(GRANULARITIES)}")
+
+    end = _parse_day(args['to'], 'to') if args.get('to') else date.today()
+    start = _parse_day(args['from'], 'from') if args.get('from') else end - DEFAULT_SPAN[granularity]
+    # Align to bucket boundaries so partial first buckets are not cut off
+    start = bucket_starts(start)[granularity]
+
+    clauses = ["granularity = %s", "bucket_start BETWEEN %s AND %s"]
+    params = [granularity, start, end]
+    for name in ('gender', 'location'):
+        if args.get(name):
+            clauses.append(f"{name} = %s")
+            params.append(normalize(args[name]))
+    if args.get('age_band'):
+        bands = {band for _, _, band in AGE_BANDS} | {UNKNOWN}
+        if args['age_band'] not in bands:
+            raise AnalyticsError(f"age_band must be one of: {', '.join(sorted(bands))}")
+        clauses.append("age_band = %s")
+        params.append(args['age_band'])
+
+    cursor.execute(
+        "SELECT bucket_start, result, risk_level, SUM(count) AS count FROM results_rollup "
+        f"WHERE {' AND '.join(clauses)} "
+        "GROUP BY bucket_start, result, risk_level ORDER BY bucket_start",
+        tuple(params)
+    )
+
+    buckets = {}
+    for bucket_start, result, risk_level, count in cursor.fetchall():
+        count = int(count)
+        bucket = buckets.setdefault(str(bucket_start), {'bucket': str(bucket_start), 'total': 0, 'results': {}, 'risk_levels': {}})
+        bucket['total'] += count
+        bucket['results'][result] = bucket['results'].get(result, 0) + count
+        bucket['risk_levels'][risk_level] = bucket['risk_levels'].get(risk_level, 0) + count
+
+    return {
+        'granularity': granularity,
+        'from': str(start),
+        'to': str(end),
+        'buckets': list(buckets.values())
+    }
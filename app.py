@@ -1,11 +1,52 @@
-from flask import Flask
-from user_routes import user_bp
-from admin_routes import admin_bp
-
-app=Flask(__name__)
-app.register_blueprint(user_bp)
-app.register_blueprint(admin_bp,url_prefix="/admin")
-app.secret_key = 'your-secret-key-123'
-
-if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+import startup
+import logging
+import os
+from flask import Flask
+from user_routes import user_bp
+from admin_routes import admin_bp
+from counters import counters
+from prediction import registry
+import instrumentation
+import sessions
+import assets
+
+startup.mark('imports')
+
+app=Flask(__name__)
+app.register_blueprint(user_bp)
+app.register_blueprint(admin_bp,url_prefix="/admin")
+app.secret_key = 'your-secret-key-123'
+# Session data lives server-side; the cookie only carries an opaque id
+sessions.init_app(app)
+
+# Structured, queue-backed logging plus request/DB/inference/render metrics on /metrics
+instrumentation.setup_logging()
+instrumentation.init_app(app)
+
+# Content-hashed, precompressed static files from static/dist when built (python assets.py)
+assets.init_app(app)
+
+startup.mark('app')
+
+# Compile every template up front; with preload_app the forked workers inherit them
+assets.warm_templates(app)
+startup.mark('templates')
+
+
+def start_background_jobs():
+    # A forked worker needs its own log listener thread; a no-op in the process that set logging up
+    instrumentation.setup_logging()
+    # Periodically recompute the admin counters to repair any drift
+    counters.start_reconciler()
+    # Hot-swap new model artifacts dropped into models/ without a restart
+    registry.start_watcher()
+
+
+# Threads do not survive fork, so gunicorn.conf.py defers these to each worker
+if os.environ.get("INSIGHTIFY_DEFER_BACKGROUND_JOBS", "0") != "1":
+    start_background_jobs()
+
+logging.getLogger(__name__).info("Startup: %s", startup.report())
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=5001, debug=True)
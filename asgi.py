@@ -0,0 +1,248 @@
+"""ASGI entry point for production serving.
+
+    uvicorn asgi:app --workers 4 --port 5001
+    gunicorn -k uvicorn.workers.UvicornWorker -c gunicorn.conf.py asgi:app
+
+Connections, request bodies and response streaming are handled on the
+event loop, so idle keep-alive sockets, slow uploads and slow readers
+cost no threads. Only the Flask handler itself, with its blocking MySQL
+calls, runs on a bounded thread pool sized to the DB pool. Requests
+beyond INSIGHTIFY_ASGI_MAX_CONCURRENCY get an immediate 503 instead of
+queueing without limit. On shutdown new requests are refused, in-flight
+ones get INSIGHTIFY_ASGI_SHUTDOWN_TIMEOUT seconds to finish, and the
+write-behind queues are flushed.
+"""
+import asyncio
+import contextvars
+import io
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Background jobs start from the lifespan handler, once per worker process
+os.environ.setdefault("INSIGHTIFY_DEFER_BACKGROUND_JOBS", "1")
+
+from app import app as flask_app, start_background_jobs  # noqa: E402
+from db import pool_config  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+# Threads running Flask handlers; more than the DB pool can serve would only wait on it
+THREADS = int(os.environ.get("INSIGHTIFY_ASGI_THREADS", pool_config['size'] + pool_config['max_overflow']))
+# Requests in flight (running or waiting for a thread) before new ones are turned away
+MAX_CONCURRENCY = int(os.environ.get("INSIGHTIFY_ASGI_MAX_CONCURRENCY", 512))
+MAX_BODY = int(os.environ.get("INSIGHTIFY_ASGI_MAX_BODY", 16 * 2 ** 20))
+SHUTDOWN_TIMEOUT = float(os.environ.get("INSIGHTIFY_ASGI_SHUTDOWN_TIMEOUT", 30))
+# A handler thread hands back response data in pieces of at least this size
+CHUNK_BYTES = 64 * 1024
+# _read_body results other than a complete body
+TOO_LARGE = object()
+DISCONNECTED = object()
+
+
+def _plain(status, message, headers=()):
+    body = message.encode()
+    return status, [(b'content-type', b'text/plain; charset=utf-8'),
+                    (b'content-length', str(len(body)).encode()), *headers], body
+
+
+class WSGIBridge:
+    """Serves a WSGI app over ASGI, running the app on a bounded thread pool."""
+
+    def __init__(self, wsgi_app, threads=THREADS, max_concurrency=MAX_CONCURRENCY, max_body=MAX_BODY,
+                 shutdown_timeout=SHUTDOWN_TIMEOUT, on_startup=(), on_shutdown=()):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='asgi-handler')
+        self.threads = threads
+        self.max_concurrency = max_concurrency
+        self.max_body = max_body
+        self.shutdown_timeout = shutdown_timeout
+        self.on_startup = list(on_startup)
+        self.on_shutdown = list(on_shutdown)
+        self.in_flight = 0
+        self.draining = False
+        self._idle = None
+        self.stats = {'requests': 0, 'rejected': 0, 'too_large': 0, 'disconnects': 0}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'websocket':
+            await send({'type': 'websocket.close', 'code': 1000})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    for hook in self.on_startup:
+                        hook()
+                except Exception as e:
+                    log.exception("ASGI startup failed")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.drain()
+                loop = asyncio.get_running_loop()
+                for hook in self.on_shutdown:
+                    try:
+                        await loop.run_in_executor(None, hook)
+                    except Exception:
+                        log.exception("ASGI shutdown hook failed")
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def drain(self):
+        """Refuse new requests and wait up to shutdown_timeout for in-flight ones."""
+        self.draining = True
+        if self.in_flight:
+            log.info("Draining %d in-flight requests", self.in_flight)
+            self._idle = self._idle or asyncio.Event()
+            try:
+                await asyncio.wait_for(self._idle.wait(), self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                log.warning("Shutdown timeout with %d requests still running", self.in_flight)
+
+    async def _respond(self, send, status, headers, body):
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _http(self, scope, receive, send):
+        if self.draining:
+            return await self._respond(send, *_plain(503, 'Server is shutting down', [(b'connection', b'close')]))
+        if self.in_flight >= self.max_concurrency:
+            self.stats['rejected'] += 1
+            return await self._respond(send, *_plain(503, 'Server is busy, please retry', [(b'retry-after', b'1')]))
+
+        self.in_flight += 1
+        self.stats['requests'] += 1
+        try:
+            body = await self._read_body(receive)
+            if body is DISCONNECTED:
+                # Nobody to answer, and a partial body must never reach a handler
+                self.stats['disconnects'] += 1
+                return
+            if body is TOO_LARGE:
+                self.stats['too_large'] += 1
+                return await self._respond(send, *_plain(413, 'Request body too large'))
+            await self._run(scope, body, send)
+        finally:
+            self.in_flight -= 1
+            if self.draining and not self.in_flight and self._idle:
+                self._idle.set()
+
+    async def _read_body(self, receive):
+        # The whole body is read here, so a slow upload never holds a handler thread
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return DISCONNECTED
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body:
+                return TOO_LARGE
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    def _environ(self, scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode('latin-1'),
+            'PATH_INFO': scope['path'].encode().decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1] or 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', ()):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE':
+                environ['CONTENT_TYPE'] = value
+            elif name != 'CONTENT_LENGTH':
+                key = f'HTTP_{name}'
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def _run(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get('sent'):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+        def pull(iterator):
+            # Gather output until CHUNK_BYTES or the end, so most responses take one thread hop
+            chunks, size = [], 0
+            for chunk in iterator:
+                if chunk:
+                    chunks.append(chunk)
+                    size += len(chunk)
+                if size >= CHUNK_BYTES:
+                    return b''.join(chunks), False
+            return b''.join(chunks), True
+
+        def begin():
+            result = self.wsgi_app(self._environ(scope, body), start_response)
+            iterator = iter(result)
+            return result, iterator, pull(iterator)
+
+        # Every step runs in one context, so Flask's request context follows a streamed
+        # response from thread to thread (the steps are sequential, never concurrent)
+        context = contextvars.copy_context()
+        result, iterator, (chunk, done) = await loop.run_in_executor(self.executor, context.run, begin)
+        try:
+            response['sent'] = True
+            await send({'type': 'http.response.start', 'status': response['status'], 'headers': response['headers']})
+            while True:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': not done})
+                if done:
+                    break
+                chunk, done = await loop.run_in_executor(self.executor, context.run, pull, iterator)
+        except OSError:
+            # Client went away mid-response; closing the iterator below releases what it held
+            self.stats['disconnects'] += 1
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, context.run, result.close)
+
+    def status(self):
+        return {'threads': self.threads, 'max_concurrency': self.max_concurrency, 'in_flight': self.in_flight,
+                'draining': self.draining, **self.stats}
+
+
+def _flush_writers():
+    from result_writer import result_writer
+    from contact_intake import contact_intake
+
+    started = time.perf_counter()
+    result_writer.stop()
+    contact_intake.writer.stop()
+    log.info("Write-behind queues flushed in %.2fs", time.perf_counter() - started)
+
+
+app = WSGIBridge(flask_app, on_startup=[start_background_jobs], on_shutdown=[_flush_writers])
@@ -0,0 +1,288 @@
+"""Fingerprinted, precompressed static assets and template warm-up.
+
+`python assets.py` copies static/css, static/js and static/img into
+static/dist under content-hashed names, writes .gz (and .br when the
+brotli package is installed) siblings for text assets, and, when Pillow
+is installed, resized and WebP variants of the images. It ends by writing
+static/dist/manifest.json.
+
+At runtime init_app() rewrites url_for('static', filename=...) to the
+hashed copy from the manifest. It also takes over the static view. Hashed
+files are served with a one-year immutable Cache-Control, the hash as
+ETag, and the smallest encoding or image format the client accepts.
+Anything else falls back to the plain file with a short max-age. Files
+that are not in the manifest (including everything before the first
+build) are served exactly as before.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+from flask import request, send_from_directory
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+log = logging.getLogger(__name__)
+
+FORMAT = 1
+DIST = 'dist'
+SOURCE_DIRS = ('img', 'css', 'js')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt')
+RESIZABLE = ('.png', '.jpg', '.jpeg')
+# Widths generated for srcset; only those narrower than the original are kept
+WIDTHS = (320, 640, 960)
+WEBP_QUALITY = 80
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Cache lifetime for static files served without a content hash
+STATIC_MAX_AGE = int(os.environ.get("INSIGHTIFY_STATIC_MAX_AGE", 3600))
+# Compiled templates are kept here across restarts; empty disables the bytecode cache
+TEMPLATE_CACHE_DIR = os.environ.get("INSIGHTIFY_TEMPLATE_CACHE_DIR", ".jinja_cache")
+
+_CSS_URL = re.compile(r"""url\(\s*(['"]?)/static/([^'")?#]+)\1\s*\)""")
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _hashed_name(path, digest, suffix=''):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{suffix}{ext}"
+
+
+def _write(out_dir, name, data):
+    target = os.path.join(out_dir, name)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as out:
+        out.write(data)
+
+
+def _compress(out_dir, name, data, manifest):
+    # mtime=0 keeps the .gz byte-identical across builds
+    encodings = {'gzip': ('.gz', lambda raw: gzip.compress(raw, 9, mtime=0))}
+    try:
+        import brotli
+        encodings['br'] = ('.br', lambda raw: brotli.compress(raw, quality=11))
+    except ImportError:
+        pass
+    kept = []
+    for encoding, (ext, compress) in encodings.items():
+        packed = compress(data)
+        if len(packed) < len(data):
+            _write(out_dir, name + ext, packed)
+            kept.append(encoding)
+    if kept:
+        manifest['encodings'][name] = sorted(kept)  # 'br' sorts first and is preferred
+
+
+def _image_variants(out_dir, logical, name, data, digest, manifest):
+    """Resized and WebP variants of one image; False when Pillow is missing."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return False
+    import io
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    def webp(img):
+        buffer = io.BytesIO()
+        img.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+        return buffer.getvalue()
+
+    def save_as_source(img):
+        buffer = io.BytesIO()
+        if name.lower().endswith(('.jpg', '.jpeg')):
+            img.convert('RGB').save(buffer, 'JPEG', quality=85, optimize=True, progressive=True)
+        else:
+            img.save(buffer, 'PNG', optimize=True)
+        return buffer.getvalue()
+
+    full_webp = webp(image)
+    if len(full_webp) < len(data):
+        webp_name = os.path.splitext(name)[0] + '.webp'
+        _write(out_dir, webp_name, full_webp)
+        manifest['webp'][name] = webp_name
+
+    srcset = []
+    for width in WIDTHS:
+        if width >= image.width:
+            continue
+        resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        variant = _hashed_name(logical, digest, f'.w{width}')
+        _write(out_dir, variant, save_as_source(resized))
+        variant_webp = os.path.splitext(variant)[0] + '.webp'
+        _write(out_dir, variant_webp, webp(resized))
+        manifest['webp'][variant] = variant_webp
+        srcset.append((width, variant))
+    if srcset:
+        manifest['srcset'][logical] = srcset + [(image.width, name)]
+    return True
+
+
+def build(static_dir='static', out_name=DIST):
+    """Build static/<out_name> and its manifest; the previous build is replaced atomically."""
+    manifest = {'format': FORMAT, 'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'assets': {}, 'encodings': {}, 'webp': {}, 'srcset': {}}
+    out_path = os.path.join(static_dir, out_name)
+    tmp_dir = tempfile.mkdtemp(dir=static_dir, prefix='.assets-')
+    resized = True
+    try:
+        # Images first, so stylesheets can point at their hashed names
+        for source in SOURCE_DIRS:
+            for root, _, files in os.walk(os.path.join(static_dir, source)):
+                for filename in sorted(files):
+                    path = os.path.join(root, filename)
+                    logical = os.path.relpath(path, static_dir).replace(os.sep, '/')
+                    with open(path, 'rb') as file:
+                        data = file.read()
+                    if logical.endswith('.css'):
+                        data = _CSS_URL.sub(
+                            lambda m: f"url({m.group(1)}/static/{out_name}/{manifest['assets'][m.group(2)]}{m.group(1)})"
+                            if m.group(2) in manifest['assets'] else m.group(0),
+                            data.decode('utf-8')).encode('utf-8')
+
+                    digest = _digest(data)
+                    name = _hashed_name(logical, digest)
+                    _write(tmp_dir, name, data)
+                    manifest['assets'][logical] = name
+                    if logical.lower().endswith(COMPRESSIBLE):
+                        _compress(tmp_dir, name, data, manifest)
+                    elif logical.lower().endswith(RESIZABLE):
+                        resized = _image_variants(tmp_dir, logical, name, data, digest, manifest) and resized
+        if not resized:
+            log.warning("Pillow is not installed; images were fingerprinted without resized or WebP variants")
+
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w') as out:
+            json.dump(manifest, out, indent=2, sort_keys=True)
+        old = None
+        if os.path.exists(out_path):
+            old = out_path + '.old'
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(out_path, old)
+        os.replace(tmp_dir, out_path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return manifest
+
+
+class Assets:
+    """The manifest of the last build, and the view that serves it."""
+
+    def __init__(self):
+        self.manifest = {'assets': {}, 'encodings': {}, 'webp': {}, 'srcset': {}}
+        self.static_folder = None
+
+    def load(self, static_folder):
+        self.static_folder = static_folder
+        path = os.path.join(static_folder, DIST, 'manifest.json')
+        try:
+            with open(path) as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            log.info("No asset manifest at %s; serving static files unhashed (run 'python assets.py')", path)
+            return
+        if manifest.get('format') != FORMAT:
+            log.warning("Ignoring %s: format %s, expected %s", path, manifest.get('format'), FORMAT)
+            return
+        self.manifest = manifest
+
+    def url_defaults(self, endpoint, values):
+        if endpoint == 'static':
+            hashed = self.manifest['assets'].get(values.get('filename'))
+            if hashed:
+                values['filename'] = f'{DIST}/{hashed}'
+
+    def srcset(self, filename, sizes='100vw'):
+        """srcset and sizes attributes for an <img>, empty when it has no resized variants."""
+        variants = self.manifest['srcset'].get(filename)
+        if not variants:
+            return Markup('')
+        candidates = ', '.join(f"/static/{DIST}/{name} {width}w" for width, name in variants)
+        return Markup('srcset="{}" sizes="{}"').format(candidates, sizes)
+
+    def send(self, filename):
+        prefix = DIST + '/'
+        if not filename.startswith(prefix) or filename == prefix + 'manifest.json':
+            return send_from_directory(self.static_folder, filename, max_age=STATIC_MAX_AGE)
+
+        name = filename[len(prefix):]
+        dist = os.path.join(self.static_folder, DIST)
+        served, encoding, vary = name, None, None
+        if name in self.manifest['webp']:
+            vary = 'Accept'
+            if 'image/webp' in request.headers.get('Accept', ''):
+                served = self.manifest['webp'][name]
+        elif name in self.manifest['encodings']:
+            vary = 'Accept-Encoding'
+            accepted = request.accept_encodings
+            encoding = next((e for e in self.manifest['encodings'][name] if accepted[e]), None)
+            if encoding:
+                served = name + ('.br' if encoding == 'br' else '.gz')
+
+        response = send_from_directory(dist, served, mimetype=mimetypes.guess_type(served if not encoding else name)[0],
+                                       max_age=31536000, etag=_etag(served), conditional=True)
+        response.headers['Cache-Control'] = IMMUTABLE
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        if vary:
+            response.vary.add(vary)
+        return response
+
+
+def _etag(name):
+    # Hashed names are content addresses already; the suffix tells encodings and formats apart
+    return name.rsplit('/', 1)[-1]
+
+
+assets = Assets()
+
+
+def send_static(filename):
+    return assets.send(filename)
+
+
+def init_app(app):
+    assets.load(app.static_folder)
+    app.url_defaults(assets.url_defaults)
+    app.view_functions['static'] = send_static
+    app.jinja_env.globals['asset_srcset'] = assets.srcset
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+
+
+def warm_templates(app):
+    """Compile every template now, so no request (or forked worker) pays for it."""
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+
+def main():
+    start = time.perf_counter()
+    static_dir = sys.argv[1] if len(sys.argv) > 1 else 'static'
+    manifest = build(static_dir)
+    print(f"Built {len(manifest['assets'])} assets, {len(manifest['encodings'])} precompressed, "
+          f"{len(manifest['webp'])} WebP variants into {os.path.join(static_dir, DIST)} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import jsonify
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+from db import connection
+
+log = logging.getLogger(__name__)
+
+# Login attempts allowed per client IP, and failed logins per account, within the window
+LOGIN_IP_LIMIT = int(os.environ.get("INSIGHTIFY_LOGIN_IP_LIMIT", 20))
+LOGIN_ACCOUNT_LIMIT = int(os.environ.get("INSIGHTIFY_LOGIN_ACCOUNT_LIMIT", 5))
+LOGIN_WINDOW = float(os.environ.get("INSIGHTIFY_LOGIN_WINDOW", 300))
+SIGNUP_IP_LIMIT = int(os.environ.get("INSIGHTIFY_SIGNUP_IP_LIMIT", 10))
+SIGNUP_WINDOW = float(os.environ.get("INSIGHTIFY_SIGNUP_WINDOW", 3600))
+# Keys tracked per limiter before the least recently seen are evicted
+LIMITER_MAX_KEYS = int(os.environ.get("INSIGHTIFY_LIMITER_MAX_KEYS", 100000))
+
+# Hashing runs on this many threads (hashlib releases the GIL while it works)
+HASH_WORKERS = int(os.environ.get("INSIGHTIFY_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+# Hash jobs allowed to wait for a worker before new ones are turned away
+HASH_MAX_PENDING = int(os.environ.get("INSIGHTIFY_HASH_MAX_PENDING", 32))
+HASH_TIMEOUT = float(os.environ.get("INSIGHTIFY_HASH_TIMEOUT", 10))
+# werkzeug method string; stored hashes with other parameters are upgraded on login
+HASH_METHOD = os.environ.get("INSIGHTIFY_PASSWORD_HASH_METHOD", "scrypt")
+
+_METHOD_DEFAULTS = {
+    'scrypt': ('scrypt', '32768', '8', '1'),
+    'pbkdf2': ('pbkdf2', 'sha256', str(DEFAULT_PBKDF2_ITERATIONS))
+}
+
+
+class HashingBusy(RuntimeError):
+    """Every hashing worker is busy and the wait queue is full, or a check timed out."""
+
+
+class SlidingWindowLimiter:
+    """Allows `limit` events per key within any `window` seconds.
+
+    Keeps a deque of event times per key; the least recently used keys
+    are evicted once more than `max_keys` are tracked, so memory stays
+    bounded under address or account spraying.
+    """
+
+    def __init__(self, limit, window, max_keys=LIMITER_MAX_KEYS):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._events = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _prune(self, key, now):
+        events = self._events.get(key)
+        if events is None:
+            return None
+        while events and events[0] <= now - self.window:
+            events.popleft()
+        if not events:
+            del self._events[key]
+            return None
+        self._events.move_to_end(key)
+        return events
+
+    def retry_after(self, key):
+        """Seconds until `key` may act again, 0 when it is under the limit."""
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None or len(events) < self.limit:
+                return 0
+            return max(1, int(events[0] + self.window - now + 1))
+
+    def add(self, key):
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(key, now)
+            if events is None:
+                events = self._events[key] = deque()
+                while len(self._events) > self.max_keys:
+                    self._events.popitem(last=False)
+            events.append(now)
+
+    def hit(self, key):
+        """Record an event unless over the limit; returns retry_after() as it was."""
+        wait = self.retry_after(key)
+        if not wait:
+            self.add(key)
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._events.pop(key, None)
+
+    def __len__(self):
+        return len(self._events)
+
+
+class LoginThrottle:
+    """Per-IP attempt limit plus per-account failure limit for one login form."""
+
+    def __init__(self, ip_limit=LOGIN_IP_LIMIT, account_limit=LOGIN_ACCOUNT_LIMIT, window=LOGIN_WINDOW):
+        self.ip = SlidingWindowLimiter(ip_limit, window)
+        self.account = SlidingWindowLimiter(account_limit, window)
+
+    def check(self, ip, account):
+        """Count the attempt against the IP; returns seconds to wait, 0 if allowed."""
+        wait = self.account.retry_after(account)
+        if wait:
+            return wait
+        return self.ip.hit(ip)
+
+    def failed(self, account):
+        self.account.add(account)
+
+    def succeeded(self, account):
+        self.account.reset(account)
+
+
+def full_method(method):
+    """Spell out werkzeug's defaults, e.g. 'scrypt' -> 'scrypt:32768:8:1'."""
+    parts = method.split(':')
+    defaults = _METHOD_DEFAULTS.get(parts[0], ())
+    return ':'.join(parts + list(defaults[len(parts):]))
+
+
+class PasswordHasher:
+    """Runs password hashing on a bounded thread pool.
+
+    Request threads wait on the result, but at most `workers` hashes run
+    at once and at most `max_pending` wait behind them; beyond that
+    HashingBusy is raised at once so a login burst cannot pin every
+    request thread. A wait longer than `timeout` raises HashingBusy too.
+    Callers should not hold a pooled DB connection while they wait.
+    """
+
+    def __init__(self, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING, timeout=HASH_TIMEOUT, method=HASH_METHOD):
+        self.method = full_method(method)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'timed_out': 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key):
+        # Bumped from every request thread
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count('rejected')
+            raise HashingBusy("Too many password checks in progress")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FutureTimeout:
+            # The hash finishes in the background and frees its slot then
+            self._count('timed_out')
+            raise HashingBusy(f"Password check took longer than {self.timeout}s")
+
+    def hash(self, password):
+        self._count('hashed')
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        self._count('verified')
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        return stored_hash.split('$', 1)[0] != self.method
+
+    def upgrade(self, table, row_id, stored_hash, password):
+        """After a successful login, re-hash with the current method if the stored one differs.
+
+        The new hash is computed before a connection is borrowed to store it.
+        Best effort: a failure is logged and the old hash kept, so it never
+        fails the login itself; the next login tries again.
+        """
+        if table not in ('users', 'admins') or not self.needs_rehash(stored_hash):
+            return False
+        try:
+            new_hash = self.hash(password)
+            with connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(f"UPDATE {table} SET password = %s WHERE id = %s", (new_hash, row_id))
+                conn.commit()
+                cursor.close()
+        except Exception:
+            log.exception("Could not upgrade the password hash for %s %s", table, row_id)
+            return False
+        self._count('rehashed')
+        return True
+
+
+def rate_limited(retry_after, message='Too many attempts. Please try again later.'):
+    response = jsonify({'success': False, 'message': message, 'retry_after': retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+def hashing_busy():
+    response = jsonify({'success': False, 'message': 'The server is busy. Please try again shortly.'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+
+hasher = PasswordHasher()
+user_logins = LoginThrottle()
+admin_logins = LoginThrottle()
+signups = SlidingWindowLimiter(SIGNUP_IP_LIMIT, SIGNUP_WINDOW)
@@ -0,0 +1,202 @@
+"""Load and latency benchmark for the Insightify Flask app.
+
+Drives the full assessment flow (signup, login, /test, /submit_test,
+/phase2, /submit_questionnaire) and the admin listings against the `app`
+from app.py, with MySQL replaced by a seeded SQLite stand-in so it runs
+without outside services. Reports throughput, p50/p95/p99 latency and DB
+queries per request for every endpoint.
+
+    python -m benchmarks.run --sessions 200 --concurrency 8
+    python -m benchmarks.run --seed-users 100000 --json bench.json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import sqlite_db  # noqa: E402
+
+PASSWORD = 'Bench@1234'
+QUESTIONS = 9
+OPTIONS = (('Not at all', 0), ('Several days', 1), ('More than half the days', 2), ('Nearly every day', 3))
+
+
+def seed(path, users, messages, doctors):
+    from werkzeug.security import generate_password_hash
+
+    sqlite_db.create_schema(path)
+    db = sqlite3.connect(path)
+    hashed = generate_password_hash(PASSWORD)
+    db.executemany("INSERT INTO users (fullname, email, password) VALUES (?, ?, ?)",
+                   ((f'Seed User {i}', f'seed{i}@example.com', hashed) for i in range(users)))
+    db.executemany("INSERT INTO messages (name, email, content, reply) VALUES (?, ?, ?, ?)",
+                   ((f'Sender {i}', f'sender{i}@example.com', f'Message {i}', 'Thanks' if i % 3 else None)
+                    for i in range(messages)))
+    db.executemany("INSERT INTO doctors (name, specialization, contact_info) VALUES (?, ?, ?)",
+                   ((f'Dr. {i}', random.choice(['Psychiatrist', 'Psychologist', 'Counselor']), f'+977-{i:07d}')
+                    for i in range(doctors)))
+    for q in range(1, QUESTIONS + 1):
+        db.execute("INSERT INTO questions (id, question_text) VALUES (?, ?)", (q, f'PHQ-9 question {q}'))
+        db.executemany("INSERT INTO options (question_id, option_text, value) VALUES (?, ?, ?)",
+                       ((q, text, value) for text, value in OPTIONS))
+    db.execute("INSERT INTO admins (fullname, email, password) VALUES (?, ?, ?)",
+               ('Bench Admin', 'admin@example.com', hashed))
+    db.commit()
+    db.close()
+
+
+def load_app(path, pool_size):
+    # Point the shared pool at SQLite before any route module can connect
+    os.environ.setdefault('INSIGHTIFY_COUNTERS_RECONCILE_INTERVAL', '0')
+    # Every simulated session comes from the same test-client address
+    os.environ.setdefault('INSIGHTIFY_LOGIN_IP_LIMIT', '1000000')
+    os.environ.setdefault('INSIGHTIFY_SIGNUP_IP_LIMIT', '1000000')
+    os.environ.setdefault('INSIGHTIFY_SESSION_DB', os.path.join(os.path.dirname(os.path.abspath(path)), 'sessions.sqlite3'))
+    import db
+    db.pool.connector = sqlite_db.connector(path)
+    db.pool.size = pool_size
+    db.pool.pre_ping = False
+
+    from app import app
+    from counters import counters
+    counters.reconcile()
+    return app
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def call(self, client, label, method, url, expect=(200, 302), **kwargs):
+        sqlite_db.set_label(label)
+        start = time.perf_counter()
+        response = client.open(url, method=method, **kwargs)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[label].append(elapsed)
+            if response.status_code not in expect:
+                self.errors[label] += 1
+        return response
+
+
+def assessment_session(app, recorder, n):
+    client = app.test_client()
+    email = f'bench{n}-{random.getrandbits(32)}@example.com'
+    recorder.call(client, 'POST /signup', 'POST', '/signup',
+                  json={'fullname': f'Bench {n}', 'email': email, 'password': PASSWORD})
+    recorder.call(client, 'POST /login', 'POST', '/login', json={'email': email, 'password': PASSWORD})
+    recorder.call(client, 'GET /test', 'GET', '/test')
+    answers = {f'q{i}': str(random.randint(0, 3)) for i in range(1, QUESTIONS + 1)}
+    recorder.call(client, 'POST /submit_test', 'POST', '/submit_test', data=answers)
+    recorder.call(client, 'GET /phase2', 'GET', '/phase2')
+    recorder.call(client, 'POST /submit_questionnaire', 'POST', '/submit_questionnaire', data={
+        'name': f'Bench {n}', 'age': str(random.randint(16, 70)), 'gender': random.choice(['male', 'female']),
+        'location': random.choice(['Kathmandu', 'Pokhara', 'Lalitpur']), 'interest': 'yes'
+    })
+    recorder.call(client, 'GET /history', 'GET', '/history')
+
+
+def admin_session(app, recorder, n):
+    client = app.test_client()
+    # Signed in directly: password hashing is already measured by the user logins
+    with client.session_transaction() as session:
+        session['admin_id'] = 1
+    for url in ('/admin/users', '/admin/messages', '/admin/doctors', '/admin/get-stats'):
+        recorder.call(client, f'GET {url}', 'GET', url)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+def report(recorder, wall_time):
+    rows = []
+    for label, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        count = len(values)
+        rows.append({
+            'endpoint': label,
+            'requests': count,
+            'errors': recorder.errors.get(label, 0),
+            'throughput_rps': round(count / wall_time, 1),
+            'p50_ms': round(percentile(values, 50) * 1000, 2),
+            'p95_ms': round(percentile(values, 95) * 1000, 2),
+            'p99_ms': round(percentile(values, 99) * 1000, 2),
+            'queries_per_request': round(sqlite_db.query_counts[label] / count, 2)
+        })
+    total = sum(r['requests'] for r in rows)
+    return {'wall_time_s': round(wall_time, 3), 'total_requests': total,
+            'throughput_rps': round(total / wall_time, 1), 'endpoints': rows}
+
+
+def print_report(result):
+    header = f"{'endpoint':<30}{'reqs':>7}{'err':>5}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'q/req':>7}"
+    print(header)
+    print('-' * len(header))
+    for r in result['endpoints']:
+        print(f"{r['endpoint']:<30}{r['requests']:>7}{r['errors']:>5}{r['throughput_rps']:>9}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}{r['queries_per_request']:>7}")
+    print(f"\n{result['total_requests']} requests in {result['wall_time_s']}s "
+          f"({result['throughput_rps']} req/s overall)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=100, help='assessment flows to run')
+    parser.add_argument('--admin-sessions', type=int, default=20, help='admin listing sweeps to run')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent client threads')
+    parser.add_argument('--pool-size', type=int, default=8, help='DB pool size')
+    parser.add_argument('--seed-users', type=int, default=5000)
+    parser.add_argument('--seed-messages', type=int, default=5000)
+    parser.add_argument('--seed-doctors', type=int, default=200)
+    parser.add_argument('--db', help='SQLite file to use (default: a fresh temporary file)')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--json', help='also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    path = args.db or os.path.join(tempfile.mkdtemp(prefix='insightify-bench-'), 'bench.sqlite3')
+    if not os.path.exists(path):
+        print(f"Seeding {path} ...")
+        seed(path, args.seed_users, args.seed_messages, args.seed_doctors)
+
+    app = load_app(path, args.pool_size)
+    recorder = Recorder()
+    sqlite_db.reset_counts()
+
+    jobs = [(assessment_session, n) for n in range(args.sessions)]
+    jobs += [(admin_session, n) for n in range(args.admin_sessions)]
+    random.shuffle(jobs)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(job, app, recorder, n) for job, n in jobs]:
+            future.result()
+    wall_time = time.perf_counter() - start
+
+    result = report(recorder, wall_time)
+    result['config'] = vars(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(result, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+"""HTTP throughput benchmark: the threaded WSGI server against the ASGI entry point.
+
+Starts the app in a child process behind a real socket, using the SQLite
+stand-in with an optional per-statement delay that imitates MySQL round
+trips, and drives it with keep-alive connections over the DB-bound
+listing routes and a few static pages. Reports requests/s and latency
+percentiles, so both servers can be compared with the same worker count.
+
+    python -m benchmarks.serve --server threaded --connections 64
+    python -m benchmarks.serve --server asgi --connections 64 --db-latency-ms 2
+
+The asgi server needs uvicorn installed.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import run, sqlite_db  # noqa: E402
+
+PATHS = (
+    '/admin/api/messages?limit=50',
+    '/admin/api/users?limit=50',
+    '/admin/api/doctors?limit=50',
+    '/admin/get-stats',
+    '/test',
+    '/about',
+)
+
+
+def serve(args):
+    """Child process: run one server until terminated."""
+    sqlite_db.latency = args.db_latency_ms / 1000
+    app = run.load_app(args.db, args.pool_size)
+    if args.server == 'asgi':
+        import uvicorn
+        import asgi
+
+        uvicorn.run(asgi.app, host='127.0.0.1', port=args.port, log_level='warning', lifespan='on')
+    else:
+        from werkzeug.serving import run_simple
+
+        # What app.run() does, minus the debugger and reloader
+        run_simple('127.0.0.1', args.port, app, threaded=True)
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length, close = 0, False
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        name = name.strip().lower()
+        if name == b'content-length':
+            length = int(value)
+        elif name == b'connection' and value.strip().lower() == b'close':
+            close = True
+    await reader.readexactly(length)
+    return status, close or head.startswith(b'HTTP/1.0')
+
+
+def _admin_cookie(port):
+    """Log in as the seeded admin once; returns the session cookie for the admin routes."""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request('POST', '/admin/admin_login', json.dumps({'email': 'admin@example.com', 'password': run.PASSWORD}),
+                      {'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        response.read()
+        if response.status != 200:
+            raise RuntimeError(f"Admin login failed with HTTP {response.status}")
+        return response.getheader('Set-Cookie').split(';', 1)[0]
+    finally:
+        conn.close()
+
+
+async def _client(port, requests, latencies, errors, index, cookie):
+    reader = writer = None
+    for n in range(requests):
+        path = PATHS[(index + n) % len(PATHS)]
+        if writer is None:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        start = time.perf_counter()
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\n\r\n'.encode())
+        try:
+            status, close = await _read_response(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            errors['connection'] = errors.get('connection', 0) + 1
+            writer.close()
+            reader = writer = None
+            continue
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            errors[status] = errors.get(status, 0) + 1
+        if close:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _load(port, connections, requests, cookie):
+    latencies, errors = [], {}
+    per_client = max(1, requests // connections)
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, per_client, latencies, errors, i, cookie) for i in range(connections)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start listening")
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('threaded', 'asgi'), default='asgi')
+    parser.add_argument('--connections', type=int, default=64, help='concurrent keep-alive connections')
+    parser.add_argument('--requests', type=int, default=4000, help='requests in total')
+    parser.add_argument('--warmup', type=int, default=200, help='requests sent before measuring')
+    parser.add_argument('--pool-size', type=int, default=8, help='DB pool size')
+    parser.add_argument('--db-latency-ms', type=float, default=1.0, help='simulated DB round trip per statement')
+    parser.add_argument('--seed-users', type=int, default=5000)
+    parser.add_argument('--seed-messages', type=int, default=5000)
+    parser.add_argument('--seed-doctors', type=int, default=200)
+    parser.add_argument('--db', help='SQLite file to use (default: a fresh temporary file)')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--json', help='also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return serve(args)
+
+    args.db = args.db or os.path.join(tempfile.mkdtemp(prefix='insightify-serve-'), 'bench.sqlite3')
+    if not os.path.exists(args.db):
+        print(f"Seeding {args.db} ...")
+        run.seed(args.db, args.seed_users, args.seed_messages, args.seed_doctors)
+    args.port = args.port or _free_port()
+
+    child = [sys.executable, '-m', 'benchmarks.serve', '--child', '--server', args.server, '--db', args.db,
+             '--port', str(args.port), '--pool-size', str(args.pool_size), '--db-latency-ms', str(args.db_latency_ms)]
+    env = dict(os.environ, INSIGHTIFY_SLOW_REQUEST_MS='100000', INSIGHTIFY_MODEL_WATCH_INTERVAL='0')
+    process = subprocess.Popen(child, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), env=env)
+    try:
+        _wait_for_port(args.port, process)
+        cookie = _admin_cookie(args.port)
+        asyncio.run(_load(args.port, min(args.connections, args.warmup), args.warmup, cookie))
+        latencies, errors, wall_time = asyncio.run(_load(args.port, args.connections, args.requests, cookie))
+    finally:
+        process.terminate()
+        process.wait(30)
+
+    latencies.sort()
+    result = {
+        'server': args.server,
+        'connections': args.connections,
+        'requests': len(latencies),
+        'errors': errors,
+        'wall_time_s': round(wall_time, 2),
+        'throughput_rps': round(len(latencies) / wall_time, 1),
+        'p50_ms': round(run.percentile(latencies, 50) * 1000, 1),
+        'p95_ms': round(run.percentile(latencies, 95) * 1000, 1),
+        'p99_ms': round(run.percentile(latencies, 99) * 1000, 1),
+        'config': {k: v for k, v in vars(args).items() if k != 'child'},
+    }
+    print(f"{args.server}: {result['requests']} requests over {args.connections} connections in "
+          f"{result['wall_time_s']}s = {result['throughput_rps']} req/s "
+          f"(p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, p99 {result['p99_ms']}ms), errors: {errors or 'none'}")
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(result, out, indent=2)
+
+
+if __name__ == '__main__':
+    main()
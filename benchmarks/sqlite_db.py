@@ -0,0 +1,231 @@
+"""SQLite stand-in for mysql.connector, used by the benchmark harness.
+
+Implements the slice of the mysql.connector connection/cursor API the app
+uses (dictionary and buffered cursors, executemany, fetchmany, ping,
+rowcount) and rewrites the MySQL-specific SQL the app issues into SQLite.
+Every executed statement is counted under the label set with
+set_label(), which the harness uses for per-endpoint query counts.
+"""
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+# Mirrors migrations/ (tables and indexes) in SQLite syntax
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fullname TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    date_registered TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_users_date_registered ON users (date_registered, id);
+CREATE INDEX IF NOT EXISTS idx_users_fullname ON users (fullname, id);
+
+CREATE TABLE IF NOT EXISTS admins (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    fullname TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL,
+    content TEXT NOT NULL,
+    reply TEXT,
+    replied_at TIMESTAMP,
+    date_sent TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    is_unread INTEGER GENERATED ALWAYS AS (reply IS NULL OR reply = '') STORED
+);
+CREATE INDEX IF NOT EXISTS idx_messages_date_sent ON messages (date_sent, id);
+CREATE INDEX IF NOT EXISTS idx_messages_email ON messages (email);
+CREATE INDEX IF NOT EXISTS idx_messages_name ON messages (name);
+CREATE INDEX IF NOT EXISTS idx_messages_unread ON messages (is_unread, id);
+CREATE INDEX IF NOT EXISTS idx_messages_unread_date_sent ON messages (is_unread, date_sent, id);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_text TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS options (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL,
+    option_text TEXT NOT NULL,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_options_question ON options (question_id);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    total_score INTEGER NOT NULL,
+    result TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    name TEXT, age TEXT, gender TEXT, location TEXT, interest TEXT,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_results_user_created ON results (user_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_results_risk_level ON results (risk_level);
+
+CREATE TABLE IF NOT EXISTS doctors (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    specialization TEXT NOT NULL,
+    contact_info TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_doctors_name ON doctors (name, id);
+CREATE INDEX IF NOT EXISTS idx_doctors_specialization ON doctors (specialization, id);
+
+CREATE TABLE IF NOT EXISTS admin_counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS results_rollup (
+    granularity TEXT NOT NULL,
+    bucket_start DATE NOT NULL,
+    gender TEXT NOT NULL,
+    location TEXT NOT NULL,
+    age_band TEXT NOT NULL,
+    result TEXT NOT NULL,
+    risk_level TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, gender, location, age_band, result, risk_level)
+);
+
+CREATE TABLE IF NOT EXISTS user_result_summary (
+    user_id INTEGER PRIMARY KEY,
+    assessments INTEGER NOT NULL DEFAULT 0,
+    first_at TIMESTAMP NOT NULL,
+    last_at TIMESTAMP NOT NULL,
+    last_score INTEGER NOT NULL,
+    last_risk_level TEXT NOT NULL,
+    score_sum INTEGER NOT NULL DEFAULT 0,
+    ewma REAL NOT NULL,
+    sum_t REAL NOT NULL DEFAULT 0,
+    sum_tt REAL NOT NULL DEFAULT 0,
+    sum_ty REAL NOT NULL DEFAULT 0
+);
+"""
+
+_local = threading.local()
+_lock = threading.Lock()
+query_counts = Counter()
+# Seconds each statement sleeps, to stand in for the network round trip to a MySQL server
+latency = 0.0
+
+
+def set_label(label):
+    _local.label = label
+
+
+def reset_counts():
+    with _lock:
+        query_counts.clear()
+
+
+def _translate(sql):
+    sql = sql.replace('%s', '?').replace('%%', '%')
+    sql = re.sub(r'\s+FOR UPDATE\b', '', sql)
+    sql = re.sub(r'\bGREATEST\(', 'MAX(', sql)
+    sql = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', sql)
+    sql = sql.replace('ON DUPLICATE KEY UPDATE', 'ON CONFLICT DO UPDATE SET')
+    return sql
+
+
+class Cursor:
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn._db.cursor()
+        self._dictionary = dictionary
+
+    def _count(self):
+        label = getattr(_local, 'label', 'other')
+        with _lock:
+            query_counts[label] += 1
+        if latency:
+            time.sleep(latency)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cursor.description, row)}
+
+    def execute(self, sql, params=()):
+        self._count()
+        self._cursor.execute(_translate(sql), tuple(params or ()))
+
+    def executemany(self, sql, rows):
+        self._count()
+        self._cursor.executemany(_translate(sql), [tuple(r) for r in rows])
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        return (self._row(r) for r in self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                   detect_types=sqlite3.PARSE_DECLTYPES)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._open = True
+
+    def cursor(self, dictionary=False, buffered=None, **kwargs):
+        return Cursor(self, dictionary=dictionary)
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def ping(self, reconnect=False):
+        if not self._open:
+            raise sqlite3.ProgrammingError("Connection closed")
+
+    def is_connected(self):
+        return self._open
+
+    def close(self):
+        self._open = False
+        self._db.close()
+
+
+def connector(path):
+    """Return a mysql.connector.connect-compatible factory for a SQLite file."""
+    def connect(**config):
+        return Connection(path)
+    return connect
+
+
+def create_schema(path):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    db.commit()
+    db.close()
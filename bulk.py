@@ -0,0 +1,200 @@
+"""Bulk admin operations over users, messages and doctors.
+
+A job selects rows either by an explicit id list or by the same filters
+as the admin listings (q, date range, unreplied, specialization), and
+applies one action to them in chunks. Each chunk is a handful of
+multi-row statements in one transaction, with the admin counters,
+results rollup and per-user history adjusted alongside, so a job of
+thousands of rows costs a few round trips per CHUNK_SIZE rows instead
+of several per row.
+"""
+import os
+from datetime import datetime
+
+import analytics
+from counters import counters, RESULTS, UNREAD_MESSAGES, USERS, is_unread, risk_counter
+from doctors import invalidate_doctors
+from pagination import users_listing, messages_listing, doctors_listing
+
+CHUNK_SIZE = int(os.environ.get("INSIGHTIFY_BULK_CHUNK_SIZE", 500))
+MAX_IDS = int(os.environ.get("INSIGHTIFY_BULK_MAX_IDS", 10000))
+
+
+class BulkError(ValueError):
+    """Unknown action, or a bad id list or filter in a bulk request."""
+
+
+def _in(ids):
+    return ', '.join(['%s'] * len(ids))
+
+
+def delete_users(cursor, ids):
+    """Delete users along with their results, keeping counters, rollup and history in step."""
+    cursor.execute(
+        f"SELECT created_at, gender, location, age, result, risk_level FROM results "
+        f"WHERE user_id IN ({_in(ids)}) FOR UPDATE",
+        tuple(ids)
+    )
+    results = cursor.fetchall()
+    if results:
+        cursor.execute(f"DELETE FROM results WHERE user_id IN ({_in(ids)})", tuple(ids))
+        # Counters before rollup, in the same order as result_writer.write_results, so the two cannot deadlock
+        counters.incr(cursor, RESULTS, -len(results))
+        per_risk = {}
+        for row in results:
+            per_risk[row[5]] = per_risk.get(row[5], 0) + 1
+        for risk_level, count in sorted(per_risk.items()):
+            counters.incr(cursor, risk_counter(risk_level), -count)
+        analytics.forget_results(cursor, results)
+    cursor.execute(f"DELETE FROM user_result_summary WHERE user_id IN ({_in(ids)})", tuple(ids))
+
+    cursor.execute(f"DELETE FROM users WHERE id IN ({_in(ids)})", tuple(ids))
+    deleted = cursor.rowcount
+    counters.incr(cursor, USERS, -deleted)
+    return {'users': deleted, 'results': len(results)}
+
+
+def delete_messages(cursor, ids):
+    # Lock the rows so the unread counter moves exactly once per message
+    cursor.execute(f"SELECT reply FROM messages WHERE id IN ({_in(ids)}) FOR UPDATE", tuple(ids))
+    unread = sum(is_unread(row[0]) for row in cursor.fetchall())
+    cursor.execute(f"DELETE FROM messages WHERE id IN ({_in(ids)})", tuple(ids))
+    counters.incr(cursor, UNREAD_MESSAGES, -unread)
+    return {'messages': cursor.rowcount}
+
+
+def reply_messages(cursor, ids, reply):
+    cursor.execute(f"SELECT reply FROM messages WHERE id IN ({_in(ids)}) FOR UPDATE", tuple(ids))
+    rows = cursor.fetchall()
+    cursor.execute(f"UPDATE messages SET reply = %s, replied_at = %s WHERE id IN ({_in(ids)})",
+                   (reply, datetime.now(), *ids))
+    counters.incr(cursor, UNREAD_MESSAGES, is_unread(reply) * len(rows) - sum(is_unread(row[0]) for row in rows))
+    return {'messages': len(rows)}
+
+
+def delete_doctors(cursor, ids):
+    cursor.execute(f"DELETE FROM doctors WHERE id IN ({_in(ids)})", tuple(ids))
+    return {'doctors': cursor.rowcount}
+
+
+# Caches to drop once a change to the table is committed
+AFTER_COMMIT = {
+    'doctors': invalidate_doctors
+}
+
+# (table, action) -> (listing whose filters select rows, function, extra body fields it takes)
+ACTIONS = {
+    ('users', 'delete'): (users_listing, delete_users, ()),
+    ('messages', 'delete'): (messages_listing, delete_messages, ()),
+    ('messages', 'reply'): (messages_listing, reply_messages, ('reply',)),
+    ('doctors', 'delete'): (doctors_listing, delete_doctors, ())
+}
+
+
+def _ids(value):
+    if not isinstance(value, list) or not value:
+        raise BulkError("ids must be a non-empty list of integers")
+    if len(value) > MAX_IDS:
+        raise BulkError(f"At most {MAX_IDS} ids per request; use a filter for larger jobs")
+    if not all(isinstance(i, int) and not isinstance(i, bool) for i in value):
+        raise BulkError("ids must be a non-empty list of integers")
+    return sorted(set(value))
+
+
+class BulkJob:
+    """One validated bulk request; run() applies it chunk by chunk."""
+
+    def __init__(self, table, action, body, chunk_size=CHUNK_SIZE):
+        if (table, action) not in ACTIONS:
+            raise BulkError(f"Unknown bulk action '{action}' on '{table}'")
+        if not isinstance(body, dict):
+            raise BulkError("Expected a JSON object with 'ids' or 'filter'")
+        self.listing, self.apply, fields = ACTIONS[(table, action)]
+        self.table, self.action = table, action
+        requested = body.get('chunk_size') or chunk_size
+        if not isinstance(requested, int) or isinstance(requested, bool):
+            raise BulkError("chunk_size must be an integer")
+        self.chunk_size = max(1, min(requested, MAX_IDS))
+        # One transaction for the whole job instead of one per chunk
+        self.atomic = bool(body.get('atomic'))
+        self.extra = []
+        for field in fields:
+            if not isinstance(body.get(field), str):
+                raise BulkError(f"'{field}' must be a string")
+            self.extra.append(body[field])
+
+        if ('ids' in body) == ('filter' in body):
+            raise BulkError("Give exactly one of 'ids' or 'filter'")
+        self.ids = self.clauses = self.params = None
+        if 'ids' in body:
+            self.ids = _ids(body['ids'])
+        else:
+            if not isinstance(body['filter'], dict):
+                raise BulkError("filter must be an object of listing filters")
+            try:
+                clauses, params = self.listing.filters(body['filter'])
+            except ValueError as e:
+                raise BulkError(str(e))
+            if not clauses:
+                # An empty filter would select the whole table
+                raise BulkError("filter matches every row; give at least one condition")
+            self.clauses, self.params = list(clauses), list(params)
+
+    def count(self, cursor):
+        if self.ids is not None:
+            return len(self.ids)
+        cursor.execute(f"SELECT COUNT(*) FROM {self.table} WHERE {' AND '.join(self.clauses)}", tuple(self.params))
+        return int(cursor.fetchone()[0])
+
+    def _chunks(self, cursor):
+        if self.ids is not None:
+            for start in range(0, len(self.ids), self.chunk_size):
+                yield self.ids[start:start + self.chunk_size]
+            return
+        # Keyset over id, re-queried after each chunk, so rows deleted or changed meanwhile are skipped
+        last_id = 0
+        while True:
+            cursor.execute(
+                f"SELECT id FROM {self.table} WHERE {' AND '.join(self.clauses)} AND id > %s ORDER BY id LIMIT %s",
+                (*self.params, last_id, self.chunk_size)
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+    def _commit(self, conn):
+        conn.commit()
+        if self.table in AFTER_COMMIT:
+            AFTER_COMMIT[self.table]()
+
+    def run(self, conn):
+        """Apply the job; yields a progress dict after every chunk.
+
+        Chunks are committed as they go unless the job is atomic, in which
+        case nothing is committed until the last one succeeds. On failure
+        the uncommitted work is rolled back and the error re-raised.
+        """
+        cursor = conn.cursor()
+        try:
+            progress = {'table': self.table, 'action': self.action, 'total': self.count(cursor),
+                        'processed': 0, 'chunks': 0, 'affected': {}}
+            for ids in self._chunks(cursor):
+                affected = self.apply(cursor, ids, *self.extra)
+                if not self.atomic:
+                    self._commit(conn)
+                progress['processed'] += len(ids)
+                progress['chunks'] += 1
+                for key, value in affected.items():
+                    progress['affected'][key] = progress['affected'].get(key, 0) + value
+                yield dict(progress, affected=dict(progress['affected']))
+            if self.atomic:
+                self._commit(conn)
+            if not progress['chunks']:
+                yield progress
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
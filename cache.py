@@ -0,0 +1,68 @@
+"""Single-flight read-through cache shared by the questionnaire and doctors caches."""
+import threading
+import time
+
+
+class ReadThroughCache:
+    """One value loaded by `_fetch()`, served for `ttl` seconds per worker.
+
+    Only one thread reloads a stale value; the others wait and reuse its
+    result. Every load or invalidation bumps `version`, and a load that
+    races with an invalidation is served once but not stored.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.version = 0
+        self._entry = None  # (version, loaded_at, value)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _fetch(self):
+        raise NotImplementedError
+
+    def _loaded(self, version, value):
+        """Called under the lock after every load; `version` is None when the value was not stored."""
+
+    def _fresh(self, entry):
+        return entry is not None and time.monotonic() - entry[1] < self.ttl
+
+    def current(self):
+        """Return (version, value), loading the value when stale; version is None if it was not stored."""
+        entry = self._entry
+        if self._fresh(entry):
+            self.hits += 1
+            return entry[0], entry[2]
+
+        with self._load_lock:
+            entry = self._entry
+            if self._fresh(entry):
+                self.hits += 1
+                return entry[0], entry[2]
+
+            self.misses += 1
+            with self._lock:
+                started_at = self.version
+            value = self._fetch()
+
+            with self._lock:
+                if self.version != started_at:
+                    # Invalidated while loading: serve it, but cache nothing
+                    self._loaded(None, value)
+                    return None, value
+                self.version += 1
+                self._entry = (self.version, time.monotonic(), value)
+                self._loaded(self.version, value)
+                return self.version, value
+
+    def invalidate(self):
+        """Drop the cached value; the next read loads it again."""
+        with self._lock:
+            self.version += 1
+            self._entry = None
+
+    def age_seconds(self):
+        entry = self._entry
+        return round(time.monotonic() - entry[1], 1) if entry else None
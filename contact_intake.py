@@ -0,0 +1,159 @@
+"""Intake for the public contact form.
+
+Each submission is checked against a per-sender and per-IP rate limit
+and a bounded filter of recently seen (email, normalized content)
+fingerprints, then handed to a ResultWriter. By default it is written
+in the request like before; with INSIGHTIFY_CONTACT_WRITE_BEHIND=1 the
+writer queues it and drains the queue into `messages` with one
+executemany per batch, flushed by size or time, so the request returns
+as soon as the message is queued. Duplicates are acknowledged like any
+other message but never stored.
+"""
+import hashlib
+import math
+import os
+import re
+import threading
+import time
+
+from auth import SlidingWindowLimiter
+from counters import counters, UNREAD_MESSAGES
+from db import get_connection
+from result_writer import ResultWriter
+
+# Messages allowed per sender email, and per client IP, within the window
+EMAIL_LIMIT = int(os.environ.get("INSIGHTIFY_CONTACT_EMAIL_LIMIT", 3))
+IP_LIMIT = int(os.environ.get("INSIGHTIFY_CONTACT_IP_LIMIT", 10))
+WINDOW = float(os.environ.get("INSIGHTIFY_CONTACT_WINDOW", 600))
+# Fingerprints remembered per generation, and the longest a generation lasts
+DEDUP_CAPACITY = int(os.environ.get("INSIGHTIFY_CONTACT_DEDUP_CAPACITY", 50000))
+DEDUP_WINDOW = float(os.environ.get("INSIGHTIFY_CONTACT_DEDUP_WINDOW", 24 * 3600))
+DEDUP_ERROR_RATE = 0.001
+BATCH_SIZE = int(os.environ.get("INSIGHTIFY_CONTACT_BATCH_SIZE", 100))
+FLUSH_INTERVAL = float(os.environ.get("INSIGHTIFY_CONTACT_FLUSH_INTERVAL", 2.0))
+# Write-behind is opt-in, as for results; by default messages are written in the request like before
+WRITE_BEHIND = os.environ.get("INSIGHTIFY_CONTACT_WRITE_BEHIND", "0") == "1"
+SPOOL_PATH = os.environ.get("INSIGHTIFY_CONTACT_SPOOL", "messages_spool.ndjson")
+MAX_LENGTHS = {'name': 255, 'email': 255, 'content': 5000}
+
+ACCEPTED, DUPLICATE, RATE_LIMITED, INVALID = 'accepted', 'duplicate', 'rate_limited', 'invalid'
+
+_WORDS = re.compile(r'\w+')
+
+
+def fingerprint(email, content):
+    """Digest of the sender and message text, ignoring case, spacing and punctuation."""
+    text = ' '.join(_WORDS.findall(content.lower()))
+    return hashlib.blake2b(f"{email.strip().lower()}\0{text}".encode(), digest_size=16).digest()
+
+
+class RotatingBloomFilter:
+    """Approximate set of recent fingerprints in fixed memory.
+
+    Two Bloom filter generations: additions go to the current one and
+    lookups check both. Once the current generation holds `capacity`
+    items or is `window` seconds old, the older one is dropped, so every
+    fingerprint is remembered for at least one generation. False
+    positives occur at about `error_rate`; there are no false negatives
+    within that span.
+    """
+
+    def __init__(self, capacity=DEDUP_CAPACITY, window=DEDUP_WINDOW, error_rate=DEDUP_ERROR_RATE):
+        self.capacity = capacity
+        self.window = window
+        self.bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self._current = bytearray((self.bits + 7) // 8)
+        self._previous = bytearray(len(self._current))
+        self._count = 0
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _positions(self, digest):
+        # Double hashing: the k positions come from two 64-bit halves of the digest
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    @staticmethod
+    def _has(array, positions):
+        return all(array[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def __contains__(self, digest):
+        """True if `digest` was (probably) added before."""
+        positions = self._positions(digest)
+        with self._lock:
+            return self._has(self._current, positions) or self._has(self._previous, positions)
+
+    def add(self, digest):
+        positions = self._positions(digest)
+        with self._lock:
+            if self._count >= self.capacity or time.monotonic() - self._started >= self.window:
+                self._previous, self._current = self._current, bytearray(len(self._current))
+                self._count = 0
+                self._started = time.monotonic()
+            if self._has(self._current, positions):
+                return
+            for p in positions:
+                self._current[p >> 3] |= 1 << (p & 7)
+            self._count += 1
+
+    def status(self):
+        return {'bits': self.bits, 'hashes': self.hashes, 'generation_items': self._count,
+                'generation_age_s': round(time.monotonic() - self._started, 1)}
+
+
+def _commit(records):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO messages (name, email, content, date_sent) VALUES (%s, %s, %s, %s)",
+            [(r['name'], r['email'], r['content'], r['date_sent']) for r in records]
+        )
+        counters.incr(cursor, UNREAD_MESSAGES, len(records))
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+class ContactIntake:
+    def __init__(self, writer, email_limit=EMAIL_LIMIT, ip_limit=IP_LIMIT, window=WINDOW):
+        self.writer = writer
+        self.seen = RotatingBloomFilter()
+        self.senders = SlidingWindowLimiter(email_limit, window)
+        self.ips = SlidingWindowLimiter(ip_limit, window)
+        self.stats = {ACCEPTED: 0, DUPLICATE: 0, RATE_LIMITED: 0, INVALID: 0}
+
+    def submit(self, name, email, content, ip):
+        """Queue one message; returns (outcome, retry_after)."""
+        name, email, content = (name or '').strip(), (email or '').strip(), (content or '').strip()
+        fields = {'name': name, 'email': email, 'content': content}
+        if not all(fields.values()) or any(len(fields[f]) > limit for f, limit in MAX_LENGTHS.items()):
+            self.stats[INVALID] += 1
+            return INVALID, 0
+
+        wait = self.ips.hit(ip) or self.senders.hit(email.lower())
+        if wait:
+            self.stats[RATE_LIMITED] += 1
+            return RATE_LIMITED, wait
+        digest = fingerprint(email, content)
+        if digest in self.seen:
+            self.stats[DUPLICATE] += 1
+            return DUPLICATE, 0
+
+        # Remembered only once the writer has it, so a retry after a failed write is not dropped
+        self.writer.submit(fields)
+        self.seen.add(digest)
+        self.stats[ACCEPTED] += 1
+        return ACCEPTED, 0
+
+    def status(self):
+        return {**self.stats, 'dedup': self.seen.status(), 'writer': self.writer.status()}
+
+
+contact_intake = ContactIntake(ResultWriter(
+    write_behind=WRITE_BEHIND, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+    spool_path=SPOOL_PATH, commit=_commit, time_field='date_sent', name='message-writer'
+))
@@ -0,0 +1,170 @@
+import logging
+import os
+import threading
+import time
+
+from db import get_connection
+
+log = logging.getLogger(__name__)
+
+# Seconds a worker serves its counter snapshot before re-reading admin_counters
+COUNTERS_TTL = float(os.environ.get("INSIGHTIFY_COUNTERS_TTL", 5))
+# Seconds between reconciliation runs; 0 disables the background job
+RECONCILE_INTERVAL = float(os.environ.get("INSIGHTIFY_COUNTERS_RECONCILE_INTERVAL", 600))
+
+UNREAD_MESSAGES = 'unread_messages'
+USERS = 'users'
+RESULTS = 'results'
+RISK_PREFIX = 'results_risk:'
+
+# messages.is_unread is generated from reply (migrations/0007) and indexed
+UNREAD_CONDITION = "is_unread = 1"
+
+# Exact values, used by reconcile() and as a fallback when admin_counters is unavailable
+_LIVE_QUERIES = {
+    UNREAD_MESSAGES: f"SELECT COUNT(*) FROM messages WHERE {UNREAD_CONDITION}",
+    USERS: "SELECT COUNT(*) FROM users",
+    RESULTS: "SELECT COUNT(*) FROM results"
+}
+
+
+def risk_counter(risk_level):
+    return RISK_PREFIX + risk_level
+
+
+def is_unread(reply):
+    return reply is None or reply == ''
+
+
+class Counters:
+    """Admin counters kept in the admin_counters summary table.
+
+    Write paths adjust a counter in the same transaction as the row they
+    change (incr), so reads are a single small-table lookup instead of a
+    COUNT(*) over messages/users/results. Each worker caches the table for
+    COUNTERS_TTL seconds, and reconcile() periodically recomputes the
+    exact values to repair any drift.
+    """
+
+    def __init__(self, ttl=COUNTERS_TTL):
+        self.ttl = ttl
+        self._values = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._reconciler = None
+        self.last_reconciled = None
+
+    def incr(self, cursor, name, delta=1):
+        """Adjust a counter inside the caller's transaction.
+
+        The cached snapshot is marked stale rather than adjusted, since the
+        caller may still roll back; the next read re-reads admin_counters.
+        """
+        if not delta:
+            return
+        cursor.execute(
+            "INSERT INTO admin_counters (name, value) VALUES (%s, %s) "
+            "ON DUPLICATE KEY UPDATE value = value + VALUES(value)",
+            (name, delta)
+        )
+        with self._lock:
+            self._loaded_at = None
+
+    def _refresh(self):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name, value FROM admin_counters")
+            values = {name: int(value) for name, value in cursor.fetchall()}
+            cursor.close()
+        finally:
+            conn.close()
+        with self._lock:
+            self._values = values
+            self._loaded_at = time.monotonic()
+
+    def _live(self, name):
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            if name.startswith(RISK_PREFIX):
+                cursor.execute("SELECT COUNT(*) FROM results WHERE risk_level = %s", (name[len(RISK_PREFIX):],))
+            else:
+                cursor.execute(_LIVE_QUERIES[name])
+            value = cursor.fetchone()[0]
+            cursor.close()
+            return value
+        finally:
+            conn.close()
+
+    def all(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._refresh()
+        with self._lock:
+            return dict(self._values)
+
+    def get(self, name):
+        try:
+            values = self.all()
+            if name in values:
+                return values[name]
+        except Exception as e:
+            log.warning("Counters unavailable, counting %s directly: %s", name, e)
+        # Missing or unreadable summary row: fall back to the exact count
+        return self._live(name)
+
+    def risk_levels(self):
+        return {name[len(RISK_PREFIX):]: value for name, value in self.all().items() if name.startswith(RISK_PREFIX)}
+
+    def reconcile(self):
+        """Recompute every counter from the base tables and overwrite admin_counters."""
+        conn = get_connection()
+        try:
+            cursor = conn.cursor()
+            values = {}
+            for name, query in _LIVE_QUERIES.items():
+                cursor.execute(query)
+                values[name] = cursor.fetchone()[0]
+
+            cursor.execute("SELECT risk_level, COUNT(*) FROM results GROUP BY risk_level")
+            for risk_level, count in cursor.fetchall():
+                values[risk_counter(risk_level)] = count
+            # Risk levels that no longer have any results go back to zero
+            cursor.execute("SELECT name FROM admin_counters WHERE name LIKE %s", (RISK_PREFIX + '%',))
+            for (name,) in cursor.fetchall():
+                values.setdefault(name, 0)
+
+            cursor.executemany(
+                "INSERT INTO admin_counters (name, value) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE value = VALUES(value)",
+                list(values.items())
+            )
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+        with self._lock:
+            self._values = values
+            self._loaded_at = time.monotonic()
+            self.last_reconciled = time.time()
+        return values
+
+    def start_reconciler(self, interval=RECONCILE_INTERVAL):
+        """Run reconcile() every `interval` seconds on a daemon thread."""
+        if interval <= 0 or self._reconciler is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    log.warning("Counter reconciliation failed: %s", e)
+                time.sleep(interval)
+
+        self._reconciler = threading.Thread(target=run, name='counters-reconciler', daemon=True)
+        self._reconciler.start()
+
+
+counters = Counters()
@@ -0,0 +1,286 @@
+"""Typed, memory-mapped columnar store for the survey dataset and results exports.
+
+Ingestion parses a CSV (or the results table) once and writes one .npy
+file per column into a directory, plus meta.json describing the schema:
+PHQ answers and other small scores as int8 (-1 for missing), text
+fields as category codes in the smallest integer type that holds them
+(int8 up to 127 categories, then int16, then int32; -1 for missing),
+timestamps as datetime64[s]. Rows are
+sorted by user and time, and a per-user offset index is stored next to
+them, so a participant's rows are a slice of the memory-mapped columns
+and nothing is copied until it is used.
+
+    python dataset.py survey                      # CSV -> data/survey
+    python dataset.py results --csv results.csv   # /admin/export/results CSV -> data/results
+    python dataset.py results                     # straight from MySQL
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+FORMAT = 1
+NA_INT = -1
+DATA_DIR = 'data'
+SURVEY_CSV = 'Dataset_14-day_AA_depression_symptoms_mood_and_PHQ-9.csv'
+
+PHQ_COLUMNS = tuple(f'phq{i}' for i in range(1, 10))
+MOOD_COLUMNS = tuple(f'q{i}' for i in (1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 16, 46, 47))
+
+# (stored name, source column(s), kind); several sources are stored as one 2-D block
+SURVEY_SCHEMA = (
+    ('user_id', ('user_id',), 'int32'),
+    ('time', ('time',), 'datetime'),
+    ('phq', PHQ_COLUMNS, 'int8'),
+    ('age', ('age',), 'int8'),
+    ('sex', ('sex',), 'category'),
+    ('mood', MOOD_COLUMNS, 'int8'),
+    ('happiness_score', ('happiness.score',), 'int8'),
+    ('period', ('period.name',), 'category'),
+    ('start_time', ('start.time',), 'datetime'),
+    ('phq_day', ('phq.day',), 'float32'),
+)
+RESULTS_SCHEMA = (
+    ('user_id', ('user_id',), 'int32'),
+    ('time', ('created_at',), 'datetime'),
+    ('id', ('id',), 'int64'),
+    ('total_score', ('total_score',), 'int8'),
+    ('result', ('result',), 'category'),
+    ('risk_level', ('risk_level',), 'category'),
+    ('age', ('age',), 'int8'),
+    ('gender', ('gender',), 'category'),
+    ('location', ('location',), 'category'),
+    ('interest', ('interest',), 'category'),
+)
+RESULTS_COLUMNS = ('id', 'user_id', 'total_score', 'result', 'risk_level', 'age', 'gender', 'location',
+                   'interest', 'created_at')
+
+
+class DatasetError(ValueError):
+    """Malformed input or store."""
+
+
+def _encode(frame, sources, kind):
+    """Return (array, column meta) for one stored column."""
+    import pandas as pd
+
+    if kind == 'category':
+        values = pd.Categorical(frame[sources[0]].astype('string').str.strip())
+        # Free-text fields such as location can have any number of distinct values
+        dtype = next(t for t in (np.int8, np.int16, np.int32) if len(values.categories) <= np.iinfo(t).max)
+        return values.codes.astype(dtype), {'categories': [str(c) for c in values.categories]}
+    if kind == 'datetime':
+        values = pd.to_datetime(frame[sources[0]], errors='coerce')
+        return values.to_numpy(dtype='datetime64[s]'), {}
+
+    block = frame[list(sources)].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    if kind.startswith('float'):
+        array = block.astype(kind)
+    else:
+        # Missing, fractional or out-of-range values (e.g. a mistyped age) are stored as NA
+        info = np.iinfo(kind)
+        with np.errstate(invalid='ignore'):
+            bad = np.isnan(block) | (block != np.round(block)) | (block < info.min) | (block > info.max)
+        array = np.where(bad, NA_INT, np.nan_to_num(block)).astype(kind)
+    return (array if len(sources) > 1 else array[:, 0]), {}
+
+
+def build_index(user_ids):
+    """Offsets such that rows of users[i] are offsets[i]:offsets[i + 1] (user_ids must be sorted)."""
+    users, starts = np.unique(user_ids, return_index=True)
+    return users, np.append(starts, len(user_ids)).astype(np.int64)
+
+
+def write_store(frame, schema, path, source=None, source_sha256=None):
+    """Encode `frame` with `schema`, sort by user and time, and replace the store at `path` atomically."""
+    encoded = {name: _encode(frame, sources, kind) for name, sources, kind in schema}
+    order = np.lexsort((encoded['time'][0], encoded['user_id'][0]))
+
+    parent = os.path.dirname(os.path.abspath(path))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.ingest-')
+    meta = {
+        'format': FORMAT, 'rows': int(len(order)), 'source': source, 'source_sha256': source_sha256,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'sort': ['user_id', 'time'], 'columns': {}
+    }
+    try:
+        for name, sources, kind in schema:
+            array, extra = encoded[name]
+            array = np.ascontiguousarray(array[order])
+            np.save(os.path.join(tmp_dir, f'{name}.npy'), array)
+            meta['columns'][name] = {'kind': kind, 'dtype': str(array.dtype), 'sources': list(sources), **extra}
+        users, offsets = build_index(encoded['user_id'][0][order])
+        np.save(os.path.join(tmp_dir, 'index_users.npy'), users)
+        np.save(os.path.join(tmp_dir, 'index_offsets.npy'), offsets)
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as out:
+            json.dump(meta, out, indent=2)
+
+        old = None
+        if os.path.exists(path):
+            old = path + '.old'
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(path, old)
+        os.replace(tmp_dir, path)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return meta
+
+
+class ColumnStore:
+    """Read side of a store; columns are memory-mapped on first use."""
+
+    def __init__(self, path):
+        self.path = path
+        try:
+            with open(os.path.join(path, 'meta.json')) as meta:
+                self.meta = json.load(meta)
+        except FileNotFoundError:
+            raise DatasetError(f"No dataset at {path}; run 'python dataset.py' to ingest one")
+        if self.meta.get('format') != FORMAT:
+            raise DatasetError(f"{path} has store format {self.meta.get('format')}, expected {FORMAT}")
+        self._arrays = {}
+        self.users = self._load('index_users')
+        self.offsets = self._load('index_offsets')
+
+    def _load(self, name):
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.load(os.path.join(self.path, f'{name}.npy'), mmap_mode='r')
+        return array
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    def __getitem__(self, name):
+        if name not in self.meta['columns']:
+            raise KeyError(name)
+        return self._load(name)
+
+    def categories(self, name):
+        return self.meta['columns'][name].get('categories', [])
+
+    def code(self, name, value):
+        """Category code for `value`, -1 if it never occurs."""
+        try:
+            return self.categories(name).index(str(value).strip())
+        except ValueError:
+            return NA_INT
+
+    def decode(self, name, codes):
+        labels = np.asarray(self.categories(name) + [None], dtype=object)
+        return labels[np.asarray(codes)]  # code -1 picks the trailing None
+
+    def user_rows(self, user_id):
+        """Slice of the rows belonging to `user_id` (empty if unknown)."""
+        i = np.searchsorted(self.users, user_id)
+        if i == len(self.users) or self.users[i] != user_id:
+            return slice(0, 0)
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def rows(self, user_ids=None, start=None, end=None):
+        """Sorted row indices for a cohort, optionally limited to start <= time < end."""
+        if user_ids is None:
+            index = np.arange(len(self))
+        else:
+            slices = [self.user_rows(user_id) for user_id in np.unique(np.asarray(user_ids))]
+            index = np.concatenate([np.arange(s.start, s.stop) for s in slices] or [np.empty(0, np.int64)])
+        if start is not None or end is not None:
+            times = self['time'][index]
+            keep = np.ones(len(index), dtype=bool)
+            if start is not None:
+                keep &= times >= np.datetime64(start, 's')
+            if end is not None:
+                keep &= times < np.datetime64(end, 's')
+            index = index[keep]
+        return index
+
+    def to_frame(self, columns, rows=None):
+        """DataFrame of the given columns with categories decoded and missing int8 values as NaN."""
+        import pandas as pd
+
+        data = {}
+        for name in columns:
+            spec = self.meta['columns'][name]
+            array = self[name] if rows is None else self[name][rows]
+            if spec['kind'] == 'category':
+                data[name] = self.decode(name, array)
+                continue
+            if spec['kind'] == 'int8':
+                # Scores and ages use -1 for missing; ids are never missing and keep their type
+                array = np.where(array == NA_INT, np.nan, array).astype(np.float32)
+            if array.ndim == 2:
+                data.update({source: array[:, i] for i, source in enumerate(spec['sources'])})
+            else:
+                data[name] = array
+        return pd.DataFrame(data)
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_csv(path, schema):
+    import pandas as pd
+
+    usecols = [source for _, sources, _ in schema for source in sources]
+    dtypes = {source: 'string' for _, sources, kind in schema if kind in ('category', 'datetime') for source in sources}
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes)
+
+
+def ingest_survey(csv_path=SURVEY_CSV, out=os.path.join(DATA_DIR, 'survey')):
+    return write_store(_read_csv(csv_path, SURVEY_SCHEMA), SURVEY_SCHEMA, out,
+                       os.path.basename(csv_path), _sha256(csv_path))
+
+
+def ingest_results(out=os.path.join(DATA_DIR, 'results'), csv_path=None):
+    """Ingest a results CSV export, or the results table itself when no CSV is given."""
+    import pandas as pd
+
+    if csv_path:
+        return write_store(_read_csv(csv_path, RESULTS_SCHEMA), RESULTS_SCHEMA, out,
+                           os.path.basename(csv_path), _sha256(csv_path))
+
+    from db import get_connection
+    from exports import stream_rows
+
+    sql = f"SELECT {', '.join(RESULTS_COLUMNS)} FROM results ORDER BY id"
+    frame = pd.DataFrame.from_records(stream_rows(get_connection(), sql, ()), columns=RESULTS_COLUMNS)
+    return write_store(frame, RESULTS_SCHEMA, out, 'mysql:results')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('source', choices=('survey', 'results'))
+    parser.add_argument('--csv', help='CSV to ingest (survey default: the bundled dataset; results default: MySQL)')
+    parser.add_argument('--out', help='store directory (default: data/<source>)')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    out = args.out or os.path.join(DATA_DIR, args.source)
+    if args.source == 'survey':
+        meta = ingest_survey(args.csv or SURVEY_CSV, out)
+    else:
+        meta = ingest_results(out, args.csv)
+    size = sum(os.path.getsize(os.path.join(out, f)) for f in os.listdir(out))
+    print(f"Ingested {meta['rows']} rows into {out} ({size / 1024:.0f} KiB) "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,341 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import mysql.connector
+from mysql.connector import errors
+
+# Database configuration shared by user_bp and admin_bp
+db_config = {
+    "host": os.environ.get("INSIGHTIFY_DB_HOST", "localhost"),
+    "user": os.environ.get("INSIGHTIFY_DB_USER", "root"),
+    "password": os.environ.get("INSIGHTIFY_DB_PASSWORD", ""),
+    "database": os.environ.get("INSIGHTIFY_DB_NAME", "insightify")
+}
+
+# Pool configuration
+pool_config = {
+    "size": int(os.environ.get("INSIGHTIFY_DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.environ.get("INSIGHTIFY_DB_POOL_OVERFLOW", 10)),
+    "timeout": float(os.environ.get("INSIGHTIFY_DB_POOL_TIMEOUT", 10)),
+    "recycle": float(os.environ.get("INSIGHTIFY_DB_POOL_RECYCLE", 3600)),
+    "pre_ping": os.environ.get("INSIGHTIFY_DB_POOL_PRE_PING", "1") != "0"
+}
+
+
+# Callables invoked as listener(sql, seconds, rows) after every statement run on a pooled cursor
+query_listeners = []
+
+
+class PoolTimeout(errors.PoolError):
+    """Raised when no connection becomes available within the wait timeout."""
+
+
+class TimedCursor:
+    """Cursor proxy that reports each statement's duration and row count to query_listeners.
+
+    Rows are counted as they are fetched, so unbuffered cursors are
+    reported when the next statement runs or the cursor is closed.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._pending = None  # [sql, seconds, rows fetched]
+
+    def _report(self):
+        if self._pending is None:
+            return
+        sql, seconds, rows = self._pending
+        self._pending = None
+        for listener in query_listeners:
+            try:
+                listener(sql, seconds, rows)
+            except Exception:
+                pass
+
+    def _run(self, method, sql, params):
+        self._report()
+        start = time.perf_counter()
+        try:
+            return method(sql, params)
+        finally:
+            self._pending = [sql, time.perf_counter() - start, None]
+            rowcount = getattr(self._raw, 'rowcount', -1)
+            # Writes report affected rows right away; reads wait until rows are fetched
+            if not sql.lstrip()[:6].lower().startswith('select') and rowcount is not None and rowcount >= 0:
+                self._pending[2] = rowcount
+                self._report()
+
+    def execute(self, sql, params=()):
+        return self._run(self._raw.execute, sql, params)
+
+    def executemany(self, sql, seq_params):
+        return self._run(self._raw.executemany, sql, seq_params)
+
+    def _fetched(self, rows):
+        if self._pending is not None:
+            self._pending[2] = (self._pending[2] or 0) + rows
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, size=1):
+        rows = self._raw.fetchmany(size)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._raw.fetchall()
+        self._fetched(len(rows))
+        self._report()
+        return rows
+
+    def __iter__(self):
+        for row in self._raw:
+            self._fetched(1)
+            yield row
+
+    def close(self):
+        self._report()
+        return self._raw.close()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+class PooledConnection:
+    """Proxy around a raw connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._checkin(raw)
+
+    def is_connected(self):
+        return self._raw is not None and self._raw.is_connected()
+
+    def cursor(self, *args, **kwargs):
+        if self._raw is None:
+            raise errors.OperationalError("Connection already returned to the pool")
+        raw = self._raw.cursor(*args, **kwargs)
+        return TimedCursor(raw) if query_listeners else raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise errors.OperationalError("Connection already returned to the pool")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Bounded MySQL connection pool.
+
+    Keeps up to `size` idle connections around and allows `max_overflow`
+    extra connections under load; those are closed again on check-in.
+    Callers block for at most `timeout` seconds when every connection is
+    in use. Connections are health-checked on checkout and replaced once
+    they are older than `recycle` seconds.
+    """
+
+    def __init__(self, config, size=5, max_overflow=10, timeout=10, recycle=3600, pre_ping=True,
+                 connector=mysql.connector.connect):
+        self.config = dict(config)
+        # Swappable so tools can point the pool at a local stand-in database
+        self.connector = connector
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._idle = deque()  # (raw connection, created_at)
+        self._created_at = {}
+        self._total = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._health_failures = 0
+        self._checkout_time = 0.0
+        self._checkout_time_max = 0.0
+
+    def _connect(self):
+        raw = self.connector(**self.config)
+        self._created_at[id(raw)] = time.monotonic()
+        return raw
+
+    def _discard(self, raw):
+        self._created_at.pop(id(raw), None)
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _healthy(self, raw):
+        created = self._created_at.get(id(raw), 0)
+        if self.recycle and time.monotonic() - created > self.recycle:
+            return False
+        if not self.pre_ping:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def get_connection(self):
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        raw = None
+
+        with self._cond:
+            waited = False
+            while True:
+                if self._idle:
+                    raw = self._idle.pop()
+                    break
+                if self._total < self.size + self.max_overflow:
+                    self._total += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection available within {self.timeout}s "
+                        f"(size={self.size}, overflow={self.max_overflow})"
+                    )
+                if not waited:
+                    self._waits += 1
+                    waited = True
+                self._cond.wait(remaining)
+            self._in_use += 1
+
+        try:
+            if raw is not None and not self._healthy(raw):
+                with self._cond:
+                    self._health_failures += 1
+                self._discard(raw)
+                raw = None
+            if raw is None:
+                raw = self._connect()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.perf_counter() - start
+        with self._cond:
+            self._checkouts += 1
+            self._checkout_time += elapsed
+            self._checkout_time_max = max(self._checkout_time_max, elapsed)
+
+        return PooledConnection(self, raw)
+
+    def _checkin(self, raw):
+        # Drop any open transaction so the next borrower gets a fresh snapshot
+        reusable = True
+        try:
+            if raw.is_connected():
+                raw.rollback()
+            else:
+                reusable = False
+        except Exception:
+            reusable = False
+
+        with self._cond:
+            self._in_use -= 1
+            if reusable and len(self._idle) < self.size:
+                self._idle.append(raw)
+                raw = None
+            else:
+                self._total -= 1
+            self._cond.notify()
+
+        if raw is not None:
+            self._discard(raw)
+
+    def dispose(self):
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._total -= len(idle)
+        for raw in idle:
+            self._discard(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self.size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'health_check_failures': self._health_failures,
+                'checkout_ms_avg': round(self._checkout_time / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'checkout_ms_max': round(self._checkout_time_max * 1000, 3)
+            }
+
+
+pool = ConnectionPool(db_config, **pool_config)
+
+
+def get_connection():
+    """Borrow a connection from the shared pool. Call close() to return it."""
+    return pool.get_connection()
+
+
+@contextmanager
+def connection():
+    conn = get_connection()
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+
+@contextmanager
+def rebuilding(conn, table, sources=()):
+    """Rebuild `table` into an empty shadow copy, then swap it in with one RENAME.
+
+    Yields the shadow table's name to fill. Throughout, `sources` are
+    locked READ and `table` WRITE, so writers that touch them wait instead
+    of racing the rebuild, and readers of `table` wait instead of seeing
+    it half built. If the body raises, `table` is left as it was. Renaming
+    locked tables needs MySQL 8.0.13 or later.
+    """
+    shadow, old = f"{table}_rebuild", f"{table}_old"
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"DROP TABLE IF EXISTS {shadow}, {old}")
+        cursor.execute(f"CREATE TABLE {shadow} LIKE {table}")
+        locks = [f"{source} READ" for source in sources] + [f"{table} WRITE", f"{shadow} WRITE"]
+        cursor.execute(f"LOCK TABLES {', '.join(locks)}")
+        try:
+            yield shadow
+            conn.commit()
+            cursor.execute(f"RENAME TABLE {table} TO {old}, {shadow} TO {table}")
+        finally:
+            cursor.execute("UNLOCK TABLES")
+        cursor.execute(f"DROP TABLE {old}")
+    finally:
+        cursor.close()
@@ -0,0 +1,167 @@
+"""In-process directory of doctors, for result-page recommendations and the admin list.
+
+The doctors table is small and rarely edited, so it is read whole and
+indexed by specialization, with the recommendations for each risk level
+worked out at load time. A result page then costs one dict lookup, and
+the first page of /admin/doctors a slice, instead of a query per render.
+Admin edits invalidate this worker's copy; other workers pick them up
+within INSIGHTIFY_DOCTORS_TTL seconds.
+"""
+import logging
+import os
+from bisect import bisect_right
+
+from cache import ReadThroughCache
+from db import get_connection
+from pagination import PaginationError, decode_cursor, encode_cursor, page_size
+
+log = logging.getLogger(__name__)
+
+# How long the directory is served before it is re-read from MySQL
+DOCTORS_TTL = float(os.environ.get("INSIGHTIFY_DOCTORS_TTL", 300))
+# Doctors listed on a result page
+RECOMMENDED = int(os.environ.get("INSIGHTIFY_DOCTORS_RECOMMENDED", 5))
+
+# Risk level (see prediction.prediction_map) -> specializations to recommend, most suitable first.
+# Levels with no matching doctors, or not listed here, are offered the first doctors by name instead.
+RISK_SPECIALIZATIONS = {
+    'Very High': ('Psychiatrist',),
+    'High': ('Psychiatrist', 'Psychologist'),
+    'Moderate': ('Psychologist', 'Counselor'),
+    'Low': ('Counselor', 'Psychologist')
+}
+
+
+def _key(specialization):
+    return (specialization or '').strip().casefold()
+
+
+def _order(doctor):
+    # Case-insensitive like the MySQL collation the SQL listing sorts with
+    return ((doctor['name'] or '').casefold(), doctor['id'])
+
+
+class _Section:
+    """Doctors sorted by name, with their sort keys for cursor lookups."""
+
+    def __init__(self, doctors):
+        self.doctors = sorted(doctors, key=_order)
+        self.keys = [_order(d) for d in self.doctors]
+
+
+class Directory:
+    """One loaded snapshot of the doctors table."""
+
+    def __init__(self, rows):
+        self.all = _Section(rows)
+        grouped = {}
+        for doctor in self.all.doctors:
+            grouped.setdefault(_key(doctor['specialization']), []).append(doctor)
+        self.by_specialization = {key: _Section(doctors) for key, doctors in grouped.items()}
+
+        empty = _Section([])
+        self.fallback = tuple(self.all.doctors[:RECOMMENDED])
+        self.recommendations = {}
+        for risk_level, specializations in RISK_SPECIALIZATIONS.items():
+            picked = []
+            for specialization in specializations:
+                picked.extend(self.by_specialization.get(_key(specialization), empty).doctors)
+            self.recommendations[risk_level] = tuple(picked[:RECOMMENDED]) or self.fallback
+
+    def section(self, specialization):
+        specialization = _key(specialization)
+        if not specialization:
+            return self.all
+        return self.by_specialization.get(specialization) or _Section([])
+
+
+class DoctorDirectory(ReadThroughCache):
+    """Read-through cache of the doctors directory, shared by every request in this worker."""
+
+    def __init__(self, ttl=DOCTORS_TTL):
+        super().__init__(ttl)
+        self._last = None  # last Directory loaded, kept through invalidations
+
+    @staticmethod
+    def _fetch():
+        conn = get_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT id, name, specialization, contact_info FROM doctors")
+            rows = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+        return Directory(rows)
+
+    def get(self):
+        """Return the current Directory, loading it from MySQL when stale."""
+        return self.current()[1]
+
+    def _loaded(self, version, value):
+        self._last = value
+
+    def recommend(self, risk_level):
+        """Doctors to suggest on a result page for this risk level.
+
+        Never raises: when MySQL cannot be read, the last directory loaded
+        is used, or no doctors at all, so the result page still renders.
+        """
+        try:
+            directory = self.get()
+        except Exception:
+            log.exception("Could not load the doctors directory")
+            directory = self._last
+            if directory is None:
+                return ()
+        return directory.recommendations.get(risk_level) or directory.fallback
+
+    @staticmethod
+    def serves(args):
+        """True when a doctors listing request can be answered from the directory.
+
+        That is the default order (name, ascending), optionally filtered by
+        specialization; name searches and other sorts go to MySQL.
+        """
+        return (not (args.get('q') or '').strip()
+                and (args.get('sort') or 'name') == 'name'
+                and (args.get('order') or 'asc').lower() == 'asc')
+
+    def page(self, args):
+        """One page of the admin listing as (rows, next_cursor), like doctors_listing.fetch_page."""
+        if not self.serves(args):
+            raise PaginationError("Only the default order can be served from the doctors directory")
+        limit = page_size(args.get('limit'))
+        section = self.get().section(args.get('specialization'))
+
+        start = 0
+        if args.get('cursor'):
+            name, last_id = decode_cursor(args['cursor'])
+            if not isinstance(name, str):
+                raise PaginationError("Invalid cursor")
+            start = bisect_right(section.keys, (name.casefold(), last_id))
+
+        rows = section.doctors[start:start + limit]
+        next_cursor = None
+        if start + limit < len(section.doctors):
+            next_cursor = encode_cursor(rows[-1]['name'], rows[-1]['id'])
+        return [dict(row) for row in rows], next_cursor
+
+    def stats(self):
+        entry = self._entry
+        return {
+            'version': self.version,
+            'cached': entry is not None,
+            'doctors': len(entry[2].all.doctors) if entry else None,
+            'age_seconds': self.age_seconds(),
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+doctor_directory = DoctorDirectory()
+
+
+def invalidate_doctors():
+    doctor_directory.invalidate()
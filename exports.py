@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+
+from counters import UNREAD_CONDITION
+
+FETCH_SIZE = 1000
+# Flush output once roughly this many bytes are buffered
+CHUNK_BYTES = 64 * 1024
+
+EXPORTS = {
+    'results': {
+        'columns': ('id', 'user_id', 'total_score', 'result', 'risk_level', 'name', 'age',
+                    'gender', 'location', 'interest', 'created_at'),
+        'date_column': 'created_at'
+    },
+    'messages': {
+        'columns': ('id', 'name', 'email', 'content', 'reply', 'replied_at', 'date_sent'),
+        'date_column': 'date_sent'
+    }
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+
+class ExportError(ValueError):
+    """Unknown export, format or filter value."""
+
+
+def _day(value, name):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ExportError(f"{name} must be a YYYY-MM-DD date")
+
+
+def build_query(name, args):
+    """Return (sql, params) for an export, validating its filters up front."""
+    if name not in EXPORTS:
+        raise ExportError(f"Unknown export '{name}'")
+    spec = EXPORTS[name]
+    clauses, params = [], []
+
+    if args.get('from'):
+        clauses.append(f"{spec['date_column']} >= %s")
+        params.append(_day(args['from'], 'from'))
+    if args.get('to'):
+        clauses.append(f"{spec['date_column']} < %s")
+        params.append(_day(args['to'], 'to') + timedelta(days=1))
+
+    if name == 'results':
+        if args.get('risk_level'):
+            clauses.append("risk_level = %s")
+            params.append(args['risk_level'])
+        if args.get('user_id'):
+            try:
+                params.append(int(args['user_id']))
+            except ValueError:
+                raise ExportError("user_id must be an integer")
+            clauses.append("user_id = %s")
+    elif args.get('unreplied') in ('1', 'true', 'yes'):
+        clauses.append(UNREAD_CONDITION)
+
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+    sql = f"SELECT {', '.join(spec['columns'])} FROM {name}{where} ORDER BY id"
+    return sql, tuple(params)
+
+
+def stream_rows(conn, sql, params):
+    """Yield rows from an unbuffered cursor; the connection is closed when done."""
+    try:
+        # Unbuffered: rows are read off the socket as they are fetched, not all at once
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+        cursor.close()
+    finally:
+        # If the client went away mid-stream the pool discards the connection
+        conn.close()
+
+
+def _text(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def csv_chunks(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_text(value) for value in row])
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(columns, rows):
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps({column: _text(value) for column, value in zip(columns, row)}, default=str)
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_BYTES:
+            yield '\n'.join(lines) + '\n'
+            lines, size = [], 0
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)  # gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(name, args, connect):
+    """Return (chunk generator, mimetype, filename, conn) for a streamed export.
+
+    Filters are validated before `connect` is called, so a bad request
+    never borrows a connection.
+    """
+    fmt = args.get('format') or 'csv'
+    if fmt not in FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(FORMATS)}")
+    sql, params = build_query(name, args)
+    conn = connect()
+
+    columns = EXPORTS[name]['columns']
+    encode = csv_chunks if fmt == 'csv' else ndjson_chunks
+    chunks = encode(columns, stream_rows(conn, sql, params))
+    filename = f"{name}.{fmt}"
+    mimetype = FORMATS[fmt]
+
+    if args.get('gzip') in ('1', 'true', 'yes'):
+        return gzip_chunks(chunks), 'application/gzip', filename + '.gz', conn
+    return chunks, mimetype, filename, conn
@@ -0,0 +1,33 @@
+"""Gunicorn settings: import the app and its models once in the master, then fork.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Workers inherit the loaded models copy-on-write instead of each paying
+the import and load cost. Set INSIGHTIFY_PRELOAD=0 to load per worker
+(combine with INSIGHTIFY_LAZY_MODELS=1 to defer loading to the first
+prediction).
+"""
+import gc
+import logging
+import os
+
+bind = os.environ.get("INSIGHTIFY_BIND", "0.0.0.0:5001")
+workers = int(os.environ.get("INSIGHTIFY_WORKERS", 4))
+preload_app = os.environ.get("INSIGHTIFY_PRELOAD", "1") == "1"
+
+# Background threads started in the master would not exist in the workers
+os.environ.setdefault("INSIGHTIFY_DEFER_BACKGROUND_JOBS", "1")
+
+
+def when_ready(server):
+    # Everything allocated while preloading is moved out of the collector's
+    # reach, so GC passes in the workers do not write to (and copy) shared pages
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    import startup
+    from app import start_background_jobs
+
+    start_background_jobs()
+    logging.getLogger('app').info("Worker %s ready: %s", worker.pid, startup.report())
@@ -0,0 +1,177 @@
+from datetime import datetime
+
+from db import rebuilding
+
+# Weight of the newest score in the exponentially weighted average
+EWMA_ALPHA = 0.3
+# Trend times are days since this fixed point, which keeps the summed squares small
+TREND_EPOCH = datetime(2024, 1, 1)
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 200
+DEFAULT_WINDOW = 3
+MAX_WINDOW = 14
+# No slope is reported until a user's assessments are at least this many seconds apart
+MIN_TREND_SPAN = 3600
+# results rows read per query while rebuilding
+REBUILD_CHUNK = 5000
+
+
+class HistoryError(ValueError):
+    """Bad limit or window in a history request."""
+
+
+def _days(when):
+    return (when - TREND_EPOCH).total_seconds() / 86400
+
+
+def record_results(cursor, records, table='user_result_summary'):
+    """Fold new results into user_result_summary, in the caller's transaction.
+
+    Records are taken in arrival order, which is creation order for the
+    request path and the write-behind queue alike.
+    """
+    rows = []
+    for record in records:
+        score, when = int(record['total_score']), record['created_at']
+        t = _days(when)
+        rows.append((record['user_id'], when, when, score, record['risk_level'], score, score, t, t * t, t * score))
+    cursor.executemany(
+        f"INSERT INTO {table} (user_id, assessments, first_at, last_at, last_score, last_risk_level, "
+        "score_sum, ewma, sum_t, sum_tt, sum_ty) "
+        "VALUES (%s, 1, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE assessments = assessments + 1, last_at = VALUES(last_at), "
+        "last_score = VALUES(last_score), last_risk_level = VALUES(last_risk_level), "
+        "score_sum = score_sum + VALUES(score_sum), "
+        f"ewma = ewma + {EWMA_ALPHA} * (VALUES(ewma) - ewma), "
+        "sum_t = sum_t + VALUES(sum_t), sum_tt = sum_tt + VALUES(sum_tt), sum_ty = sum_ty + VALUES(sum_ty)",
+        rows
+    )
+
+
+def _as_datetime(value):
+    # MySQL hands back datetimes; other drivers may return ISO strings
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _trend(row, now):
+    n = int(row['assessments'])
+    sum_t, sum_tt, sum_ty = float(row['sum_t']), float(row['sum_tt']), float(row['sum_ty'])
+    sum_y = float(row['score_sum'])
+    first_at, last_at = _as_datetime(row['first_at']), _as_datetime(row['last_at'])
+    denominator = n * sum_tt - sum_t * sum_t
+    # Least-squares slope of score against time, once the assessments span long enough to mean anything
+    spread = (last_at - first_at).total_seconds() >= MIN_TREND_SPAN
+    slope = (n * sum_ty - sum_t * sum_y) / denominator if n > 1 and spread and denominator > 0 else None
+    return {
+        'assessments': n,
+        'first_at': first_at.isoformat(),
+        'last_at': last_at.isoformat(),
+        'last_score': int(row['last_score']),
+        'last_risk_level': row['last_risk_level'],
+        'mean_score': round(sum_y / n, 2),
+        'ewma_score': round(float(row['ewma']), 2),
+        'slope_per_day': None if slope is None else round(slope, 3),
+        'days_since_last': round((now - last_at).total_seconds() / 86400, 2)
+    }
+
+
+def summary(cursor, user_id, now=None):
+    """Trend figures for one user from their summary row alone, or None before any assessment."""
+    cursor.execute(
+        "SELECT assessments, first_at, last_at, last_score, last_risk_level, score_sum, ewma, sum_t, sum_tt, sum_ty "
+        "FROM user_result_summary WHERE user_id = %s",
+        (user_id,)
+    )
+    row = cursor.fetchone()
+    if row is None:
+        return None
+    if not isinstance(row, dict):
+        row = dict(zip(('assessments', 'first_at', 'last_at', 'last_score', 'last_risk_level', 'score_sum',
+                        'ewma', 'sum_t', 'sum_tt', 'sum_ty'), row))
+    return _trend(row, now or datetime.now())
+
+
+def _bounded_int(args, name, default, high):
+    value = args.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise HistoryError(f"{name} must be an integer")
+    if not 1 <= value <= high:
+        raise HistoryError(f"{name} must be between 1 and {high}")
+    return value
+
+
+def history(cursor, user_id, args):
+    """The user's latest results, newest first, with a trailing moving average, plus the summary."""
+    limit = _bounded_int(args, 'limit', DEFAULT_LIMIT, MAX_LIMIT)
+    window = _bounded_int(args, 'window', DEFAULT_WINDOW, MAX_WINDOW)
+
+    # Served by idx_results_user_created; the extra rows seed the average of the oldest entries shown
+    cursor.execute(
+        "SELECT total_score, result, risk_level, created_at FROM results "
+        "WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT %s",
+        (user_id, limit + window - 1)
+    )
+    rows = cursor.fetchall()
+
+    entries = []
+    scores = [int(row[0]) for row in rows]
+    for i, (score, result, risk_level, created_at) in enumerate(rows[:limit]):
+        recent = scores[i:i + window]
+        entries.append({
+            'created_at': _as_datetime(created_at).isoformat(),
+            'score': int(score),
+            'result': result,
+            'risk_level': risk_level,
+            'moving_average': round(sum(recent) / len(recent), 2)
+        })
+
+    return {
+        'window': window,
+        'summary': summary(cursor, user_id),
+        'results': entries
+    }
+
+
+def _results_in_order(cursor, chunk=REBUILD_CHUNK):
+    """Every results row in (user_id, created_at, id) order, read `chunk` rows per keyset query."""
+    sql = "SELECT id, user_id, total_score, risk_level, created_at FROM results"
+    order = " ORDER BY user_id, created_at, id LIMIT %s"
+    cursor.execute(sql + order, (chunk,))
+    while True:
+        rows = cursor.fetchall()
+        yield from rows
+        if len(rows) < chunk:
+            return
+        row_id, user_id, _, _, created_at = rows[-1]
+        cursor.execute(sql + " WHERE user_id > %s OR (user_id = %s AND (created_at > %s OR "
+                       "(created_at = %s AND id > %s)))" + order,
+                       (user_id, user_id, created_at, created_at, row_id, chunk))
+
+
+def rebuild(conn):
+    """Recompute user_result_summary from the raw results table (backfill or repair).
+
+    Built in a shadow table and swapped in; new results and /history
+    reads wait on table locks until it is done. Memory use is bounded by
+    REBUILD_CHUNK rows.
+    """
+    read = conn.cursor()
+    write = conn.cursor()
+    try:
+        with rebuilding(conn, 'user_result_summary', sources=('results',)) as shadow:
+            batch = []
+            for _, user_id, total_score, risk_level, created_at in _results_in_order(read):
+                batch.append({'user_id': user_id, 'total_score': total_score, 'risk_level': risk_level,
+                              'created_at': _as_datetime(created_at)})
+                if len(batch) >= 1000:
+                    record_results(write, batch, shadow)
+                    batch = []
+            if batch:
+                record_results(write, batch, shadow)
+    finally:
+        read.close()
+        write.close()
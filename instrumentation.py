@@ -0,0 +1,236 @@
+import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, has_request_context, request, before_render_template, template_rendered
+
+import db
+
+# Requests slower than this are logged with their DB/inference/render breakdown
+SLOW_REQUEST_MS = float(os.environ.get("INSIGHTIFY_SLOW_REQUEST_MS", 500))
+LOG_LEVEL = os.environ.get("INSIGHTIFY_LOG_LEVEL", "INFO")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000)
+
+slow_log = logging.getLogger('insightify.slow')
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram with one series per label set."""
+
+    def __init__(self, name, help_text, labels, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted(self._series.items())
+            items = [(labels, list(series)) for labels, series in items]
+        for label_values, series in items:
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            sep = ',' if base else ''
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f'{self.name}_sum{{{base}}} {series[-2]:.6f}')
+            lines.append(f'{self.name}_count{{{base}}} {series[-1]}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            base = ','.join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            lines.append(f'{self.name}{{{base}}} {value}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+request_latency = Histogram('insightify_http_request_duration_seconds', 'Request latency by route.',
+                            ('route', 'method', 'status'))
+slow_requests = Counter('insightify_http_slow_requests_total', 'Requests over the slow-request threshold.', ('route',))
+query_latency = Histogram('insightify_db_query_duration_seconds', 'DB statement latency.', ('route', 'statement'))
+query_rows = Histogram('insightify_db_query_rows', 'Rows returned or affected per DB statement.',
+                       ('statement',), buckets=ROW_BUCKETS)
+inference_latency = Histogram('insightify_model_inference_duration_seconds', 'Scaler/model prediction time.', ('kind',))
+render_latency = Histogram('insightify_template_render_duration_seconds', 'Jinja template render time.', ('template',))
+
+METRICS = (request_latency, slow_requests, query_latency, query_rows, inference_latency, render_latency)
+
+_STATEMENT = re.compile(r'^\s*(select|insert|update|delete|replace)\b.*?\b(?:from|into|update)\s+`?(\w+)', re.I | re.S)
+
+
+def statement_label(sql):
+    """Low-cardinality label for a statement, e.g. 'select messages'."""
+    match = _STATEMENT.match(sql)
+    if not match:
+        return sql.split(None, 1)[0].lower() if sql.strip() else 'unknown'
+    return f"{match.group(1).lower()} {match.group(2).lower()}"
+
+
+def _route():
+    if has_request_context():
+        return request.url_rule.rule if request.url_rule else 'unmatched'
+    return 'background'
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    stats = g.get('_instrumentation')
+    if stats is None:
+        stats = g._instrumentation = {'db_time': 0.0, 'queries': 0, 'inference_time': 0.0,
+                                      'render_time': 0.0, 'render_starts': []}
+    return stats
+
+
+def record_query(sql, seconds, rows):
+    label = statement_label(sql)
+    query_latency.observe(seconds, _route(), label)
+    if rows is not None and rows >= 0:
+        query_rows.observe(rows, label)
+    stats = _request_stats()
+    if stats is not None:
+        stats['db_time'] += seconds
+        stats['queries'] += 1
+
+
+@contextmanager
+def inference_timer(kind='single'):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        inference_latency.observe(elapsed, kind)
+        stats = _request_stats()
+        if stats is not None:
+            stats['inference_time'] += elapsed
+
+
+def _before_render(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None:
+        stats['render_starts'].append(time.perf_counter())
+
+
+def _rendered(sender, template, context, **extra):
+    stats = _request_stats()
+    if stats is not None and stats['render_starts']:
+        elapsed = time.perf_counter() - stats['render_starts'].pop()
+        stats['render_time'] += elapsed
+        render_latency.observe(elapsed, template.name or 'string')
+
+
+_logging = None  # (pid, QueueListener, stderr handler) of the process that set logging up
+
+
+def setup_logging(level=LOG_LEVEL):
+    """Send log records through a queue so request threads never block on stderr.
+
+    The listener thread does not survive fork, so a forked worker calls
+    this again (from start_background_jobs) to start its own.
+    """
+    global _logging
+    if _logging is not None and _logging[0] == os.getpid():
+        return _logging[1]
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(records)]
+    root.setLevel(level)
+    _logging = (os.getpid(), listener, handler)
+    return listener
+
+
+def _after_fork():
+    # No listener runs in the child yet: write straight to stderr instead of to a queue nobody drains
+    if _logging is not None:
+        logging.getLogger().handlers = [_logging[2]]
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def render_metrics():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def init_app(app, slow_request_ms=SLOW_REQUEST_MS):
+    db.query_listeners.append(record_query)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_rendered, app)
+
+    @app.before_request
+    def _start_timer():
+        g._request_start = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        start = g.pop('_request_start', None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        route = _route()
+        request_latency.observe(elapsed, route, request.method, str(response.status_code))
+
+        if elapsed * 1000 >= slow_request_ms:
+            slow_requests.inc(route)
+            stats = _request_stats()
+            slow_log.warning(
+                "%s %s -> %s in %.1f ms (db %.1f ms over %d queries, inference %.2f ms, render %.1f ms)",
+                request.method, request.path, response.status_code, elapsed * 1000,
+                stats['db_time'] * 1000, stats['queries'], stats['inference_time'] * 1000,
+                stats['render_time'] * 1000
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
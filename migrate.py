@@ -0,0 +1,220 @@
+"""Versioned schema migrations, plus a query-plan check for the hot queries.
+
+Migrations are the numbered files in migrations/ (NNNN_description.sql),
+applied in order and recorded in schema_migrations with a checksum.
+
+    python migrate.py                # apply pending migrations
+    python migrate.py --to 3         # apply up to and including 0003
+    python migrate.py status
+    python migrate.py check-plans    # EXPLAIN the hot queries; exit 1 on a full table scan
+
+MySQL commits DDL implicitly, so a migration cannot be rolled back as a
+whole. Instead, a statement that fails because its table, column or
+index already exists is skipped with a warning. This lets a database set
+up by hand from the old sql/ scripts adopt the migrations, and lets a
+half-applied migration be re-run.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+from datetime import datetime
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+# Full scans of tables this small are left to the optimizer's judgement
+PLAN_MIN_ROWS = int(os.environ.get("INSIGHTIFY_PLAN_MIN_ROWS", 1000))
+
+_FILENAME = re.compile(r'^(\d{4})_(\w+)\.sql$')
+# MySQL error numbers for "already exists": table, column, index
+_ALREADY_EXISTS = {1050, 1060, 1061}
+
+
+class MigrationError(RuntimeError):
+    """Malformed migrations directory, or an applied migration that was edited."""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding='utf-8') as file:
+            self.sql = file.read()
+        # Line endings do not change what a migration does
+        self.checksum = hashlib.sha256(self.sql.replace('\r\n', '\n').encode()).hexdigest()
+
+    def statements(self):
+        """Statements in order; comments dropped, each ends with ';' at the end of a line."""
+        lines = [line for line in self.sql.splitlines() if not line.strip().startswith('--')]
+        return [statement.strip() for statement in re.split(r';\s*$', '\n'.join(lines), flags=re.M)
+                if statement.strip()]
+
+
+def discover(directory=MIGRATIONS_DIR):
+    migrations = {}
+    for filename in sorted(os.listdir(directory)):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"Two migrations numbered {version:04d}")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _ensure_table(cursor):
+    cursor.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INT NOT NULL PRIMARY KEY, name VARCHAR(255) NOT NULL, checksum CHAR(64) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    )
+
+
+def applied(cursor):
+    """{version: checksum} of the migrations already applied."""
+    _ensure_table(cursor)
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return {int(version): checksum for version, checksum in cursor.fetchall()}
+
+
+def status(conn, directory=MIGRATIONS_DIR):
+    cursor = conn.cursor()
+    try:
+        done = applied(cursor)
+    finally:
+        cursor.close()
+    rows = []
+    for migration in discover(directory):
+        state = 'pending'
+        if migration.version in done:
+            state = 'applied' if done[migration.version] == migration.checksum else 'changed'
+        rows.append({'version': migration.version, 'name': migration.name, 'state': state})
+    return rows
+
+
+def migrate(conn, target=None, directory=MIGRATIONS_DIR):
+    """Apply pending migrations up to `target` (default: all); returns the versions applied."""
+    import mysql.connector
+
+    cursor = conn.cursor()
+    ran = []
+    try:
+        done = applied(cursor)
+        for migration in discover(directory):
+            if target is not None and migration.version > target:
+                break
+            if migration.version in done:
+                if done[migration.version] != migration.checksum:
+                    raise MigrationError(f"Migration {migration.version:04d}_{migration.name} was edited after "
+                                         f"it was applied; add a new migration instead")
+                continue
+
+            log.info("Applying migration %04d_%s", migration.version, migration.name)
+            for statement in migration.statements():
+                try:
+                    cursor.execute(statement)
+                except mysql.connector.Error as e:
+                    if e.errno not in _ALREADY_EXISTS:
+                        raise
+                    log.warning("%04d_%s: skipped, already in place: %s", migration.version, migration.name, e.msg)
+            cursor.execute(
+                "INSERT INTO schema_migrations (version, name, checksum, applied_at) VALUES (%s, %s, %s, %s)",
+                (migration.version, migration.name, migration.checksum, datetime.now())
+            )
+            conn.commit()
+            ran.append(migration.version)
+    finally:
+        cursor.close()
+    return ran
+
+
+def hot_queries():
+    """(label, sql, params) for the queries run on every login, page load or admin listing."""
+    from counters import UNREAD_CONDITION
+    from pagination import users_listing, messages_listing, doctors_listing
+
+    email = 'someone@example.com'
+    yield 'login/signup user by email', "SELECT id, fullname, email, password FROM users WHERE email = %s", (email,)
+    yield 'admin login by email', "SELECT id, fullname, email, password FROM admins WHERE email = %s", (email,)
+    yield 'questionnaire options', "SELECT * FROM options WHERE question_id IN (%s, %s, %s)", (1, 2, 3)
+    yield 'unread messages count', f"SELECT COUNT(*) FROM messages WHERE {UNREAD_CONDITION}", ()
+    yield 'results by risk level', "SELECT COUNT(*) FROM results WHERE risk_level = %s", ('Moderate',)
+    yield 'user history', ("SELECT total_score, result, risk_level, created_at FROM results "
+                           "WHERE user_id = %s ORDER BY created_at DESC, id DESC LIMIT %s"), (1, 32)
+    yield 'user result summary', "SELECT * FROM user_result_summary WHERE user_id = %s", (1,)
+
+    listings = (
+        ('users page', users_listing, {}),
+        ('users by registration date', users_listing, {'sort': 'date_registered', 'registered_from': '2024-01-01'}),
+        ('messages page', messages_listing, {}),
+        ('unreplied messages', messages_listing, {'unreplied': '1'}),
+        ('unreplied messages by date', messages_listing, {'unreplied': '1', 'sort': 'date_sent'}),
+        ('doctors by name', doctors_listing, {}),
+        ('doctors by specialization', doctors_listing, {'specialization': 'Psychiatrist'}),
+    )
+    for label, listing, args in listings:
+        sql, params, _, _ = listing.query(args)
+        yield label, sql, tuple(params)
+
+
+def check_plans(conn, min_rows=PLAN_MIN_ROWS):
+    """EXPLAIN every hot query; returns [(label, table, reason)] for the ones doing full table scans.
+
+    A full scan fails the check when no index could serve it at all, or
+    when the table has at least `min_rows` rows.
+    """
+    cursor = conn.cursor(dictionary=True)
+    failures = []
+    try:
+        for label, sql, params in hot_queries():
+            cursor.execute(f"EXPLAIN {sql}", params)
+            for row in cursor.fetchall():
+                if row.get('type') != 'ALL':
+                    continue
+                rows = int(row.get('rows') or 0)
+                if not row.get('possible_keys'):
+                    failures.append((label, row['table'], f"full scan, no usable index (~{rows} rows)"))
+                elif rows >= min_rows:
+                    failures.append((label, row['table'], f"full scan of ~{rows} rows despite {row['possible_keys']}"))
+    finally:
+        cursor.close()
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', nargs='?', default='up', choices=('up', 'status', 'check-plans'))
+    parser.add_argument('--to', type=int, help='last migration version to apply')
+    parser.add_argument('--min-rows', type=int, default=PLAN_MIN_ROWS,
+                        help='smallest table whose full scan fails check-plans')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(message)s')
+
+    from db import get_connection
+
+    conn = get_connection()
+    try:
+        if args.command == 'status':
+            for row in status(conn):
+                print(f"{row['version']:04d}_{row['name']:<32} {row['state']}")
+        elif args.command == 'check-plans':
+            failures = check_plans(conn, args.min_rows)
+            for label, table, reason in failures:
+                print(f"FAIL {label}: {table}: {reason}")
+            print(f"{len(failures)} hot queries scan a whole table" if failures else "All hot queries use an index")
+            return 1 if failures else 0
+        else:
+            ran = migrate(conn, args.to)
+            print(f"Applied {len(ran)} migrations" + (f": {', '.join(f'{v:04d}' for v in ran)}" if ran else ''))
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,12 @@
+-- Indexes for the lookups on every login, signup and questionnaire load.
+
+-- login/signup (WHERE email = %s); also enforces one account per address
+CREATE UNIQUE INDEX idx_users_email ON users (email);
+-- admin_login (WHERE email = %s)
+CREATE UNIQUE INDEX idx_admins_email ON admins (email);
+-- questionnaire.py (options WHERE question_id IN (...))
+CREATE INDEX idx_options_question ON options (question_id);
+-- GET /history and user deletes (WHERE user_id = %s ORDER BY created_at)
+CREATE INDEX idx_results_user_created ON results (user_id, created_at);
+-- counters.py per-risk-level counts (WHERE risk_level = %s)
+CREATE INDEX idx_results_risk_level ON results (risk_level);
@@ -0,0 +1,17 @@
+-- Indexes backing the keyset-paginated admin listings (pagination.py).
+-- Each listing orders by (sort column, id), so each composite index below
+-- lets a page be read as a range scan of LIMIT rows.
+
+-- /admin/users: sort by id / date_registered / fullname, prefix search, date range
+CREATE INDEX idx_users_date_registered ON users (date_registered, id);
+CREATE INDEX idx_users_fullname ON users (fullname, id);
+-- Prefix search on email reuses idx_users_email from 0002
+
+-- /admin/messages: sort by id / date_sent, prefix search, date range
+CREATE INDEX idx_messages_date_sent ON messages (date_sent, id);
+CREATE INDEX idx_messages_email ON messages (email);
+CREATE INDEX idx_messages_name ON messages (name);
+
+-- /admin/doctors: sort by name / specialization, specialization filter
+CREATE INDEX idx_doctors_name ON doctors (name, id);
+CREATE INDEX idx_doctors_specialization ON doctors (specialization, id);
@@ -0,0 +1,8 @@
+-- Summary table for counters.py: unread messages, users, results and
+-- results per risk level ('results_risk:<level>'). Write paths adjust rows
+-- in their own transaction; reconcile() rewrites them from the base tables.
+CREATE TABLE IF NOT EXISTS admin_counters (
+    name VARCHAR(64) NOT NULL PRIMARY KEY,
+    value BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- Rollup of the results table for analytics.py: one row per
+-- (granularity, bucket, gender, location, age band, result, risk level).
+-- submit_questionnaire increments the day, week and month rows for every
+-- new result; analytics.rebuild() backfills it from the raw results.
+CREATE TABLE IF NOT EXISTS results_rollup (
+    granularity ENUM('day', 'week', 'month') NOT NULL,
+    bucket_start DATE NOT NULL,
+    gender VARCHAR(64) NOT NULL,
+    location VARCHAR(64) NOT NULL,
+    age_band VARCHAR(16) NOT NULL,
+    result VARCHAR(64) NOT NULL,
+    risk_level VARCHAR(32) NOT NULL,
+    count INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (granularity, bucket_start, gender, location, age_band, result, risk_level)
+);
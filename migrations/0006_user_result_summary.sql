@@ -0,0 +1,19 @@
+-- Per-user assessment summary for history.py: one row per user, updated in
+-- the same transaction as each new result, so trend figures never scan
+-- results (GET /history reads the rows themselves through
+-- idx_results_user_created from 0002). history.rebuild() backfills it.
+CREATE TABLE IF NOT EXISTS user_result_summary (
+    user_id INT NOT NULL PRIMARY KEY,
+    assessments INT UNSIGNED NOT NULL DEFAULT 0,
+    first_at DATETIME NOT NULL,
+    last_at DATETIME NOT NULL,
+    last_score TINYINT UNSIGNED NOT NULL,
+    last_risk_level VARCHAR(32) NOT NULL,
+    score_sum INT UNSIGNED NOT NULL DEFAULT 0,
+    -- Exponentially weighted average of the scores in arrival order
+    ewma DOUBLE NOT NULL,
+    -- Least-squares sums over (days since history.TREND_EPOCH, score) for the slope
+    sum_t DOUBLE NOT NULL DEFAULT 0,
+    sum_tt DOUBLE NOT NULL DEFAULT 0,
+    sum_ty DOUBLE NOT NULL DEFAULT 0
+);
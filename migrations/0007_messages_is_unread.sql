@@ -0,0 +1,10 @@
+-- Unread messages: "reply IS NULL OR reply = ''" cannot use an index, so the
+-- condition is materialized as a stored generated column that the unread
+-- count, the unreplied listing filter and exports query instead. MySQL
+-- keeps it up to date on every write; no application code sets it.
+ALTER TABLE messages
+    ADD COLUMN is_unread TINYINT(1) GENERATED ALWAYS AS (reply IS NULL OR reply = '') STORED NOT NULL;
+
+-- (is_unread, id) serves COUNT(*) and the unreplied listing by id; the second one by date_sent
+CREATE INDEX idx_messages_unread ON messages (is_unread, id);
+CREATE INDEX idx_messages_unread_date_sent ON messages (is_unread, date_sent, id);
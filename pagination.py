@@ -0,0 +1,186 @@
+import base64
+import json
+from datetime import date, datetime
+
+from counters import UNREAD_CONDITION
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class PaginationError(ValueError):
+    """Bad cursor, sort or filter value in a listing request."""
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, (datetime, date)):
+        sort_value = str(sort_value)
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        sort_value, row_id = json.loads(raw)
+    except Exception:
+        raise PaginationError("Invalid cursor")
+    if not isinstance(row_id, int):
+        raise PaginationError("Invalid cursor")
+    return sort_value, row_id
+
+
+def page_size(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise PaginationError("limit must be an integer")
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+class Listing:
+    """Keyset-paginated listing over one table.
+
+    Pages are ordered by (sort column, id) and continue from an opaque
+    cursor holding the last row's values, so every page is an index range
+    scan of `limit` rows no matter how deep into the table it is.
+    """
+
+    def __init__(self, table, columns, sorts, default_sort, filters, default_order='desc'):
+        self.table = table
+        self.columns = columns
+        self.sorts = sorts  # public sort name -> column
+        self.default_sort = default_sort
+        self.default_order = default_order
+        self.filters = filters  # callable(args) -> (clauses, params)
+
+    def query(self, args):
+        sort = args.get('sort') or self.default_sort
+        if sort not in self.sorts:
+            raise PaginationError(f"sort must be one of: {', '.join(self.sorts)}")
+        column = self.sorts[sort]
+
+        order = (args.get('order') or self.default_order).lower()
+        if order not in ('asc', 'desc'):
+            raise PaginationError("order must be 'asc' or 'desc'")
+        op = '<' if order == 'desc' else '>'
+
+        limit = page_size(args.get('limit'))
+        clauses, params = self.filters(args)
+        clauses, params = list(clauses), list(params)
+
+        cursor_token = args.get('cursor')
+        if cursor_token:
+            sort_value, last_id = decode_cursor(cursor_token)
+            if column == 'id':
+                clauses.append(f"id {op} %s")
+                params.append(last_id)
+            else:
+                clauses.append(f"({column} {op} %s OR ({column} = %s AND id {op} %s))")
+                params.extend([sort_value, sort_value, last_id])
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ''
+        # Fetch one extra row to know whether another page exists
+        sql = (f"SELECT {self.columns} FROM {self.table}{where} "
+               f"ORDER BY {column} {order.upper()}, id {order.upper()} LIMIT %s")
+        params.append(limit + 1)
+        return sql, params, column, limit
+
+    def fetch_page(self, cursor, args):
+        """Run one page query on a dictionary cursor; returns (rows, next_cursor)."""
+        sql, params, column, limit = self.query(args)
+        cursor.execute(sql, tuple(params))
+        rows = cursor.fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = encode_cursor(last[column], last['id'])
+        return rows, next_cursor
+
+
+def _prefix(value):
+    # Prefix matches can use an index; escape LIKE wildcards in user input
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return escaped + '%'
+
+
+def _date_range(column, args, start_key, end_key):
+    clauses, params = [], []
+    for key, op in ((start_key, '>='), (end_key, '<')):
+        value = args.get(key)
+        if not value:
+            continue
+        try:
+            day = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise PaginationError(f"{key} must be a YYYY-MM-DD date")
+        if op == '<':
+            # Inclusive end date
+            day = date.fromordinal(day.toordinal() + 1)
+        clauses.append(f"{column} {op} %s")
+        params.append(day)
+    return clauses, params
+
+
+def _user_filters(args):
+    clauses, params = _date_range('date_registered', args, 'registered_from', 'registered_to')
+    q = (args.get('q') or '').strip()
+    if q:
+        clauses.append("(email LIKE %s OR fullname LIKE %s)")
+        params.extend([_prefix(q.lower()), _prefix(q)])
+    return clauses, params
+
+
+def _message_filters(args):
+    clauses, params = _date_range('date_sent', args, 'sent_from', 'sent_to')
+    if args.get('unreplied') in ('1', 'true', 'yes'):
+        clauses.append(UNREAD_CONDITION)
+    q = (args.get('q') or '').strip()
+    if q:
+        clauses.append("(email LIKE %s OR name LIKE %s)")
+        params.extend([_prefix(q.lower()), _prefix(q)])
+    return clauses, params
+
+
+def _doctor_filters(args):
+    clauses, params = [], []
+    specialization = (args.get('specialization') or '').strip()
+    if specialization:
+        clauses.append("specialization = %s")
+        params.append(specialization)
+    q = (args.get('q') or '').strip()
+    if q:
+        clauses.append("name LIKE %s")
+        params.append(_prefix(q))
+    return clauses, params
+
+
+users_listing = Listing(
+    'users', 'id, fullname, email, date_registered',
+    sorts={'id': 'id', 'date_registered': 'date_registered', 'fullname': 'fullname'},
+    default_sort='id', filters=_user_filters
+)
+
+messages_listing = Listing(
+    'messages', 'id, name, email, content, reply, replied_at, date_sent',
+    sorts={'id': 'id', 'date_sent': 'date_sent'},
+    default_sort='id', filters=_message_filters
+)
+
+doctors_listing = Listing(
+    'doctors', 'id, name, specialization, contact_info',
+    sorts={'id': 'id', 'name': 'name', 'specialization': 'specialization'},
+    default_sort='name', filters=_doctor_filters, default_order='asc'
+)
+
+
+def jsonable(rows):
+    """Format dates the way the templates print them, for rows sent as JSON."""
+    return [
+        {key: str(value) if isinstance(value, (datetime, date)) else value for key, value in row.items()}
+        for row in rows
+    ]
@@ -0,0 +1,619 @@
+import json
+import logging
+import math
+import os
+import pickle
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+MODEL_PATH = 'models/depression_model.pkl'
+# Only read for legacy artifacts that pickle the bare model; training.py bundles the scaler
+SCALER_PATH = 'scaler.pkl'
+ITEMS_MODEL_PATH = 'models/depression_items_model.pkl'
+# Model that scores submissions ('total' or 'items'); 'items' falls back to 'total' when it cannot be used
+ACTIVE_MODEL = os.environ.get("INSIGHTIFY_MODEL", "total")
+# Seconds between checks of the model files for a new artifact; 0 disables hot reload
+MODEL_WATCH_INTERVAL = float(os.environ.get("INSIGHTIFY_MODEL_WATCH_INTERVAL", 5))
+# Load models on first prediction instead of at import (leave off when preloading before fork)
+LAZY_MODELS = os.environ.get("INSIGHTIFY_LAZY_MODELS", "0") == "1"
+# Keep the compiled lookup tables next to the artifacts so later processes skip sklearn entirely
+SERVING_CACHE = os.environ.get("INSIGHTIFY_MODEL_SERVING_CACHE", "1") == "1"
+COMPILED_FORMAT = 1
+
+# PHQ-9 totals are the sum of nine items scored 0-3
+MIN_SCORE = 0
+MAX_SCORE = 27
+
+# Model label -> (result shown to the user, risk level)
+prediction_map = {
+    "Minimal": ("Minimal or No Depression", "Low"),
+    "Mild": ("Mild Depression", "Moderate"),
+    "Moderate": ("Moderate Depression", "Moderate"),
+    "Moderately": ("Moderately Severe Depression", "High"),
+    "Severe": ("Severe Depression", "Very High")
+}
+UNKNOWN = ("Unknown", "Unknown")
+
+# Batch scoring limits for /predict/batch
+BATCH_CHUNK_SIZE = int(os.environ.get("INSIGHTIFY_BATCH_CHUNK_SIZE", 1000))
+BATCH_MAX_ITEMS = int(os.environ.get("INSIGHTIFY_BATCH_MAX_ITEMS", 50000))
+PHQ_ITEMS = tuple(f'phq{i}' for i in range(1, 10))
+
+# Per-item model features: nine answers, age and one-hot sex ('prefer not to say' is all zeros)
+SEX_CATEGORIES = ('male', 'female', 'other')
+SEX_ALIASES = {'transgender': 'other'}
+ITEM_FEATURES = PHQ_ITEMS + ('age',) + tuple(f'sex_{sex}' for sex in SEX_CATEGORIES)
+
+
+def check_artifact(artifact, n_features):
+    """Schema check run before any prediction is attempted with a new artifact."""
+    if not isinstance(artifact, dict) or 'model' not in artifact or 'scaler' not in artifact:
+        raise ValueError("Model artifact must be a dict with 'model' and 'scaler'")
+    model, scaler = artifact['model'], artifact['scaler']
+    for attr in ('classes_', 'coef_', 'intercept_', 'predict'):
+        if not hasattr(model, attr):
+            raise ValueError(f"Model has no '{attr}'; is it a fitted linear classifier?")
+    for attr in ('mean_', 'scale_'):
+        if not hasattr(scaler, attr):
+            raise ValueError(f"Scaler has no '{attr}'; is it a fitted StandardScaler?")
+    if np.shape(scaler.mean_) != (n_features,) or np.shape(model.coef_)[-1] != n_features:
+        raise ValueError(f"Artifact expects {np.shape(model.coef_)[-1]} features, this model takes {n_features}")
+    if not isinstance(artifact.get('metadata', {}), dict):
+        raise ValueError("Artifact metadata must be a dict")
+
+
+def _signature(path):
+    """(mtime, size) of a model file, None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _compiled_path(path):
+    return os.path.splitext(path)[0] + '.serving.npz'
+
+
+def _compiled_key(*paths):
+    key = [COMPILED_FORMAT]
+    for path in paths:
+        key.extend(_signature(path) or (0, 0))
+    return key
+
+
+def read_compiled(path, key):
+    """Arrays and metadata compiled from the artifact at `path`, None when missing or stale."""
+    if not SERVING_CACHE:
+        return None
+    try:
+        with np.load(_compiled_path(path), allow_pickle=False) as data:
+            if data['key'].tolist() != key:
+                return None
+            arrays = {name: data[name] for name in data.files if name not in ('key', 'metadata')}
+            metadata = json.loads(str(data['metadata']))
+    except (OSError, KeyError, ValueError):
+        return None
+    return arrays, metadata
+
+
+def write_compiled(path, key, arrays, metadata):
+    """Best effort; on a read-only deploy every process simply compiles for itself."""
+    if not SERVING_CACHE:
+        return
+    target = _compiled_path(path)
+    tmp_path = None
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target) or '.', suffix='.tmp')
+        with os.fdopen(fd, 'wb') as file:
+            np.savez(file, key=np.asarray(key, dtype=np.int64),
+                     metadata=np.asarray(json.dumps(metadata, default=str)), **arrays)
+        os.replace(tmp_path, target)
+    except OSError as e:
+        log.info("Could not write compiled model %s: %s", target, e)
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+class PredictionEngine:
+    """Serves PHQ-9 predictions from a table precomputed at load time.
+
+    The model only ever sees a single integer feature in 0..27, so every
+    possible answer is computed once with the scaler and model and stored
+    as an int8 array of label indices. Requests are then a bounds check
+    and an array lookup, with no pandas or sklearn call on the hot path.
+    The table is also written beside the artifact, so processes started
+    later load it with NumPy alone and never import sklearn.
+    """
+
+    def __init__(self, model_path=MODEL_PATH, scaler_path=SCALER_PATH):
+        self.model_path = model_path
+        self.scaler_path = scaler_path
+        self.metadata = {}
+        self.loaded_at = None
+        self.load_seconds = None
+        self.signature = None
+        # (labels, outcomes, table) swapped as one tuple so readers never see a mix
+        self._state = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    @staticmethod
+    def _read(path):
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+
+    @staticmethod
+    def build_table(model, scaler):
+        scores = np.arange(MIN_SCORE, MAX_SCORE + 1, dtype=np.float64).reshape(-1, 1)
+        scaled = (scores - scaler.mean_) / scaler.scale_
+        predicted = model.predict(scaled)
+
+        labels = tuple(str(label) for label in model.classes_)
+        index = {label: i for i, label in enumerate(model.classes_)}
+        table = np.fromiter((index[p] for p in predicted), dtype=np.int8, count=len(predicted))
+        return labels, table
+
+    @staticmethod
+    def verify_table(model, scaler, labels, table):
+        """Check the table against the model's own scaler.transform/predict path."""
+        scores = np.arange(MIN_SCORE, MAX_SCORE + 1, dtype=np.float64).reshape(-1, 1)
+        with warnings.catch_warnings():
+            # The scaler was fitted on a named DataFrame column
+            warnings.simplefilter('ignore', UserWarning)
+            expected = np.asarray(model.predict(scaler.transform(scores))).astype(str)
+        actual = np.asarray(labels)[table]
+        mismatched = np.flatnonzero(expected != actual)
+        if mismatched.size:
+            raise ValueError(f"Prediction table disagrees with model.predict for scores {mismatched.tolist()}")
+
+    def install(self, model, scaler, metadata=None):
+        """Build, verify and swap in the lookup table for a model/scaler pair."""
+        labels, table = self.build_table(model, scaler)
+        self.verify_table(model, scaler, labels, table)
+        self.activate(labels, table, metadata)
+        return labels, table
+
+    def activate(self, labels, table, metadata=None):
+        if len(table) != MAX_SCORE - MIN_SCORE + 1 or not 0 <= table.min() <= table.max() < len(labels):
+            raise ValueError("Prediction table does not cover every score with a known label")
+        outcomes = tuple(prediction_map.get(label, UNKNOWN) for label in labels)
+        for label, outcome in zip(labels, outcomes):
+            if outcome is UNKNOWN:
+                log.warning("Model label '%s' has no entry in prediction_map", label)
+
+        with self._lock:
+            self.metadata = dict(metadata or {})
+            self._state = (labels, outcomes, table)
+
+    def load(self):
+        start = time.perf_counter()
+        signature = _signature(self.model_path)
+        key = _compiled_key(self.model_path, self.scaler_path)
+        compiled = read_compiled(self.model_path, key)
+        if compiled is not None:
+            arrays, metadata = compiled
+            self.activate(tuple(str(label) for label in arrays['labels']), arrays['table'], metadata)
+        else:
+            artifact = self._read(self.model_path)
+            if not isinstance(artifact, dict):
+                # Legacy layout: bare model here, scaler in scaler.pkl
+                artifact = {'model': artifact, 'scaler': self._read(self.scaler_path), 'metadata': {'version': 'legacy'}}
+            check_artifact(artifact, 1)
+            # install() smoke-predicts every score 0..27 before swapping
+            labels, table = self.install(artifact['model'], artifact['scaler'], artifact.get('metadata'))
+            write_compiled(self.model_path, key, {'labels': np.asarray(labels), 'table': table}, self.metadata)
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def reload(self):
+        """Reload the pickles from disk; the previous table stays active on failure."""
+        return self.load()
+
+    @property
+    def loaded(self):
+        return self._state is not None
+
+    def _current(self):
+        state = self._state
+        if state is None:
+            # Lazy mode: the first prediction in this process loads the model
+            with self._load_lock:
+                if self._state is None:
+                    self.load()
+            state = self._state
+        return state
+
+    @staticmethod
+    def validate_score(score):
+        if isinstance(score, bool):
+            raise ValueError("Score must be an integer")
+        if isinstance(score, float) and score.is_integer():
+            score = int(score)
+        if isinstance(score, str) and score.strip().lstrip('-').isdigit():
+            score = int(score)
+        if not isinstance(score, (int, np.integer)):
+            raise ValueError("Score must be an integer")
+        if not MIN_SCORE <= score <= MAX_SCORE:
+            raise ValueError(f"Score must be between {MIN_SCORE} and {MAX_SCORE}")
+        return int(score)
+
+    def predict(self, score):
+        """Return the raw model label for a total score."""
+        labels, _, table = self._current()
+        return labels[table[self.validate_score(score)]]
+
+    def classify(self, score):
+        """Return (label, result, risk_level) for a total score."""
+        labels, outcomes, table = self._current()
+        i = table[self.validate_score(score)]
+        result, risk_level = outcomes[i]
+        return labels[i], result, risk_level
+
+    def classify_many(self, scores):
+        """Vectorized classify for an int array of already validated scores.
+
+        Returns (labels, results, risk_levels) as arrays aligned with scores.
+        """
+        labels, outcomes, table = self._current()
+        idx = table[scores]
+        return (np.asarray(labels, dtype=object)[idx],
+                np.asarray([o[0] for o in outcomes], dtype=object)[idx],
+                np.asarray([o[1] for o in outcomes], dtype=object)[idx])
+
+
+def item_features(answers, ages, sexes):
+    """Feature matrix for the per-item model, shared by training and serving."""
+    answers = np.asarray(answers, dtype=np.float64).reshape(-1, len(PHQ_ITEMS))
+    ages = np.asarray(ages, dtype=np.float64).reshape(-1, 1)
+    sexes = np.asarray([SEX_ALIASES.get(str(sex).strip().lower(), str(sex).strip().lower()) for sex in sexes])
+    onehot = (sexes[:, None] == np.asarray(SEX_CATEGORIES)).astype(np.float64)
+    return np.hstack([answers, ages, onehot])
+
+
+class ItemPredictionEngine:
+    """Serves the per-item PHQ-9 model as one affine map.
+
+    The scaler is folded into the logistic regression coefficients at
+    load time, so a prediction is a single (labels x features) dot
+    product plus argmax over a 13-value vector, without sklearn.
+    """
+
+    def __init__(self, model_path=ITEMS_MODEL_PATH):
+        self.model_path = model_path
+        self.metadata = {}
+        self.loaded_at = None
+        self.load_seconds = None
+        self.signature = None
+        # (labels, outcomes, weights, bias, default age)
+        self._state = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fold(model, scaler):
+        """Return (weights, bias) so that argmax(weights @ x + bias) == model.predict(scaler.transform(x))."""
+        coef = np.asarray(model.coef_, dtype=np.float64)
+        intercept = np.asarray(model.intercept_, dtype=np.float64)
+        if coef.shape[0] == 1:
+            # Binary models score the positive class only; give the negative class a zero row
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        weights = coef / scaler.scale_
+        bias = intercept - weights @ scaler.mean_
+        return weights, bias
+
+    @staticmethod
+    def verify(model, scaler, weights, bias, samples=2000, seed=0):
+        """Check the folded weights against sklearn on every total 0..27 and random combinations."""
+        rng = np.random.default_rng(seed)
+        # One answer set per total, filling items left to right
+        totals = np.arange(MIN_SCORE, MAX_SCORE + 1)
+        per_total = np.clip(totals[:, None] - 3 * np.arange(len(PHQ_ITEMS)), 0, 3)
+        answers = np.vstack([per_total, rng.integers(0, 4, size=(samples, len(PHQ_ITEMS)))])
+        n = len(answers)
+        X = item_features(answers, rng.integers(12, 80, size=n), rng.choice(SEX_CATEGORIES + ('',), size=n))
+        expected = np.asarray(model.predict(scaler.transform(X))).astype(str)
+        actual = np.asarray(model.classes_).astype(str)[np.argmax(X @ weights.T + bias, axis=1)]
+        mismatched = np.flatnonzero(expected != actual)
+        if mismatched.size:
+            raise ValueError(f"Folded item model disagrees with model.predict on {mismatched.size} of {n} cases")
+
+    def install(self, model, scaler, metadata=None):
+        weights, bias = self.fold(model, scaler)
+        self.verify(model, scaler, weights, bias)
+        labels = tuple(str(label) for label in model.classes_)
+        self.activate(labels, weights, bias, metadata)
+        return labels, weights, bias
+
+    def activate(self, labels, weights, bias, metadata=None):
+        if weights.shape != (len(labels), len(ITEM_FEATURES)) or bias.shape != (len(labels),):
+            raise ValueError(f"Item model weights must be {len(labels)} x {len(ITEM_FEATURES)}")
+        outcomes = tuple(prediction_map.get(label, UNKNOWN) for label in labels)
+        metadata = dict(metadata or {})
+        with self._lock:
+            self.metadata = metadata
+            self._state = (labels, outcomes, weights, bias, float(metadata.get('age_median', 30)))
+
+    def load(self):
+        start = time.perf_counter()
+        signature = _signature(self.model_path)
+        key = _compiled_key(self.model_path)
+        compiled = read_compiled(self.model_path, key)
+        if compiled is not None:
+            arrays, metadata = compiled
+            self.activate(tuple(str(label) for label in arrays['labels']), arrays['weights'], arrays['bias'], metadata)
+        else:
+            with open(self.model_path, 'rb') as file:
+                artifact = pickle.load(file)
+            check_artifact(artifact, len(ITEM_FEATURES))
+            labels, weights, bias = self.install(artifact['model'], artifact['scaler'], artifact.get('metadata'))
+            write_compiled(self.model_path, key, {'labels': np.asarray(labels), 'weights': weights, 'bias': bias},
+                           self.metadata)
+        self.signature = signature
+        self.loaded_at = time.time()
+        self.load_seconds = time.perf_counter() - start
+        return self
+
+    def reload(self):
+        return self.load()
+
+    @property
+    def loaded(self):
+        return self._state is not None
+
+    @staticmethod
+    def validate_answers(answers):
+        if answers is None or len(answers) != len(PHQ_ITEMS):
+            raise ValueError(f"Exactly {len(PHQ_ITEMS)} answers are required")
+        values = []
+        for answer in answers:
+            if isinstance(answer, bool) or not isinstance(answer, (int, np.integer)) or not 0 <= answer <= 3:
+                raise ValueError("Answers must be integers between 0 and 3")
+            values.append(int(answer))
+        return values
+
+    def classify(self, answers, age=None, sex=None):
+        """Return (label, result, risk_level) for nine answers plus optional age and sex."""
+        labels, outcomes, weights, bias, default_age = self._state
+        answers = self.validate_answers(answers)
+        try:
+            age = float(age)
+        except (TypeError, ValueError):
+            age = math.nan
+        if not math.isfinite(age):
+            age = default_age
+
+        x = item_features(answers, age, (sex or '',))[0]
+        i = int(np.argmax(weights @ x + bias))
+        result, risk_level = outcomes[i]
+        return labels[i], result, risk_level
+
+    def classify_many(self, answers, ages, sexes):
+        """Vectorized classify for validated answer rows; NaN ages take the training median.
+
+        Returns (labels, results, risk_levels) as arrays aligned with the rows.
+        """
+        labels, outcomes, weights, bias, default_age = self._state
+        ages = np.asarray(ages, dtype=np.float64)
+        ages = np.where(np.isfinite(ages), ages, default_age)
+        idx = np.argmax(item_features(answers, ages, sexes) @ weights.T + bias, axis=1)
+        return (np.asarray(labels, dtype=object)[idx],
+                np.asarray([o[0] for o in outcomes], dtype=object)[idx],
+                np.asarray([o[1] for o in outcomes], dtype=object)[idx])
+
+
+class ModelRegistry:
+    """Named prediction engines; `active` picks the one that scores submissions.
+
+    'total' scores the PHQ-9 total and is always available. 'items' needs
+    its artifact on disk and all nine answers; submissions fall back to
+    'total' otherwise.
+    """
+
+    def __init__(self, active=ACTIVE_MODEL):
+        self.active = active
+        self._engines = {}
+        self._errors = {}
+        self._reload_lock = threading.Lock()
+        self._watcher = None
+        self._tried = set()
+
+    def register(self, name, engine):
+        self._engines[name] = engine
+
+    def get(self, name):
+        return self._engines[name]
+
+    def names(self):
+        return list(self._engines)
+
+    def loaded(self):
+        return [name for name, engine in self._engines.items() if engine.loaded]
+
+    def reload(self, name, force=True):
+        """Load `name` from disk if forced or its file changed; the running model stays active on failure.
+
+        Returns True when a new artifact was swapped in.
+        """
+        engine = self._engines[name]
+        with self._reload_lock:
+            self._tried.add(name)
+            signature = _signature(engine.model_path)
+            if signature is None or (not force and signature == engine.signature):
+                return False
+            try:
+                engine.reload()
+            except Exception as e:
+                # Remember the bad file so the watcher does not retry it every tick
+                engine.signature = signature
+                self._errors[name] = f"{type(e).__name__}: {e}"
+                log.error("Rejected %s model artifact %s: %s", name, engine.model_path, e)
+                return False
+            self._errors.pop(name, None)
+        log.info("Loaded %s model version %s in %.1f ms", name,
+                 engine.metadata.get('version'), engine.load_seconds * 1000)
+        return True
+
+    def check(self):
+        """Reload every engine whose artifact changed on disk."""
+        return [name for name in self._engines if self.reload(name, force=False)]
+
+    def start_watcher(self, interval=MODEL_WATCH_INTERVAL):
+        """Poll the model files every `interval` seconds and hot-swap new artifacts."""
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.check()
+                except Exception as e:
+                    log.warning("Model watcher failed: %s", e)
+
+        self._watcher = threading.Thread(target=run, name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        models = {}
+        for name, engine in self._engines.items():
+            models[name] = {
+                'active': name == self.active,
+                'loaded': engine.loaded,
+                'path': engine.model_path,
+                'version': engine.metadata.get('version'),
+                'metadata': {k: v for k, v in engine.metadata.items() if k != 'labels'},
+                'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(engine.loaded_at)) if engine.loaded_at else None,
+                'load_ms': round(engine.load_seconds * 1000, 2) if engine.load_seconds is not None else None,
+                'last_error': self._errors.get(name)
+            }
+        return {'active': self.active, 'watch_interval': MODEL_WATCH_INTERVAL, 'models': models}
+
+    def _items(self):
+        """The items engine when it is active and loaded, else None."""
+        items = self._engines.get('items')
+        if items is not None and not items.loaded and self.active == 'items' and 'items' not in self._tried:
+            self.reload('items')  # lazy mode: first submission loads it
+        if self.active == 'items' and items is not None and items.loaded:
+            return items
+        return None
+
+    def classify(self, total_score, answers=None, age=None, sex=None):
+        """Return (model name, label, result, risk_level) for a submission."""
+        items = self._items()
+        if items is not None and answers is not None:
+            try:
+                return ('items',) + items.classify(answers, age, sex)
+            except ValueError:
+                pass  # incomplete answers: score the total instead
+        return ('total',) + self._engines['total'].classify(total_score)
+
+    def classify_many(self, scores, answers=None, ages=None, sexes=None):
+        """Vectorized classify for a validated batch, picking the model per row like classify().
+
+        Rows of `answers` without a -1 go to the items model when it is
+        active; the rest are scored on their total. Returns (models,
+        labels, results, risk_levels) as arrays aligned with scores.
+        """
+        labels, results, risk_levels = self._engines['total'].classify_many(scores)
+        models = np.full(len(scores), 'total', dtype=object)
+        items = self._items()
+        if items is not None and answers is not None:
+            rows = np.flatnonzero((answers >= 0).all(axis=1))
+            if rows.size:
+                labels[rows], results[rows], risk_levels[rows] = items.classify_many(
+                    answers[rows], ages[rows], [sexes[i] for i in rows])
+                models[rows] = 'items'
+        return models, labels, results, risk_levels
+
+
+def _number(value):
+    """Coerce a JSON value to float, NaN for anything that is not a number."""
+    if isinstance(value, bool) or value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return math.nan
+    return math.nan
+
+
+def validate_batch(items):
+    """Validate a batch of scores in one vectorized pass.
+
+    Each item is a total score, {"total_score": n} or {"phq1": .., ..,
+    "phq9": ..} with answers 0-3, optionally with "age" and "gender" for
+    the per-item model. Returns (scores, answers, ages, genders, errors):
+    scores is an int16 array (-1 for invalid items), answers an int8
+    array with a row of -1 wherever no valid answers were given, and
+    errors maps index -> message.
+    """
+    n = len(items)
+    totals = np.full(n, np.nan)
+    answers = np.full((n, len(PHQ_ITEMS)), np.nan)
+    per_item = np.zeros(n, dtype=bool)
+    ages = np.full(n, np.nan)
+    genders = [''] * n
+
+    # Extraction is the only per-item Python work
+    for i, item in enumerate(items):
+        if isinstance(item, dict):
+            if 'total_score' in item:
+                totals[i] = _number(item['total_score'])
+            else:
+                per_item[i] = True
+                answers[i] = [_number(item.get(key)) for key in PHQ_ITEMS]
+                ages[i] = _number(item.get('age'))
+                genders[i] = item.get('gender') or ''
+        else:
+            totals[i] = _number(item)
+
+    with np.errstate(invalid='ignore'):
+        answers_ok = (~np.isnan(answers) & (answers == np.floor(answers))
+                      & (answers >= 0) & (answers <= 3)).all(axis=1)
+        totals = np.where(per_item, answers.sum(axis=1), totals)
+        totals_ok = (np.isfinite(totals) & (totals == np.floor(totals))
+                     & (totals >= MIN_SCORE) & (totals <= MAX_SCORE))
+
+    bad_items = per_item & ~answers_ok
+    valid = totals_ok & ~bad_items
+    scores = np.where(valid, np.nan_to_num(totals, nan=-1), -1).astype(np.int16)
+    answers = np.where((per_item & valid)[:, None], np.nan_to_num(answers, nan=-1), -1).astype(np.int8)
+
+    errors = {}
+    for i in np.flatnonzero(bad_items):
+        errors[int(i)] = f"Answers {', '.join(PHQ_ITEMS)} must all be integers between 0 and 3"
+    for i in np.flatnonzero(~valid & ~bad_items):
+        errors[int(i)] = f"Score must be an integer between {MIN_SCORE} and {MAX_SCORE}"
+    return scores, answers, ages, genders, errors
+
+
+engine = PredictionEngine()
+item_engine = ItemPredictionEngine()
+
+registry = ModelRegistry()
+registry.register('total', engine)
+registry.register('items', item_engine)
+
+
+def preload():
+    """Load every model now, e.g. in the gunicorn master so forked workers share it."""
+    if not engine.loaded:
+        engine.load()
+    if not item_engine.loaded and not registry.reload('items') and not os.path.exists(item_engine.model_path):
+        log.info("No per-item model at %s; serving the total-score model only", item_engine.model_path)
+
+
+if not LAZY_MODELS:
+    preload()
@@ -0,0 +1,96 @@
+import os
+
+from flask import render_template, request
+
+from cache import ReadThroughCache
+from db import get_connection
+
+# How long the assembled questionnaire is served before it is re-read from MySQL
+QUESTIONNAIRE_TTL = float(os.environ.get("INSIGHTIFY_QUESTIONNAIRE_TTL", 300))
+
+
+class QuestionnaireCache(ReadThroughCache):
+    """In-process cache of the /test questions, their options and the rendered page.
+
+    Rendered pages are keyed on `version`, so an invalidation also drops
+    the HTML built from the old content.
+    """
+
+    def __init__(self, ttl=QUESTIONNAIRE_TTL):
+        super().__init__(ttl)
+        self._pages = {}  # (version, script_root) -> rendered test.html
+
+    @staticmethod
+    def _fetch():
+        conn = get_connection()
+        try:
+            cursor = conn.cursor(dictionary=True)
+
+            # Get all questions
+            cursor.execute("SELECT * FROM questions")
+            questions = cursor.fetchall()
+
+            # Get all options
+            options = []
+            if questions:
+                question_ids = [q['id'] for q in questions]
+                format_strings = ','.join(['%s'] * len(question_ids))
+                cursor.execute(f"SELECT * FROM options WHERE question_id IN ({format_strings})", tuple(question_ids))
+                options = cursor.fetchall()
+            cursor.close()
+        finally:
+            conn.close()
+
+        # Group options by question_id
+        options_dict = {}
+        for opt in options:
+            options_dict.setdefault(opt['question_id'], []).append(opt)
+        return questions, options_dict
+
+    def get(self):
+        """Return (version, questions, options), loading from MySQL when stale."""
+        version, (questions, options) = self.current()
+        return version, questions, options
+
+    def _loaded(self, version, value):
+        if version is not None:
+            self._pages.clear()
+
+    def render(self):
+        """Return the rendered test.html, rendering only on a cache miss.
+
+        Apart from the content, the page only varies on login state, and
+        /test is only served to logged-in users.
+        """
+        version, questions, options = self.get()
+        key = (version, request.script_root)
+        page = self._pages.get(key) if version is not None else None
+        if page is None:
+            page = render_template('test.html', questions=questions, options=options)
+            with self._lock:
+                if version is not None and version == self.version:
+                    self._pages[key] = page
+        return page
+
+    def invalidate(self):
+        """Drop cached content; call after editing questions or options."""
+        super().invalidate()
+        self._pages.clear()
+
+    def stats(self):
+        return {
+            'version': self.version,
+            'cached': self._entry is not None,
+            'age_seconds': self.age_seconds(),
+            'ttl_seconds': self.ttl,
+            'rendered_pages': len(self._pages),
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+questionnaire_cache = QuestionnaireCache()
+
+
+def invalidate_questionnaire():
+    questionnaire_cache.invalidate()
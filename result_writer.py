@@ -0,0 +1,267 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from mysql.connector import errors
+
+import analytics
+import history
+from counters import counters, RESULTS, risk_counter
+from db import get_connection
+
+log = logging.getLogger(__name__)
+
+# Write-behind is opt-in; by default results are written in the request like before
+WRITE_BEHIND = os.environ.get("INSIGHTIFY_RESULTS_WRITE_BEHIND", "0") == "1"
+QUEUE_SIZE = int(os.environ.get("INSIGHTIFY_RESULTS_QUEUE_SIZE", 10000))
+BATCH_SIZE = int(os.environ.get("INSIGHTIFY_RESULTS_BATCH_SIZE", 200))
+FLUSH_INTERVAL = float(os.environ.get("INSIGHTIFY_RESULTS_FLUSH_INTERVAL", 1.0))
+# How long a request waits for queue space before writing synchronously itself
+ENQUEUE_TIMEOUT = float(os.environ.get("INSIGHTIFY_RESULTS_ENQUEUE_TIMEOUT", 0.05))
+# Append-only file for batches that could not reach MySQL; empty disables spooling
+SPOOL_PATH = os.environ.get("INSIGHTIFY_RESULTS_SPOOL", "results_spool.ndjson")
+SPOOL_FSYNC = os.environ.get("INSIGHTIFY_RESULTS_SPOOL_FSYNC", "1") == "1"
+
+# Errors that retrying cannot fix: the row itself is unacceptable (or the spooled line unreadable)
+REJECTED = (errors.DataError, errors.IntegrityError, ValueError, TypeError, KeyError)
+# results column sizes (migrations/0001); longer values fail the insert under strict mode
+MAX_LENGTHS = {'name': 255, 'age': 32, 'gender': 64, 'location': 255, 'interest': 255}
+
+COLUMNS = ('user_id', 'total_score', 'result', 'risk_level', 'name', 'age', 'gender', 'location', 'interest', 'created_at')
+INSERT_SQL = (
+    f"INSERT INTO results ({', '.join(COLUMNS)}) "
+    f"VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+)
+
+
+def invalid_fields(record):
+    """Names of the fields in a results record that the results table would reject."""
+    bad = [field for field, limit in MAX_LENGTHS.items()
+           if record.get(field) is not None and (not isinstance(record[field], str) or len(record[field]) > limit)]
+    score = record.get('total_score')
+    if isinstance(score, bool) or not isinstance(score, int) or not 0 <= score <= 255:
+        bad.append('total_score')
+    return bad
+
+
+def write_results(cursor, records):
+    """Insert result records plus their counter, rollup and history updates in the caller's transaction."""
+    cursor.executemany(INSERT_SQL, [tuple(record[c] for c in COLUMNS) for record in records])
+
+    # Row locks in a fixed order shared with bulk.delete_users: counters (by name), then rollup, then history
+    counters.incr(cursor, RESULTS, len(records))
+    per_risk = {}
+    for record in records:
+        per_risk[record['risk_level']] = per_risk.get(record['risk_level'], 0) + 1
+    for risk_level, count in sorted(per_risk.items()):
+        counters.incr(cursor, risk_counter(risk_level), count)
+    for record in records:
+        analytics.record_result(cursor, record['created_at'], record['gender'], record['location'],
+                                record['age'], record['result'], record['risk_level'])
+    history.record_results(cursor, records)
+
+
+def _commit(records):
+    conn = get_connection()
+    try:
+        cursor = conn.cursor()
+        write_results(cursor, records)
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
+
+
+class ResultWriter:
+    """Persists results rows (or, given another `commit`, any records), optionally write-behind.
+
+    In write-behind mode submit() only enqueues the record; a worker
+    thread drains the bounded queue and inserts batches of up to
+    `batch_size` rows with executemany, at least every `flush_interval`
+    seconds. When the queue is full the request falls back to a
+    synchronous write, which throttles callers to the database's pace.
+    Batches that fail to commit are appended to the spool file and
+    replayed before the next successful flush. A spool that the table
+    rejects is retried row by row, and rows that still fail for a data
+    reason go to a dead-letter file beside the spool instead of blocking
+    the queue. The queue is drained on interpreter shutdown.
+    """
+
+    def __init__(self, write_behind=WRITE_BEHIND, queue_size=QUEUE_SIZE, batch_size=BATCH_SIZE,
+                 flush_interval=FLUSH_INTERVAL, enqueue_timeout=ENQUEUE_TIMEOUT,
+                 spool_path=SPOOL_PATH, spool_fsync=SPOOL_FSYNC, commit=_commit, time_field='created_at',
+                 name='result-writer'):
+        self.write_behind = write_behind
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.spool_path = spool_path
+        self.spool_fsync = spool_fsync
+        root, ext = os.path.splitext(spool_path or '')
+        self.dead_letter_path = f"{root}.dead{ext}" if spool_path else None
+        # Writes one batch of records in a transaction; other tables reuse the writer with their own
+        self.commit = commit
+        self.time_field = time_field
+        self.name = name
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._spool_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._worker = None
+        self.stats = {'queued': 0, 'written': 0, 'batches': 0, 'sync_fallbacks': 0,
+                      'spooled': 0, 'replayed': 0, 'failures': 0, 'dead_lettered': 0}
+
+    def submit(self, record):
+        record = dict(record)
+        record.setdefault(self.time_field, datetime.now())
+        if not self.write_behind:
+            self.commit([record])
+            return
+
+        self.start()
+        try:
+            self._queue.put(record, timeout=self.enqueue_timeout)
+            self.stats['queued'] += 1
+        except queue.Full:
+            # Backpressure: the queue is saturated, so this request pays for its own write
+            self.stats['sync_fallbacks'] += 1
+            self.commit([record])
+
+    def start(self):
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is not None:
+                return
+            self._stopping.clear()
+            self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._worker.start()
+            atexit.register(self.stop)
+
+    def _take_batch(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._flush(batch)
+            elif self.spool_path and os.path.exists(self.spool_path):
+                try:
+                    self._replay_spool()
+                except Exception as e:
+                    log.warning("%s spool replay failed: %s", self.name, e)
+                    self._stopping.wait(self.flush_interval)
+
+    def _flush(self, batch):
+        try:
+            self._replay_spool()
+            self.commit(batch)
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        except Exception as e:
+            self.stats['failures'] += 1
+            log.error("%s flush failed (%d rows): %s", self.name, len(batch), e)
+            self._spool(batch)
+
+    def _append(self, path, lines):
+        with open(path, 'a', encoding='utf-8') as out:
+            for line in lines:
+                out.write(line + '\n')
+            out.flush()
+            if self.spool_fsync:
+                os.fsync(out.fileno())
+
+    def _spool(self, batch):
+        if not self.spool_path:
+            log.error("No spool configured for %s; dropping %d records", self.name, len(batch))
+            return
+        with self._spool_lock:
+            self._append(self.spool_path, [json.dumps(record, default=str) for record in batch])
+        self.stats['spooled'] += len(batch)
+
+    def _dead_letter(self, line, error):
+        log.error("%s: moving a rejected record to %s: %s", self.name, self.dead_letter_path, error)
+        self._append(self.dead_letter_path, [json.dumps({'record': line, 'error': str(error)})])
+        self.stats['dead_lettered'] += 1
+
+    def _load(self, line):
+        record = json.loads(line)
+        record[self.time_field] = datetime.fromisoformat(record[self.time_field])
+        return record
+
+    def _replay_spool(self):
+        """Insert spooled rows; the file is only removed once every row is committed or dead-lettered."""
+        if not self.spool_path or not os.path.exists(self.spool_path):
+            return
+        with self._spool_lock:
+            with open(self.spool_path, encoding='utf-8') as spool:
+                lines = [line.strip() for line in spool if line.strip()]
+            try:
+                if lines:
+                    self.commit([self._load(line) for line in lines])
+            except REJECTED as e:
+                log.warning("%s spool rejected (%s); retrying its %d rows one by one", self.name, e, len(lines))
+                self._replay_each(lines)
+            os.remove(self.spool_path)
+        self.stats['replayed'] += len(lines)
+
+    def _replay_each(self, lines):
+        for i, line in enumerate(lines):
+            try:
+                self.commit([self._load(line)])
+            except REJECTED as e:
+                self._dead_letter(line, e)
+            except Exception:
+                # MySQL went away part way: keep only the rows not yet committed
+                tmp_path = self.spool_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as spool:
+                    spool.write(''.join(rest + '\n' for rest in lines[i:]))
+                os.replace(tmp_path, self.spool_path)
+                raise
+
+    def stop(self, timeout=10):
+        """Stop the worker and flush whatever is still queued."""
+        if self._worker is None:
+            return
+        self._stopping.set()
+        self._worker.join(timeout)
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+        self._worker = None
+
+    def status(self):
+        return {
+            'write_behind': self.write_behind,
+            'queue_depth': self._queue.qsize(),
+            'queue_capacity': self._queue.maxsize,
+            'spool_pending': bool(self.spool_path and os.path.exists(self.spool_path)),
+            'dead_letters': bool(self.dead_letter_path and os.path.exists(self.dead_letter_path)),
+            **self.stats
+        }
+
+
+result_writer = ResultWriter()
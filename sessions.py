@@ -0,0 +1,211 @@
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+
+# 'sqlite' works across gunicorn workers, 'memory' only within one process, 'cookie' is Flask's default
+SESSION_BACKEND = os.environ.get("INSIGHTIFY_SESSION_BACKEND", "sqlite")
+SESSION_DB = os.environ.get("INSIGHTIFY_SESSION_DB", "sessions.sqlite3")
+# Sessions expire this many seconds after they were last written
+SESSION_TTL = float(os.environ.get("INSIGHTIFY_SESSION_TTL", 7 * 24 * 3600))
+SESSION_MAX_ENTRIES = int(os.environ.get("INSIGHTIFY_SESSION_MAX_ENTRIES", 100000))
+
+_SID = re.compile(r'^[A-Za-z0-9_-]{43}$')
+serializer = TaggedJSONSerializer()
+
+
+class MemoryStore:
+    """In-process LRU of serialized sessions with a TTL."""
+
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # sid -> (expires_at, payload)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            if entry[0] <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return entry[1]
+
+    def set(self, sid, payload):
+        with self._lock:
+            self._entries[sid] = (time.time() + self.ttl, payload)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+
+class SQLiteStore:
+    """Sessions in a local SQLite file, shared by every worker on the host."""
+
+    # Expired rows are purged once every this many writes
+    PURGE_EVERY = 500
+
+    def __init__(self, path=SESSION_DB, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._writes = 0
+
+    def _db(self):
+        # One connection per thread and per process, so nothing crosses a fork
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS sessions "
+                       "(sid TEXT PRIMARY KEY, payload TEXT NOT NULL, expires REAL NOT NULL)")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get(self, sid):
+        row = self._db().execute("SELECT payload FROM sessions WHERE sid = ? AND expires > ?",
+                                 (sid, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, sid, payload):
+        now = time.time()
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO sessions (sid, payload, expires) VALUES (?, ?, ?)",
+                   (sid, payload, now + self.ttl))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            db.execute("DELETE FROM sessions WHERE expires <= ?", (now,))
+
+    def delete(self, sid):
+        self._db().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+
+class ServerSession(SessionMixin):
+    """Session whose data lives in a store; the cookie only carries its id.
+
+    Nothing is read from the store until the session is first accessed,
+    and save_session() writes only when a key was set or deleted.
+    """
+
+    def __init__(self, store, sid=None):
+        self.store = store
+        self.new = sid is None
+        self.sid = sid or secrets.token_urlsafe(32)
+        self.modified = False
+        self.accessed = False
+        self.previous_sid = None
+        self._data = {} if self.new else None
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def _load(self):
+        self.accessed = True
+        if self._data is None:
+            payload = self.store.get(self.sid)
+            self._data = serializer.loads(payload) if payload else {}
+        return self._data
+
+    def regenerate(self):
+        """Move the data to a fresh id, e.g. on login, so a planted id is useless."""
+        data = self._load()
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self._data = data
+        self.modified = True
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def clear(self):
+        self._load().clear()
+        self.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        return ServerSession(self.store, sid if sid and _SID.match(sid) else None)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+        if not session.modified:
+            return
+
+        if not session.loaded or len(session) == 0:
+            # Cleared (e.g. logout): drop the stored copy and the cookie
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path,
+                                       secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app),
+                                       httponly=self.get_cookie_httponly(app))
+            return
+
+        self.store.set(session.sid, serializer.dumps(dict(session)))
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain, path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+def regenerate(session):
+    """Issue a new session id where the backend supports it; no-op for cookie sessions."""
+    if isinstance(session, ServerSession):
+        session.regenerate()
+
+
+def init_app(app, backend=SESSION_BACKEND):
+    if backend == 'memory':
+        app.session_interface = ServerSessionInterface(MemoryStore())
+    elif backend == 'sqlite':
+        app.session_interface = ServerSessionInterface(SQLiteStore())
+    elif backend != 'cookie':
+        raise ValueError(f"Unknown session backend '{backend}'; expected sqlite, memory or cookie")
@@ -0,0 +1,35 @@
+"""Startup timing. app.py imports this first so its phases cover the whole cold start."""
+import os
+import time
+
+STARTED = time.perf_counter()
+_phases = []
+_last = STARTED
+
+
+def mark(phase):
+    """Record how long `phase` took since the previous mark."""
+    global _last
+    now = time.perf_counter()
+    _phases.append((phase, now - _last))
+    _last = now
+
+
+def rss_mb():
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return round(pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20, 1)
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Peak rather than current RSS, in KB on Linux
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def report():
+    return {
+        'pid': os.getpid(),
+        'phases_ms': {phase: round(seconds * 1000, 1) for phase, seconds in _phases},
+        'total_ms': round((_last - STARTED) * 1000, 1),
+        'rss_mb': rss_mb()
+    }
@@ -0,0 +1,46 @@
+// Incremental loading for the paginated admin tables.
+// The first page is rendered by Flask; further pages come from /admin/api/<listing>
+// using the same query string (filters, sort) plus the cursor of the last page.
+
+function escapeHtml(value) {
+    if (value === null || value === undefined) {
+        return '';
+    }
+    return String(value)
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#39;');
+}
+
+function setupLoadMore(listing, renderRow) {
+    const button = document.getElementById('loadMoreBtn');
+    const tbody = document.getElementById('listingBody');
+    if (!button || !tbody) {
+        return;
+    }
+
+    button.addEventListener('click', async () => {
+        const params = new URLSearchParams(window.location.search);
+        params.set('cursor', button.dataset.cursor);
+        button.disabled = true;
+
+        try {
+            const response = await fetch(`/admin/api/${listing}?${params}`);
+            const data = await response.json();
+            if (!data.success) {
+                alert(data.message || 'Failed to load more rows.');
+                return;
+            }
+
+            tbody.insertAdjacentHTML('beforeend', data.items.map(renderRow).join(''));
+            button.dataset.cursor = data.next_cursor || '';
+            button.style.display = data.next_cursor ? '' : 'none';
+        } catch (error) {
+            console.error('Load more error:', error);
+        } finally {
+            button.disabled = false;
+        }
+    });
+}
@@ -0,0 +1,185 @@
+"""Offline training for the PHQ-9 depression level models.
+
+Replaces depression_level.ipynb. Reads only the PHQ-9 answer columns of
+the survey CSV (plus age and sex for the per-item model), imputes and
+labels them with vectorized pandas/NumPy operations, fits the scaler and
+logistic regression, checks the result with the same code path the app
+serves from, and writes one artifact (model, scaler and metadata) to the
+path prediction.py loads.
+
+    python training.py
+    python training.py --model items
+    python training.py --data other.csv --output models/candidate.pkl --seed 7
+"""
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from prediction import (MODEL_PATH, ITEMS_MODEL_PATH, MIN_SCORE, MAX_SCORE, PHQ_ITEMS, ITEM_FEATURES,
+                        PredictionEngine, ItemPredictionEngine, item_features, prediction_map)
+
+DATASET_PATH = 'Dataset_14-day_AA_depression_symptoms_mood_and_PHQ-9.csv'
+ARTIFACT_FORMAT = 1
+
+# Upper bound of each PHQ-9 severity band, paired with the model label prediction_map expects
+LEVEL_BOUNDS = (4, 9, 14, 19, MAX_SCORE)
+LEVELS = ('Minimal', 'Mild', 'Moderate', 'Moderately', 'Severe')
+
+
+def load_dataset(path=DATASET_PATH, demographics=False):
+    """Read the nine PHQ answer columns (and age/sex) only, as float32 so NA survives the parse.
+
+    `path` may also be a store built by dataset.py, which skips CSV parsing.
+    """
+    if os.path.isdir(path):
+        from dataset import ColumnStore
+        return ColumnStore(path).to_frame(['phq', 'age', 'sex'] if demographics else ['phq'])
+    dtypes = {item: np.float32 for item in PHQ_ITEMS}
+    if demographics:
+        dtypes.update(age=np.float32, sex='string')
+    return pd.read_csv(path, usecols=list(dtypes), dtype=dtypes)
+
+
+def impute(df):
+    """Fill missing answers with each column's median in one vectorized pass."""
+    numeric = df.select_dtypes('number')
+    return df.fillna(numeric.median())
+
+
+def label_levels(totals):
+    """Map PHQ-9 totals to severity labels."""
+    bins = (MIN_SCORE - 1,) + LEVEL_BOUNDS
+    return pd.cut(totals, bins=bins, labels=LEVELS, right=True).astype(str)
+
+
+def prepare(df):
+    """Return (X, y) with the total score as the single feature."""
+    totals = impute(df).to_numpy().sum(axis=1).round()
+    X = totals.reshape(-1, 1).astype(np.float64)
+    y = label_levels(totals).to_numpy()
+    return X, y
+
+
+def prepare_items(df):
+    """Return (X, y, age_median) with answers, age and one-hot sex as features."""
+    df = impute(df)
+    answers = df[list(PHQ_ITEMS)].to_numpy()
+    X = item_features(answers, df['age'].to_numpy(), df['sex'].fillna('').to_numpy())
+    y = label_levels(answers.sum(axis=1).round()).to_numpy()
+    return X, y, float(df['age'].median())
+
+
+def train(X, y, test_size=0.2, seed=42, max_iter=1000):
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed, stratify=y)
+    scaler = StandardScaler().fit(X_train)
+    model = LogisticRegression(max_iter=max_iter, random_state=seed)
+    model.fit(scaler.transform(X_train), y_train)
+
+    accuracy = accuracy_score(y_test, model.predict(scaler.transform(X_test)))
+    return model, scaler, {'accuracy': round(float(accuracy), 4), 'train_rows': len(X_train), 'test_rows': len(X_test)}
+
+
+def _sha256(path):
+    if os.path.isdir(path):
+        # Column stores record the hash of the CSV they were built from
+        with open(os.path.join(path, 'meta.json')) as meta:
+            return json.load(meta).get('source_sha256') or hashlib.sha256(path.encode()).hexdigest()
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_artifact(model, scaler, metrics, data_path, seed, kind='total'):
+    import sklearn
+
+    trained_at = datetime.now(timezone.utc)
+    data_sha = _sha256(data_path)
+    if kind == 'items':
+        weights, bias = ItemPredictionEngine.fold(model, scaler)
+        ItemPredictionEngine.verify(model, scaler, weights, bias)
+        features = list(ITEM_FEATURES)
+    else:
+        labels, table = PredictionEngine.build_table(model, scaler)
+        PredictionEngine.verify_table(model, scaler, labels, table)
+        features = ['total_score']
+    labels = [str(label) for label in model.classes_]
+    missing = [label for label in labels if label not in prediction_map]
+    if missing:
+        raise ValueError(f"Model labels {missing} have no entry in prediction_map")
+
+    return {
+        'format': ARTIFACT_FORMAT,
+        'model': model,
+        'scaler': scaler,
+        'metadata': {
+            'version': f"{kind}-{trained_at:%Y%m%d%H%M%S}-{data_sha[:8]}",
+            'kind': kind,
+            'trained_at': trained_at.isoformat(timespec='seconds'),
+            'dataset': os.path.basename(data_path),
+            'dataset_sha256': data_sha,
+            'features': features,
+            'labels': labels,
+            'seed': seed,
+            'sklearn_version': sklearn.__version__,
+            **metrics
+        }
+    }
+
+
+def save_artifact(artifact, path=MODEL_PATH):
+    """Write the artifact next to `path` and rename it into place, so readers never see a partial file."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            pickle.dump(artifact, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--model', choices=('total', 'items'), default='total',
+                        help="'total' scores the PHQ-9 total; 'items' uses all nine answers plus age and sex")
+    parser.add_argument('--data', default=DATASET_PATH, help='survey CSV to train on')
+    parser.add_argument('--output', help='artifact path (default: the path the app loads for --model)')
+    parser.add_argument('--test-size', type=float, default=0.2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-iter', type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    extra = {}
+    if args.model == 'items':
+        X, y, extra['age_median'] = prepare_items(load_dataset(args.data, demographics=True))
+        # The survey repeats each participant's answers, so this is far below the row count
+        extra['answer_patterns'] = int(len(np.unique(X[:, :len(PHQ_ITEMS)], axis=0)))
+    else:
+        X, y = prepare(load_dataset(args.data))
+    model, scaler, metrics = train(X, y, test_size=args.test_size, seed=args.seed, max_iter=args.max_iter)
+    artifact = build_artifact(model, scaler, {'rows': len(X), **metrics, **extra}, args.data, args.seed, args.model)
+    output = args.output or (ITEMS_MODEL_PATH if args.model == 'items' else MODEL_PATH)
+    save_artifact(artifact, output)
+
+    print(json.dumps(artifact['metadata'], indent=2))
+    print(f"Saved {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,391 +1,451 @@
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session, flash, render_template_string
-from werkzeug.security import generate_password_hash, check_password_hash
-import mysql.connector
-import pickle
-import re
-import numpy as np
-
-# Load the model
-with open('models/depression_model.pkl', 'rb') as file:
-    model = pickle.load(file)
-
-# Load the scaler too
-scaler = pickle.load(open('scaler.pkl', 'rb'))    
-
-user_bp = Blueprint("user", __name__, "/")
-
-# Database configuration
-db_config = {
-    "host": "localhost",
-    "user": "root",
-    "password": "",
-    "database": "insightify"
-}
-
-# Static routes
-@user_bp.route('/')
-def index():
-    return render_template('index.html')
-
-@user_bp.route('/learn-about-depression')
-def depression():
-    return render_template('depression.html')
-
-@user_bp.route('/about')
-def about():
-    return render_template('about.html')
-
-@user_bp.route('/contact', methods=['GET', 'POST'])
-def contact():
-    if request.method == 'POST':
-        name = request.form['name']
-        email = request.form['email']
-        message = request.form['message']
-
-        try:
-            conn = mysql.connector.connect(**db_config)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO messages (name, email, content)
-                VALUES (%s, %s, %s)
-            """, (name, email, message))
-
-            conn.commit()
-
-            # Flash success message and redirect to the same contact page
-            flash("Your message has been sent successfully!", "success")
-            return redirect(url_for('user.contact'))
-
-        except mysql.connector.Error as err:
-            print(f"Error: {err}")
-            flash("Error saving your message. Please try again.", "error")
-            return redirect(url_for('user.contact'))
-        finally:
-            if conn:
-                conn.close()
-
-    return render_template('contact.html')
-
-@user_bp.route('/privacy')
-def privacy():
-    return render_template('privacy.html')
-
-@user_bp.route('/terms')
-def terms():
-    return render_template('terms.html')
-
-# Authentication routes
-@user_bp.route('/signup', methods=['GET', 'POST'])
-def signup():
-    if request.method == 'GET':
-        return render_template('signup.html')
-
-    try:
-        data = request.get_json()
-        if not data:
-            return jsonify({'success': False, 'message': 'No data received'}), 400
-
-        fullname = data.get('fullname', '').strip()
-        email = data.get('email', '').lower().strip()
-        password = data.get('password', '')
-
-        # Field presence check
-        if not all([fullname, email, password]):
-            return jsonify({'success': False, 'message': 'All fields are required!'}), 400
-
-        # Email format check
-        email_regex = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        if not re.match(email_regex, email):
-            return jsonify({'success': False, 'message': 'Invalid email format!'}), 400
-
-        # Password strength validation
-        password_regex = r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*#?&])[A-Za-z\d@$!#%*?&]{8,}$'
-        if not re.match(password_regex, password):
-            return jsonify({
-                'success': False,
-                'message': 'Password must be at least 8 characters long and include uppercase, lowercase, number, and special character.'
-            }), 400
-
-        # Connect to DB
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor()
-
-        # Check if email already exists
-        cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
-        if cursor.fetchone():
-            return jsonify({'success': False, 'message': 'Email already exists!'}), 400
-
-        # Insert new user
-        hashed_pw = generate_password_hash(password)
-        cursor.execute(
-            "INSERT INTO users (fullname, email, password) VALUES (%s, %s, %s)",
-            (fullname, email, hashed_pw)
-        )
-        conn.commit()
-
-        return jsonify({'success': True, 'message': 'Signup successful!'}), 200
-
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
-
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
-
-
-from flask import session  # Make sure this is imported
-
-@user_bp.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'GET':
-        return render_template('login.html')
-    
-    data = request.get_json()
-    if not data:
-        return jsonify({'success': False, 'message': 'No data received'}), 400
-        
-    email = data.get('email', '').lower().strip()
-    password = data.get('password', '')
-
-    if not email or not password:
-        return jsonify({'success': False, 'message': 'All fields required!'}), 400
-
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute("SELECT id, fullname, email, password FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-        
-        if user and check_password_hash(user['password'], password):
-            # ✅ Set session after successful login
-            session['user_id'] = user['id']
-            session['fullname'] = user['fullname']
-            session['email'] = user['email']
-
-            return jsonify({
-                'success': True,
-                'message': 'Login successful!',
-                'user': {
-                    'id': user['id'],
-                    'fullname': user['fullname'],
-                    'email': user['email']
-                }
-            }), 200
-
-        return jsonify({'success': False, 'message': 'Invalid credentials!'}), 401
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
-    finally:
-        if 'conn' in locals() and conn.is_connected():
-            cursor.close()
-            conn.close()
-
-
-@user_bp.route('/logout', methods=['POST'])
-def logout():
-    session.clear()  # clear all session data
-    return redirect(url_for('user.index'))
-
-@user_bp.route('/contact', methods=['GET', 'POST'], endpoint='user_contact')
-def contact():
-    if request.method == 'POST':
-        name = request.form['name']
-        email = request.form['email']
-        message = request.form['message']
-
-        # Now, insert this data into the MySQL database
-        try:
-            conn = mysql.connector.connect(**db_config)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO messages (name, email, content)
-                VALUES (%s, %s, %s)
-            """, (name, email, message))
-
-            conn.commit()
-            
-            return redirect(url_for('user.contact'))  # Correct the redirect URL
-        except mysql.connector.Error as err:
-            print(f"Error: {err}")
-            return "Error saving your message", 500
-        finally:
-            if conn:
-                conn.close()
-    return render_template('contact.html')
-
-@user_bp.route('/test')
-def test():
-    if 'user_id' not in session:
-        return render_template_string('''
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <script src="https://cdn.jsdelivr.net/npm/sweetalert2@11"></script>
-            </head>
-            <body>
-                <script>
-                    // Wait until SweetAlert2 is loaded
-                    window.onload = function() {
-                        Swal.fire({
-                            icon: 'warning',
-                            title: 'Hold on!',
-                            text: 'You need to login to take the test.',
-                            confirmButtonText: 'Login Now',
-                            confirmButtonColor: '#0f2852'
-                        }).then(() => {
-                            window.location.href = "{{ url_for('user.login') }}";
-                        });
-                    }
-                </script>
-            </body>
-            </html>
-        ''')
-    
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-
-        # Get all questions
-        cursor.execute("SELECT * FROM questions")
-        questions = cursor.fetchall()
-
-        # Get all options
-        question_ids = [q['id'] for q in questions]
-        format_strings = ','.join(['%s'] * len(question_ids))
-        cursor.execute(f"SELECT * FROM options WHERE question_id IN ({format_strings})", tuple(question_ids))
-        options = cursor.fetchall()
-
-        # Group options by question_id
-        from collections import defaultdict
-        options_dict = defaultdict(list)
-        for opt in options:
-            options_dict[opt['question_id']].append(opt)
-
-        return render_template('test.html', questions=questions, options=options_dict)
-
-    except Exception as e:
-        return f"Error loading test: {str(e)}"
-    finally:
-        if conn and conn.is_connected():
-            cursor.close()
-            conn.close()
-
-@user_bp.route('/submit_test', methods=['POST'])
-def submit_test():
-    if 'user_id' not in session:
-        return redirect(url_for('user.login'))
-
-    user_id = session['user_id']
-
-    # Collect answers and calculate total_score
-    answers = []
-    total_score = 0
-    for i in range(1, 10):
-        selected_option = request.form.get(f'q{i}')
-        if selected_option:
-            score = int(selected_option)
-            answers.append(score)
-            total_score += score
-
-    # ✅ Store score in session
-    session['total_score'] = total_score
-
-    # Proceed to phase 2
-    return redirect(url_for('user.phase2_questionnaire'))
-
-
-@user_bp.route('/phase2', methods=['GET'])
-def phase2_questionnaire():
-    return render_template('phase2.html') 
-
-@user_bp.route('/submit_questionnaire', methods=['POST'])
-def submit_questionnaire():
-    if 'user_id' not in session:
-        return redirect(url_for('user.login'))
-
-    name = request.form['name']
-    age = request.form['age']
-    gender = request.form['gender']
-    location = request.form['location']
-    interest = request.form['interest']
-
-    # Store additional user info in session (optional)
-    session['user_info'] = {
-        'name': name,
-        'age': age,
-        'gender': gender,
-        'location': location,
-        'interest': interest
-    }
-
-    # ✅ Get score from session
-    total_score = session.get('total_score')
-
-    if total_score is None:
-        return "Test score not found. Please retake the test.", 400
-    
-    # Scale the score properly before prediction
-    import pandas as pd
-    score_df = pd.DataFrame([[total_score]], columns=['PHQ-9 Total Score'])
-    scaled_score = scaler.transform(score_df)
-
-    # ✅ Predict using model
-    prediction = model.predict(scaled_score)[0]
-    print("Raw model prediction:", prediction)
-    print("Model prediction output:", prediction)
-
-    # ✅ Map prediction
-    prediction_map = {
-    "Minimal": ("Minimal or No Depression", "Low"),
-    "Mild": ("Mild Depression", "Moderate"),
-    "Moderate": ("Moderate Depression", "Moderate"),
-    "Moderately": ("Moderately Severe Depression", "High"),
-    "Severe": ("Severe Depression", "Very High")
-    }
-
-    print("Total score (raw):", total_score)
-    print("Scaled score:", scaled_score) 
-    result, risk_level = prediction_map.get(prediction, ("Unknown", "Unknown"))
-    if result == "Unknown":
-        print(f"Warning: Unknown prediction '{prediction}'")
-    
-
-    # ✅ Store result in database
-    conn = mysql.connector.connect(**db_config)
-    cursor = conn.cursor()
-    print("Params for insert:", (session['user_id'], total_score, result, risk_level, name, age, gender, location, interest))
-    cursor.execute(
-    'INSERT INTO results (user_id, total_score, result, risk_level, name, age, gender, location, interest) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)',
-    (session['user_id'], total_score, result, risk_level, name, age, gender, location, interest)
-)
-    conn.commit()
-    cursor.close()
-    conn.close()
-
-    # ✅ Render result page
-    return render_template('result.html', score=total_score, result=result, risk_level=risk_level)
-
-# This route is for the prediction part (machine learning model)
-@user_bp.route('/predict', methods=['POST'])
-def predict_depression():
-    try:
-        data = request.get_json()
-        total_score = data.get('total_score')
-
-        if total_score is None:
-            return jsonify({'error': 'Total score not provided'}), 400
-
-        prediction = model.predict([[total_score]])  # model is already loaded
-        result = prediction[0]
-
-        return jsonify({'prediction': result})
-
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-# if __name__ == '__main__':
-#     user_bp.run(debug=True, host='0.0.0.0', port=5000)
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session, flash, render_template_string, Response, stream_with_context
+import mysql.connector
+from db import get_connection
+from counters import counters, UNREAD_MESSAGES, USERS
+from prediction import engine, registry, validate_batch, BATCH_CHUNK_SIZE, BATCH_MAX_ITEMS
+from questionnaire import questionnaire_cache
+from doctors import doctor_directory
+from result_writer import result_writer, invalid_fields
+from contact_intake import contact_intake, RATE_LIMITED, INVALID
+import history
+from instrumentation import inference_timer
+from sessions import regenerate
+from auth import hasher, user_logins, signups, rate_limited, hashing_busy, HashingBusy
+import json
+import logging
+import re
+import numpy as np
+
+user_bp = Blueprint("user", __name__, "/")
+log = logging.getLogger(__name__)
+
+
+# Static routes
+@user_bp.route('/')
+def index():
+    return render_template('index.html')
+
+@user_bp.route('/learn-about-depression')
+def depression():
+    return render_template('depression.html')
+
+@user_bp.route('/about')
+def about():
+    return render_template('about.html')
+
+@user_bp.route('/contact', methods=['GET', 'POST'])
+def contact():
+    if request.method == 'POST':
+        # Handed to the message writer; duplicates are acknowledged but not stored
+        try:
+            outcome, retry_after = contact_intake.submit(request.form.get('name'), request.form.get('email'),
+                                                         request.form.get('message'), request.remote_addr)
+        except mysql.connector.Error:
+            log.exception("Error saving contact message")
+            flash("Error saving your message. Please try again.", "error")
+            return redirect(url_for('user.contact'))
+        if outcome == RATE_LIMITED:
+            flash(f"You have sent several messages recently. Please try again in {retry_after} seconds.", "error")
+        elif outcome == INVALID:
+            flash("Please fill in your name, email and message.", "error")
+        else:
+            # Flash success message and redirect to the same contact page
+            flash("Your message has been sent successfully!", "success")
+        return redirect(url_for('user.contact'))
+
+    return render_template('contact.html')
+
+@user_bp.route('/privacy')
+def privacy():
+    return render_template('privacy.html')
+
+@user_bp.route('/terms')
+def terms():
+    return render_template('terms.html')
+
+# Authentication routes
+@user_bp.route('/signup', methods=['GET', 'POST'])
+def signup():
+    if request.method == 'GET':
+        return render_template('signup.html')
+
+    retry_after = signups.hit(request.remote_addr)
+    if retry_after:
+        return rate_limited(retry_after, 'Too many signups from this address. Please try again later.')
+
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'success': False, 'message': 'No data received'}), 400
+
+        fullname = data.get('fullname', '').strip()
+        email = data.get('email', '').lower().strip()
+        password = data.get('password', '')
+
+        # Field presence check
+        if not all([fullname, email, password]):
+            return jsonify({'success': False, 'message': 'All fields are required!'}), 400
+
+        # Email format check
+        email_regex = r'^[\w\.-]+@[\w\.-]+\.\w+$'
+        if not re.match(email_regex, email):
+            return jsonify({'success': False, 'message': 'Invalid email format!'}), 400
+
+        # Password strength validation
+        password_regex = r'^(?=.*[a-z])(?=.*[A-Z])(?=.*\d)(?=.*[@$!%*#?&])[A-Za-z\d@$!#%*?&]{8,}$'
+        if not re.match(password_regex, password):
+            return jsonify({
+                'success': False,
+                'message': 'Password must be at least 8 characters long and include uppercase, lowercase, number, and special character.'
+            }), 400
+
+        # Hash on the bounded hashing pool before borrowing a DB connection, so none is held while waiting
+        hashed_pw = hasher.hash(password)
+
+        # Connect to DB
+        conn = get_connection()
+        cursor = conn.cursor()
+
+        # Check if email already exists
+        cursor.execute("SELECT email FROM users WHERE email = %s", (email,))
+        if cursor.fetchone():
+            return jsonify({'success': False, 'message': 'Email already exists!'}), 400
+
+        # Insert new user
+        cursor.execute(
+            "INSERT INTO users (fullname, email, password) VALUES (%s, %s, %s)",
+            (fullname, email, hashed_pw)
+        )
+        counters.incr(cursor, USERS)
+        conn.commit()
+
+        return jsonify({'success': True, 'message': 'Signup successful!'}), 200
+
+    except HashingBusy:
+        return hashing_busy()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+from flask import session  # Make sure this is imported
+
+@user_bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'GET':
+        return render_template('login.html')
+    
+    data = request.get_json()
+    if not data:
+        return jsonify({'success': False, 'message': 'No data received'}), 400
+        
+    email = data.get('email', '').lower().strip()
+    password = data.get('password', '')
+
+    if not email or not password:
+        return jsonify({'success': False, 'message': 'All fields required!'}), 400
+
+    retry_after = user_logins.check(request.remote_addr, email)
+    if retry_after:
+        return rate_limited(retry_after)
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(dictionary=True)
+        cursor.execute("SELECT id, fullname, email, password FROM users WHERE email = %s", (email,))
+        user = cursor.fetchone()
+        # Hand the connection back before the slow hash check
+        cursor.close()
+        conn.close()
+
+        if user and hasher.verify(user['password'], password):
+            user_logins.succeeded(email)
+            # Move old hashes to the current parameters while we have the plain password
+            hasher.upgrade('users', user['id'], user['password'], password)
+
+            # ✅ Set session after successful login (under a fresh session id)
+            regenerate(session)
+            session['user_id'] = user['id']
+            session['fullname'] = user['fullname']
+            session['email'] = user['email']
+
+            return jsonify({
+                'success': True,
+                'message': 'Login successful!',
+                'user': {
+                    'id': user['id'],
+                    'fullname': user['fullname'],
+                    'email': user['email']
+                }
+            }), 200
+
+        user_logins.failed(email)
+        return jsonify({'success': False, 'message': 'Invalid credentials!'}), 401
+    except HashingBusy:
+        return hashing_busy()
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
+    finally:
+        if 'conn' in locals() and conn.is_connected():
+            cursor.close()
+            conn.close()
+
+
+@user_bp.route('/logout', methods=['POST'])
+def logout():
+    session.clear()  # clear all session data
+    return redirect(url_for('user.index'))
+
+@user_bp.route('/contact', methods=['GET', 'POST'], endpoint='user_contact')
+def contact():
+    if request.method == 'POST':
+        try:
+            outcome, retry_after = contact_intake.submit(request.form.get('name'), request.form.get('email'),
+                                                         request.form.get('message'), request.remote_addr)
+        except mysql.connector.Error:
+            log.exception("Error saving contact message")
+            return "Error saving your message", 500
+        if outcome == RATE_LIMITED:
+            return "Too many messages. Please try again later.", 429, {'Retry-After': str(retry_after)}
+        if outcome == INVALID:
+            return "Please fill in your name, email and message.", 400
+        return redirect(url_for('user.contact'))  # Correct the redirect URL
+    return render_template('contact.html')
+
+@user_bp.route('/test')
+def test():
+    if 'user_id' not in session:
+        return render_template_string('''
+            <!DOCTYPE html>
+            <html>
+            <head>
+                <script src="https://cdn.jsdelivr.net/npm/sweetalert2@11"></script>
+            </head>
+            <body>
+                <script>
+                    // Wait until SweetAlert2 is loaded
+                    window.onload = function() {
+                        Swal.fire({
+                            icon: 'warning',
+                            title: 'Hold on!',
+                            text: 'You need to login to take the test.',
+                            confirmButtonText: 'Login Now',
+                            confirmButtonColor: '#0f2852'
+                        }).then(() => {
+                            window.location.href = "{{ url_for('user.login') }}";
+                        });
+                    }
+                </script>
+            </body>
+            </html>
+        ''')
+    
+    try:
+        # Served from the in-process questionnaire cache (questions, options and rendered page)
+        return questionnaire_cache.render()
+
+    except Exception as e:
+        return f"Error loading test: {str(e)}"
+
+@user_bp.route('/submit_test', methods=['POST'])
+def submit_test():
+    if 'user_id' not in session:
+        return redirect(url_for('user.login'))
+
+    user_id = session['user_id']
+
+    # Collect answers and calculate total_score
+    answers = []
+    total_score = 0
+    for i in range(1, 10):
+        selected_option = request.form.get(f'q{i}')
+        if selected_option:
+            score = int(selected_option)
+            answers.append(score)
+            total_score += score
+
+    # ✅ Store score (and the answers, for the per-item model) in session
+    session['total_score'] = total_score
+    session['answers'] = answers if len(answers) == 9 else None
+
+    # Proceed to phase 2
+    return redirect(url_for('user.phase2_questionnaire'))
+
+
+@user_bp.route('/phase2', methods=['GET'])
+def phase2_questionnaire():
+    return render_template('phase2.html') 
+
+@user_bp.route('/submit_questionnaire', methods=['POST'])
+def submit_questionnaire():
+    if 'user_id' not in session:
+        return redirect(url_for('user.login'))
+
+    name = request.form['name']
+    age = request.form['age']
+    gender = request.form['gender']
+    location = request.form['location']
+    interest = request.form['interest']
+
+    # Store additional user info in session (optional)
+    session['user_info'] = {
+        'name': name,
+        'age': age,
+        'gender': gender,
+        'location': location,
+        'interest': interest
+    }
+
+    # ✅ Get score from session
+    total_score = session.get('total_score')
+
+    if total_score is None:
+        return "Test score not found. Please retake the test.", 400
+    
+    # ✅ Look up the prediction precomputed for this score
+    try:
+        with inference_timer():
+            model_name, prediction, result, risk_level = registry.classify(
+                total_score, session.get('answers'), age, gender)
+    except ValueError:
+        return "Invalid test score. Please retake the test.", 400
+    log.debug("Prediction for score %s from the %s model: %s", total_score, model_name, prediction)
+    if result == "Unknown":
+        log.warning("Unknown prediction '%s' for score %s", prediction, total_score)
+
+
+    # ✅ Store result in database (queued for the background writer in write-behind mode)
+    record = {
+        'user_id': session['user_id'], 'total_score': total_score, 'result': result, 'risk_level': risk_level,
+        'name': name, 'age': age, 'gender': gender, 'location': location, 'interest': interest
+    }
+    invalid = invalid_fields(record)
+    if invalid:
+        return f"Please check these details and try again: {', '.join(invalid)}.", 400
+    result_writer.submit(record)
+
+    # ✅ Render result page
+    return render_template('result.html', score=total_score, result=result, risk_level=risk_level,
+                           doctors=doctor_directory.recommend(risk_level))
+
+# Past scores and trend for the logged-in user: /history?limit=30&window=3
+@user_bp.route('/history')
+def assessment_history():
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Please log in first.'}), 401
+    conn = cursor = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        data = history.history(cursor, session['user_id'], request.args)
+        return jsonify({'success': True, **data})
+    except history.HistoryError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        log.exception("Error in /history")
+        return jsonify({'success': False, 'message': 'Error fetching history.'}), 500
+    finally:
+        if cursor: cursor.close()
+        if conn: conn.close()
+
+# This route is for the prediction part (machine learning model)
+@user_bp.route('/predict', methods=['POST'])
+def predict_depression():
+    try:
+        data = request.get_json()
+        total_score = data.get('total_score')
+
+        if total_score is None:
+            return jsonify({'error': 'Total score not provided'}), 400
+
+        try:
+            with inference_timer():
+                result = engine.predict(total_score)  # served from the precomputed table
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({'prediction': result})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def _parse_ndjson(body):
+    items = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            items.append(json.loads(line))
+        except ValueError:
+            items.append(None)  # reported as an invalid item, not a failed batch
+    return items
+
+# Batch scoring for partner uploads: JSON array or NDJSON in, same format streamed out
+@user_bp.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    ndjson = request.mimetype in NDJSON_MIMETYPES
+
+    if ndjson:
+        items = _parse_ndjson(request.get_data(as_text=True))
+    else:
+        data = request.get_json(silent=True)
+        items = data.get('items') if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return jsonify({'error': 'Expected a JSON array of scores or answer objects'}), 400
+
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f'Batch too large: {len(items)} items, limit is {BATCH_MAX_ITEMS}'}), 413
+
+    chunk_size = request.args.get('chunk_size', BATCH_CHUNK_SIZE, type=int)
+    chunk_size = max(1, min(chunk_size, BATCH_MAX_ITEMS))
+
+    # Validate the whole batch up front, then score it chunk by chunk
+    scores, answers, ages, genders, errors = validate_batch(items)
+
+    def generate():
+        if not ndjson:
+            yield '['
+        for start in range(0, len(items), chunk_size):
+            chunk = scores[start:start + chunk_size]
+            valid = chunk >= 0
+            window = slice(start, start + chunk_size)
+            with inference_timer('batch'):
+                # Same model choice as /submit_questionnaire: per-item answers go to the active items model
+                models, labels, results, risk_levels = registry.classify_many(
+                    np.where(valid, chunk, 0), answers[window], ages[window], genders[window])
+
+            rows = []
+            for offset, ok in enumerate(valid):
+                index = start + offset
+                row = {'index': index}
+                item = items[index]
+                if isinstance(item, dict) and 'id' in item:
+                    row['id'] = item['id']
+                if ok:
+                    row['total_score'] = int(chunk[offset])
+                    row['model'] = models[offset]
+                    row['prediction'] = labels[offset]
+                    row['result'] = results[offset]
+                    row['risk_level'] = risk_levels[offset]
+                else:
+                    row['error'] = errors[index]
+                rows.append(json.dumps(row))
+
+            if ndjson:
+                yield '\n'.join(rows) + '\n'
+            else:
+                yield (',' if start else '') + ','.join(rows)
+        if not ndjson:
+            yield ']'
+
+    mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+# if __name__ == '__main__':
+#     user_bp.run(debug=True, host='0.0.0.0', port=5000)